@@ -3,8 +3,10 @@ TempoVault REST API Server
 Provides HTTP endpoints for querying indexed data and onchain state
 """
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import List, Optional, Any
 import os
@@ -13,7 +15,17 @@ from psycopg2.extras import RealDictCursor
 from web3 import Web3
 import json
 import asyncio
+import base64
+import csv
+import io
+import threading
+import zlib
 from datetime import datetime
+from decimal import Decimal
+from db_pool import DatabasePool, PoolTimeout
+from onchain_reader import OnchainReader
+from chain_cache import BlockCache
+from ws_fanout import EventFanout
 
 app = FastAPI(
     title="TempoVault API",
@@ -32,12 +44,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    # Browsers only let scripts read listed response headers; /api/v1/events pages through X-Next-Cursor
+    expose_headers=["X-Next-Cursor"],
 )
 
 RPC_URL = os.getenv("RPC_URL", "http://localhost:8545")
 DB_URL = os.getenv("INDEXER_DB_URL", "postgresql://localhost:5432/tempovault")
+# Rows per fetch from an export's server-side cursor; bounds the API's memory per export
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+# Concurrent exports; each holds its own connection, outside the request pool, for the whole download
+EXPORT_POOL_MAX = int(os.getenv("EXPORT_POOL_MAX", "2"))
+
+# Tables /api/v1/export streams; the vault tables can also be filtered by vault_id
+EXPORT_VAULT_TABLES = ['deposits', 'withdrawals', 'deployments', 'recalls', 'losses', 'performance_fees',
+                       'management_fees']
+EXPORT_PAIR_TABLES = ['oracle_updates', 'circuit_breakers']
 
 w3 = Web3(Web3.HTTPProvider(RPC_URL))
+db_pool = DatabasePool(DB_URL, cursor_factory=RealDictCursor)
+# Exports wait DB_POOL_TIMEOUT for one of these and then get a 503, so they never starve the other endpoints
+export_pool = DatabasePool(DB_URL, minconn=0, maxconn=EXPORT_POOL_MAX)
+onchain = OnchainReader(w3)
+chain_cache = BlockCache(w3, onchain)
+fanout = EventFanout()
+chain_id_cache = {}
 
 with open("../out/TreasuryVault.sol/TreasuryVault.json") as f:
     vault_abi = json.load(f)["abi"]
@@ -124,9 +154,46 @@ class ActiveOrdersResponse(BaseModel):
     oracle_freshness: Optional[int]
 
 
-def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(DB_URL, cursor_factory=RealDictCursor)
+@app.on_event("startup")
+async def open_db_pool():
+    await asyncio.to_thread(db_pool.open)
+    await asyncio.to_thread(export_pool.open)
+    fanout.start_listener(DB_URL)
+
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    fanout.stop_listener()
+    db_pool.close()
+    export_pool.close()
+
+
+def query_all(conn, sql, params=()):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def query_one(conn, sql, params=()):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchone()
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor for the position after row"""
+    raw = f"{row['block_timestamp'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(block_timestamp, id) from an opaque cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
 def structured_error(error_type: str, message: str, details: Any = None, status_code: int = 500) -> HTTPException:
@@ -150,8 +217,10 @@ async def health_check():
     Use /ready for full dependency checks.
     """
     try:
-        chain_id = w3.eth.chain_id
-        latest_block = w3.eth.block_number
+        if "chain_id" not in chain_id_cache:
+            chain_id_cache["chain_id"] = await asyncio.to_thread(lambda: w3.eth.chain_id)
+        chain_id = chain_id_cache["chain_id"]
+        latest_block = await chain_cache.head()
         return HealthResponse(
             status="healthy",
             chain_id=chain_id,
@@ -180,20 +249,19 @@ async def readiness_check():
 
     # Check RPC connection
     try:
-        w3.eth.block_number
+        await chain_cache.head()
         checks["rpc"] = True
     except Exception as e:
         checks["rpc_error"] = str(e)
 
     # Check database connection
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("SELECT 1")
-        conn.close()
+        await db_pool.run(query_one, "SELECT 1")
         checks["database"] = True
     except Exception as e:
         checks["database_error"] = str(e)
+    checks["database_pool"] = db_pool.status()
+    checks["export_pool"] = export_pool.status()
 
     ready = all([checks["rpc"], checks["database"]])
 
@@ -221,19 +289,25 @@ async def get_vault_balance(vault_id: int, vault_address: str):
     try:
         vault = w3.eth.contract(address=Web3.to_checksum_address(vault_address), abi=vault_abi)
 
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT DISTINCT token FROM deposits WHERE vault_id = %s
-            """, (vault_id,))
-            tokens = [row['token'] for row in cur.fetchall()]
+        rows = await db_pool.run(query_all, """
+            SELECT DISTINCT token FROM deposits WHERE vault_id = %s
+        """, (vault_id,))
+        tokens = [row['token'] for row in rows]
 
-        balances = []
+        # All four reads for every token in one Multicall3 call, at one block
+        calls = []
         for token in tokens:
-            token_balance = vault.functions.tokenBalances(token).call()
-            deployed = vault.functions.deployedCapital(token).call()
-            perf_fees = vault.functions.accruedPerformanceFees(token).call()
-            mgmt_fees = vault.functions.accruedManagementFees(token).call()
+            calls += [
+                vault.functions.tokenBalances(token),
+                vault.functions.deployedCapital(token),
+                vault.functions.accruedPerformanceFees(token),
+                vault.functions.accruedManagementFees(token),
+            ]
+        _, values = await chain_cache.read(calls)
+
+        balances = []
+        for i, token in enumerate(tokens):
+            token_balance, deployed, perf_fees, mgmt_fees = values[4 * i:4 * i + 4]
 
             balances.append(VaultBalance(
                 vault_id=vault_id,
@@ -245,7 +319,6 @@ async def get_vault_balance(vault_id: int, vault_address: str):
                 accrued_management_fees=str(mgmt_fees)
             ))
 
-        conn.close()
         return balances
 
     except psycopg2.Error as e:
@@ -269,17 +342,17 @@ async def get_vault_exposure(vault_id: int, vault_address: str):
     try:
         vault = w3.eth.contract(address=Web3.to_checksum_address(vault_address), abi=vault_abi)
 
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT DISTINCT pair_id FROM deployments WHERE vault_id = %s
-            """, (vault_id,))
-            pairs = [row['pair_id'] for row in cur.fetchall()]
+        rows = await db_pool.run(query_all, """
+            SELECT DISTINCT pair_id FROM deployments WHERE vault_id = %s
+        """, (vault_id,))
+        pairs = [row['pair_id'] for row in rows]
 
-        exposures = []
-        for pair_id in pairs:
-            exposure = vault.functions.pairExposure(bytes.fromhex(pair_id[2:])).call()
+        _, values = await chain_cache.read(
+            [vault.functions.pairExposure(bytes.fromhex(pair_id[2:])) for pair_id in pairs]
+        )
 
+        exposures = []
+        for pair_id, exposure in zip(pairs, values):
             exposures.append(VaultExposure(
                 vault_id=vault_id,
                 pair_id=pair_id,
@@ -287,7 +360,6 @@ async def get_vault_exposure(vault_id: int, vault_address: str):
                 utilization_bps=0
             ))
 
-        conn.close()
         return exposures
 
     except psycopg2.Error as e:
@@ -309,44 +381,32 @@ async def get_vault_pnl(vault_id: int, token: str):
         Comprehensive P&L breakdown including deposits, withdrawals, losses, and fees
     """
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT
-                    COALESCE(SUM(d.amount), 0) as total_deposited,
-                    COALESCE(SUM(w.amount), 0) as total_withdrawn,
-                    COALESCE(SUM(dep.amount), 0) as total_deployed,
-                    COALESCE(SUM(l.loss), 0) as total_losses,
-                    COALESCE(SUM(pf.fee_amount), 0) as total_performance_fees,
-                    COALESCE(SUM(mf.fee_amount), 0) as total_management_fees
-                FROM
-                    (SELECT %s as vault_id, %s as token) AS v
-                LEFT JOIN deposits d ON d.vault_id = v.vault_id AND d.token = v.token
-                LEFT JOIN withdrawals w ON w.vault_id = v.vault_id AND w.token = v.token
-                LEFT JOIN deployments dep ON dep.vault_id = v.vault_id AND dep.token = v.token
-                LEFT JOIN losses l ON l.vault_id = v.vault_id AND l.token = v.token
-                LEFT JOIN performance_fees pf ON pf.vault_id = v.vault_id AND pf.token = v.token
-                LEFT JOIN management_fees mf ON mf.vault_id = v.vault_id AND mf.token = v.token
-            """, (vault_id, token))
-
-            row = cur.fetchone()
-
-        total_deposited = int(row['total_deposited'] or 0)
-        total_withdrawn = int(row['total_withdrawn'] or 0)
-        total_losses = int(row['total_losses'] or 0)
-        total_perf_fees = int(row['total_performance_fees'] or 0)
-        total_mgmt_fees = int(row['total_management_fees'] or 0)
+        row = await db_pool.run(query_one, """
+            SELECT
+                total_deposited,
+                total_withdrawn,
+                total_deployed,
+                total_losses,
+                total_performance_fees,
+                total_management_fees
+            FROM vault_totals
+            WHERE vault_id = %s AND token = %s
+        """, (vault_id, token)) or {}
+
+        total_deposited = int(row.get('total_deposited') or 0)
+        total_withdrawn = int(row.get('total_withdrawn') or 0)
+        total_losses = int(row.get('total_losses') or 0)
+        total_perf_fees = int(row.get('total_performance_fees') or 0)
+        total_mgmt_fees = int(row.get('total_management_fees') or 0)
 
         net_pnl = total_deposited - total_withdrawn - total_losses - total_perf_fees - total_mgmt_fees
 
-        conn.close()
-
         return VaultPnL(
             vault_id=vault_id,
             token=token,
             total_deposited=str(total_deposited),
             total_withdrawn=str(total_withdrawn),
-            total_deployed=str(row['total_deployed'] or 0),
+            total_deployed=str(int(row.get('total_deployed') or 0)),
             total_losses=str(total_losses),
             total_performance_fees=str(total_perf_fees),
             total_management_fees=str(total_mgmt_fees),
@@ -377,20 +437,15 @@ async def get_risk_status(pair_id: str, risk_controller_address: str):
 
         risk = w3.eth.contract(address=Web3.to_checksum_address(risk_controller_address), abi=risk_abi)
 
-        circuit_broken = risk.functions.pairCircuitBroken(bytes.fromhex(pair_id[2:])).call()
-
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT peg_deviation, orderbook_depth_bid, orderbook_depth_ask, block_timestamp
-                FROM oracle_updates
-                WHERE pair_id = %s
-                ORDER BY block_timestamp DESC
-                LIMIT 1
-            """, (pair_id,))
-            latest = cur.fetchone()
+        circuit_broken = await chain_cache.call(risk.functions.pairCircuitBroken(bytes.fromhex(pair_id[2:])))
 
-        conn.close()
+        latest = await db_pool.run(query_one, """
+            SELECT peg_deviation, orderbook_depth_bid, orderbook_depth_ask, block_timestamp
+            FROM oracle_updates
+            WHERE pair_id = %s
+            ORDER BY block_timestamp DESC
+            LIMIT 1
+        """, (pair_id,))
 
         return RiskStatus(
             pair_id=pair_id,
@@ -408,15 +463,22 @@ async def get_risk_status(pair_id: str, risk_controller_address: str):
 
 
 @app.get("/api/v1/events/{vault_id}/{event_type}", tags=["Events"])
-async def get_events(vault_id: int, event_type: str, limit: int = 100, offset: int = 0):
+async def get_events(vault_id: int, event_type: str, response: Response, limit: int = 100,
+                     offset: int = 0, cursor: Optional[str] = None):
     """
     Get historical events for a vault
 
+    Pages are keyset-paginated on (block_timestamp, id): pass the
+    X-Next-Cursor header of one response as ?cursor= to get the next page.
+    The header is absent on the last page. offset is still accepted for
+    existing callers but costs O(offset) per page.
+
     Args:
         vault_id: Vault identifier
         event_type: Event type (deposits, withdrawals, deployments, recalls, losses)
-        limit: Maximum number of events to return (default: 100)
-        offset: Pagination offset (default: 0)
+        limit: Maximum number of events to return (default: 100; larger values are capped at 1000)
+        offset: Pagination offset, ignored when cursor is given (default: 0)
+        cursor: Opaque cursor from X-Next-Cursor
 
     Returns:
         List of events ordered by block timestamp descending
@@ -430,18 +492,33 @@ async def get_events(vault_id: int, event_type: str, limit: int = 100, offset: i
                 {"valid_types": valid_types},
                 status_code=400
             )
+        if limit < 1:
+            raise structured_error("validation_error", "limit must be at least 1", status_code=400)
+        # Capped rather than rejected: callers passing more than 1000 were accepted before keyset paging
+        limit = min(limit, 1000)
 
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute(f"""
+        if cursor:
+            try:
+                after_timestamp, after_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise structured_error("validation_error", str(e), status_code=400)
+            # Served by idx_<table>_vault_time: (vault_id, block_timestamp DESC, id DESC)
+            events = await db_pool.run(query_all, f"""
+                SELECT * FROM {event_type}
+                WHERE vault_id = %s AND (block_timestamp, id) < (%s, %s)
+                ORDER BY block_timestamp DESC, id DESC
+                LIMIT %s
+            """, (vault_id, after_timestamp, after_id, limit))
+        else:
+            events = await db_pool.run(query_all, f"""
                 SELECT * FROM {event_type}
                 WHERE vault_id = %s
-                ORDER BY block_timestamp DESC
+                ORDER BY block_timestamp DESC, id DESC
                 LIMIT %s OFFSET %s
             """, (vault_id, limit, offset))
-            events = cur.fetchall()
 
-        conn.close()
+        if len(events) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(events[-1])
         return events
 
     except HTTPException:
@@ -452,6 +529,222 @@ async def get_events(vault_id: int, event_type: str, limit: int = 100, offset: i
         raise structured_error("internal_error", "Failed to fetch events", str(e))
 
 
+def export_query(event_type, vault_id=None, from_block=None, to_block=None):
+    """
+    SELECT for an export: the table's rows with their event's block, transaction and log index, in chain order
+
+    A LEFT JOIN, since the retention policy (partitions.py) archives old
+    events partitions but keeps the typed rows: those come first, with a
+    null block_number, transaction_hash and log_index.
+    """
+    conditions, params = [], []
+    if vault_id is not None:
+        conditions.append("t.vault_id = %s")
+        params.append(vault_id)
+    if from_block is not None:
+        conditions.append("e.block_number >= %s")
+        params.append(from_block)
+    if to_block is not None:
+        conditions.append("e.block_number <= %s")
+        params.append(to_block)
+    return f"""
+        SELECT t.*, e.block_number, e.transaction_hash, e.log_index
+        FROM {event_type} t LEFT JOIN events e ON e.id = t.event_id
+        WHERE {" AND ".join(conditions) or "TRUE"}
+        ORDER BY e.block_number NULLS FIRST, e.log_index, t.id
+    """, params
+
+
+def archived_before(conn, event_type, vault_id=None, from_block=None):
+    """
+    First block still in events if rows of event_type at or after from_block may have lost their event, else None
+
+    Rows whose events partition was archived have no block number, so a
+    block range cannot tell whether they belong in it. Ranges starting at
+    or after the oldest block still in events are unaffected; otherwise the
+    table is checked for rows without an event.
+    """
+    first_block = query_one(conn, "SELECT MIN(block_number) AS block FROM events")['block']
+    if first_block is not None and from_block is not None and from_block >= first_block:
+        return None
+    condition, params = ("AND t.vault_id = %s", [vault_id]) if vault_id is not None else ("", [])
+    orphaned = query_one(conn, f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {event_type} t
+            WHERE NOT EXISTS (SELECT 1 FROM events e WHERE e.id = t.event_id) {condition}
+        ) AS orphaned
+    """, params)['orphaned']
+    return (first_block or 0) if orphaned else None
+
+
+def export_value(value):
+    """Column value as exported: amounts as exact integer strings, timestamps in ISO 8601"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(sql, params, export_format, compress):
+    """
+    Body chunks of an export, read from a server-side (named) cursor
+
+    A plain generator: Starlette iterates it in its threadpool, so every
+    fetch blocks a worker thread rather than the event loop. Memory is one
+    batch of rows plus the gzip window however many rows are exported. The
+    export_pool connection is held until the last chunk is sent, and
+    released if the client goes away first. The first chunk is always
+    empty, yielded once the query has run, so the caller can take it
+    before sending a status and turn PoolTimeout or a query error into one.
+    """
+    # wbits 31: gzip container rather than raw zlib
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text):
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    with export_pool.connection() as conn:
+        with conn.cursor(name="export", cursor_factory=psycopg2.extensions.cursor) as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchmany(EXPORT_BATCH_ROWS)
+            yield b""
+            # A named cursor only has a description after its first fetch
+            columns = [d[0] for d in cur.description]
+            buffer = io.StringIO()
+            if export_format == "csv":
+                csv.writer(buffer).writerow(columns)
+            while True:
+                if export_format == "csv":
+                    csv.writer(buffer).writerows([export_value(v) for v in row] for row in rows)
+                else:
+                    for row in rows:
+                        buffer.write(json.dumps(dict(zip(columns, map(export_value, row)))))
+                        buffer.write("\n")
+                chunk = encode(buffer.getvalue())
+                if chunk:
+                    yield chunk
+                if not rows:
+                    break
+                rows = cur.fetchmany(EXPORT_BATCH_ROWS)
+                buffer = io.StringIO()
+    if compressor:
+        yield compressor.flush()
+
+
+class ExportBody:
+    """
+    export_rows() as a response body that is closed as soon as the response ends
+
+    Starlette leaves the body iterator of an abandoned download to the
+    garbage collector, which can keep its export connection checked out for
+    seconds. close() runs as the response's background task, which Starlette
+    also runs when the client went away; it waits for a fetch in progress.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self.lock:
+            return next(self.rows)
+
+    def close(self):
+        with self.lock:
+            self.rows.close()
+
+
+@app.get("/api/v1/export/{event_type}", tags=["Events"])
+async def export_events(event_type: str, request: Request, format: str = "ndjson",
+                        from_block: Optional[int] = None, to_block: Optional[int] = None,
+                        vault_id: Optional[int] = None):
+    """
+    Stream every row of an event table as NDJSON or CSV in one response
+
+    Rows come in chain order (block, log index) from a server-side cursor,
+    EXPORT_BATCH_ROWS at a time, so the API's memory stays flat for any
+    number of rows. The body is gzip-compressed when the request sends
+    Accept-Encoding: gzip. At most EXPORT_POOL_MAX exports run at once, on
+    connections of their own; another one waits DB_POOL_TIMEOUT for a free
+    connection and then gets 503. The status is sent once the query has
+    returned its first rows: a database error later in the export ends the
+    response without its final chunk, which HTTP clients report as an
+    incomplete body.
+
+    Rows whose event was archived by the retention policy are exported with
+    a null block_number, transaction_hash and log_index. A block range that
+    could include such rows is rejected with 409 rather than exported short:
+    start it at the first retained block, or export without a range.
+
+    Args:
+        event_type: Table to export (vault tables and oracle_updates, circuit_breakers)
+        format: ndjson (default) or csv (with a header row)
+        from_block: First block to include (default: from the start)
+        to_block: Last block to include (default: to the indexed tip)
+        vault_id: Only this vault's rows (vault tables only)
+
+    Returns:
+        One JSON object or CSV line per row, with the event's block_number, transaction_hash and log_index
+    """
+    valid_types = EXPORT_VAULT_TABLES + EXPORT_PAIR_TABLES
+    if event_type not in valid_types:
+        raise structured_error(
+            "validation_error",
+            f"Invalid event type: {event_type}",
+            {"valid_types": valid_types},
+            status_code=400
+        )
+    if format not in ("ndjson", "csv"):
+        raise structured_error("validation_error", "format must be ndjson or csv", status_code=400)
+    if vault_id is not None and event_type not in EXPORT_VAULT_TABLES:
+        raise structured_error("validation_error", f"{event_type} has no vault_id", status_code=400)
+    if from_block is not None and to_block is not None and from_block > to_block:
+        raise structured_error("validation_error", "from_block must not be after to_block", status_code=400)
+
+    if from_block is not None or to_block is not None:
+        try:
+            first_block = await db_pool.run(archived_before, event_type, vault_id, from_block)
+        except psycopg2.Error as e:
+            raise structured_error("database_error", "Failed to check archived events", str(e))
+        if first_block is not None:
+            raise structured_error(
+                "archived_range",
+                f"Events before block {first_block} are archived; their {event_type} rows have no block number "
+                f"to filter on. Use from_block >= {first_block}, or export without a block range",
+                {"first_retained_block": first_block},
+                status_code=409
+            )
+
+    sql, params = export_query(event_type, vault_id, from_block, to_block)
+    compress = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "Content-Disposition": f'attachment; filename="{event_type}.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    body = ExportBody(export_rows(sql, params, format, compress))
+    try:
+        await asyncio.to_thread(next, body)
+    except PoolTimeout:
+        raise structured_error("export_busy", f"{EXPORT_POOL_MAX} exports are already running; retry later",
+                               status_code=503)
+    except psycopg2.Error as e:
+        raise structured_error("database_error", "Failed to start export", str(e))
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson" if format == "ndjson" else "text/csv",
+        headers=headers,
+        background=BackgroundTask(body.close)
+    )
+
+
 @app.get("/api/v1/strategy/{strategy_address}/orders/{pair_id}",
          response_model=ActiveOrdersResponse,
          tags=["Strategy"])
@@ -550,37 +843,57 @@ async def get_protocol_stats():
         raise structured_error("internal_error", "Failed to fetch stats", str(e))
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+@app.get("/api/v1/cache/stats", tags=["System"])
+async def get_cache_stats():
+    """
+    On-chain read cache statistics
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+    Returns:
+        Hit/miss/coalesced counters, evictions, current size and the last observed head block
+    """
+    return chain_cache.status()
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
 
+@app.get("/api/v1/ws/stats", tags=["System"])
+async def get_ws_stats():
+    """
+    WebSocket fan-out statistics
 
-manager = ConnectionManager()
+    Returns:
+        Subscriber count, published batches/events, deepest client queue and dropped slow clients
+    """
+    return fanout.status()
 
 
 @app.websocket("/ws/events")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time event updates"""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, vault_id: Optional[str] = None,
+                             pair_id: Optional[str] = None, event_type: Optional[str] = None):
+    """
+    WebSocket endpoint for real-time event updates
+
+    Events are pushed as {"type": "events", "events": [...]} when the indexer
+    commits them. Optional comma-separated filters: ?vault_id=1,2&pair_id=0x..
+    &event_type=Deposited,Withdrawn. Send {"vault_id": ..., "pair_id": ...,
+    "event_type": ...} at any time to replace the filters.
+    """
+    await websocket.accept()
+    try:
+        subscriber = await fanout.subscribe(websocket, vault_ids=vault_id, pair_ids=pair_id, event_types=event_type)
+    except ValueError:
+        await websocket.close(code=1008, reason="vault_id must be a comma-separated list of integers")
+        return
+
     try:
         while True:
-            await asyncio.sleep(1)
+            try:
+                message = json.loads(await websocket.receive_text())
+                subscriber.set_filters(message.get("vault_id"), message.get("pair_id"), message.get("event_type"))
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "message": "expected a JSON object of filters"})
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        await fanout.unsubscribe(subscriber)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""
+Benchmark: OFFSET vs keyset pagination of a vault's event history
+Seeds a throwaway deposits table and times page 1 and a deep page with both query shapes
+
+Usage: INDEXER_DB_URL=postgresql://localhost:5432/tempovault_bench python bench_events_pagination.py [rows] [deep_page]
+
+Run against a scratch database: the deposits table is truncated and reseeded.
+"""
+
+import os
+import statistics
+import sys
+import time
+import psycopg2
+
+DB_URL = os.getenv("INDEXER_DB_URL", "postgresql://localhost:5432/tempovault_bench")
+PAGE_SIZE = 100
+VAULT_ID = 1
+REPEATS = 20
+
+OFFSET_QUERY = """
+    SELECT * FROM deposits
+    WHERE vault_id = %s
+    ORDER BY block_timestamp DESC, id DESC
+    LIMIT %s OFFSET %s
+"""
+
+KEYSET_QUERY = """
+    SELECT * FROM deposits
+    WHERE vault_id = %s AND (block_timestamp, id) < (%s, %s)
+    ORDER BY block_timestamp DESC, id DESC
+    LIMIT %s
+"""
+
+
+def seed(conn, rows):
+    """rows deposits in VAULT_ID's history, two per second so the id tiebreak matters"""
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE deposits")
+        cur.execute("""
+            INSERT INTO deposits (vault_id, token, amount, depositor, new_balance, block_timestamp)
+            SELECT %s,
+                   '0x20c0000000000000000000000000000000000001',
+                   (n %% 1000 + 1) * 1000000,
+                   '0x' || lpad(to_hex(n %% 5000), 40, '0'),
+                   n * 1000000,
+                   timestamp '2024-01-01' + (n / 2) * interval '1 second'
+            FROM generate_series(1, %s::bigint) AS n
+        """, (VAULT_ID, rows))
+        cur.execute("ANALYZE deposits")
+    conn.commit()
+
+
+def timed(cur, sql, params):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), rows
+
+
+def cursor_for_page(cur, page):
+    """(block_timestamp, id) of the last row before page; page 1 starts after +infinity"""
+    if page == 1:
+        return ("infinity", 2 ** 63 - 1)
+    cur.execute("""
+        SELECT block_timestamp, id FROM deposits
+        WHERE vault_id = %s
+        ORDER BY block_timestamp DESC, id DESC
+        LIMIT 1 OFFSET %s
+    """, (VAULT_ID, (page - 1) * PAGE_SIZE - 1))
+    return cur.fetchone()
+
+
+def explain(cur, sql, params):
+    cur.execute("EXPLAIN " + sql, params)
+    return "\n  ".join(row[0] for row in cur.fetchall())
+
+
+def main(rows, deep_page):
+    conn = psycopg2.connect(DB_URL)
+    cur = conn.cursor()
+    cur.execute("SELECT count(*) FROM deposits")
+    if cur.fetchone()[0] != rows:
+        print(f"Seeding {rows:,} deposits...", flush=True)
+        started = time.time()
+        seed(conn, rows)
+        print(f"Seeded in {time.time() - started:.1f}s", flush=True)
+
+    results = {}
+    for page in (1, deep_page):
+        after_timestamp, after_id = cursor_for_page(cur, page)
+        offset_ms, offset_rows = timed(cur, OFFSET_QUERY, (VAULT_ID, PAGE_SIZE, (page - 1) * PAGE_SIZE))
+        keyset_ms, keyset_rows = timed(cur, KEYSET_QUERY, (VAULT_ID, after_timestamp, after_id, PAGE_SIZE))
+        assert offset_rows == keyset_rows, f"page {page}: keyset and offset pages differ"
+        results[page] = (offset_ms, keyset_ms)
+        print(f"page {page:>6,}: OFFSET {offset_ms:8.2f}ms   keyset {keyset_ms:6.2f}ms   (median of {REPEATS})")
+
+    print("\nKeyset plan:\n  " + explain(cur, KEYSET_QUERY, (VAULT_ID, "infinity", 0, PAGE_SIZE)))
+    print(f"\nDeep page / page 1: OFFSET x{results[deep_page][0] / results[1][0]:.0f}, "
+          f"keyset x{results[deep_page][1] / results[1][1]:.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    deep_page = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    if rows < deep_page * PAGE_SIZE:
+        print(f"Need at least {deep_page * PAGE_SIZE:,} rows to reach page {deep_page:,}")
+        sys.exit(1)
+    main(rows, deep_page)
@@ -0,0 +1,162 @@
+"""
+Micro-benchmark: web3 process_log dispatch vs compiled DecoderRegistry
+Decodes a synthetic set of TempoVault/RiskController logs and reports logs/sec
+
+Usage: python bench_log_decoder.py [num_logs]
+"""
+
+import random
+import sys
+import time
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from log_decoder import DecoderRegistry, event_topic
+
+VAULT_ADDRESS = "0x599967eDC2dc6F692CA37c09693eDD7DDfe8c66D"
+RISK_CONTROLLER_ADDRESS = "0xa5bec93b07b70e91074A24fB79C5EA8aF639a639"
+
+
+def _input(name, abi_type, indexed=False, components=None):
+    abi_input = {"name": name, "type": abi_type, "indexed": indexed}
+    if components:
+        abi_input["components"] = components
+    return abi_input
+
+
+VAULT_EVENTS = [
+    {"type": "event", "name": "Deposited", "anonymous": False, "inputs": [
+        _input("vaultId", "uint256", True), _input("token", "address", True), _input("amount", "uint256"),
+        _input("depositor", "address", True), _input("newBalance", "uint256")]},
+    {"type": "event", "name": "Withdrawn", "anonymous": False, "inputs": [
+        _input("vaultId", "uint256", True), _input("token", "address", True), _input("amount", "uint256"),
+        _input("recipient", "address", True), _input("newBalance", "uint256")]},
+    {"type": "event", "name": "PerformanceFeeAccrued", "anonymous": False, "inputs": [
+        _input("vaultId", "uint256", True), _input("token", "address", True),
+        _input("yieldAmount", "uint256"), _input("feeAmount", "uint256")]},
+]
+
+RISK_EVENTS = [
+    {"type": "event", "name": "OracleSignalUpdated", "anonymous": False, "inputs": [
+        _input("_pairId", "bytes32", True),
+        _input("signal", "tuple", components=[
+            _input("referenceTick", "int16"), _input("pegDeviation", "uint256"),
+            _input("orderbookDepthBid", "uint256"), _input("orderbookDepthAsk", "uint256"),
+            _input("timestamp", "uint256"), _input("nonce", "uint256")]),
+        _input("nonce", "uint256")]},
+    {"type": "event", "name": "CircuitBreakerTriggered", "anonymous": False, "inputs": [
+        _input("_pairId", "bytes32", True), _input("triggeredBy", "address", True)]},
+]
+
+CONTRACTS = {
+    VAULT_ADDRESS: ("TreasuryVault", VAULT_EVENTS),
+    RISK_CONTROLLER_ADDRESS: ("RiskController", RISK_EVENTS),
+}
+
+
+def _word(value):
+    return HexBytes(value.to_bytes(32, "big"))
+
+
+def _address_word(address):
+    return HexBytes(b"\x00" * 12 + bytes.fromhex(address[2:]))
+
+
+def synthetic_logs(count, seed=7):
+    """Random mix of vault and risk controller logs shaped like eth_getLogs results"""
+    rng = random.Random(seed)
+    tokens = [Web3.to_checksum_address(f"0x20c0{i:036x}") for i in range(4)]
+    topics = {e["name"]: HexBytes(event_topic(e)) for e in VAULT_EVENTS + RISK_EVENTS}
+    logs = []
+    for i in range(count):
+        kind = rng.choice(["Deposited", "Withdrawn", "PerformanceFeeAccrued", "OracleSignalUpdated",
+                           "CircuitBreakerTriggered"])
+        vault_id = rng.randint(1, 20)
+        token = rng.choice(tokens)
+        if kind in ("Deposited", "Withdrawn"):
+            address = VAULT_ADDRESS
+            topic_list = [topics[kind], _word(vault_id), _address_word(token), _address_word(tokens[0])]
+            data = encode(["uint256", "uint256"], [rng.randint(1, 10 ** 24), rng.randint(1, 10 ** 24)])
+        elif kind == "PerformanceFeeAccrued":
+            address = VAULT_ADDRESS
+            topic_list = [topics[kind], _word(vault_id), _address_word(token)]
+            data = encode(["uint256", "uint256"], [rng.randint(1, 10 ** 20), rng.randint(1, 10 ** 19)])
+        elif kind == "OracleSignalUpdated":
+            address = RISK_CONTROLLER_ADDRESS
+            topic_list = [topics[kind], HexBytes(bytes([vault_id]) * 32)]
+            signal = (rng.randint(-2000, 2000), rng.randint(0, 50), rng.randint(0, 10 ** 24),
+                      rng.randint(0, 10 ** 24), 1_700_000_000 + i, i + 1)
+            data = encode(["(int16,uint256,uint256,uint256,uint256,uint256)", "uint256"], [signal, i + 1])
+        else:
+            address = RISK_CONTROLLER_ADDRESS
+            topic_list = [topics[kind], HexBytes(bytes([vault_id]) * 32), _address_word(tokens[1])]
+            data = b""
+
+        logs.append(AttributeDict({
+            "address": address,
+            "topics": topic_list,
+            "data": HexBytes(data),
+            "blockNumber": 1_000_000 + i // 10,
+            "blockHash": HexBytes(b"\x01" * 32),
+            "transactionHash": HexBytes(Web3.keccak(text=str(i))),
+            "transactionIndex": 0,
+            "logIndex": i % 10,
+            "removed": False,
+        }))
+    return logs
+
+
+def bench_web3(logs):
+    """Baseline: per-log address list rebuild + topic0 hex lookup + event_obj.process_log"""
+    w3 = Web3()
+    event_decoders = {}
+    for address, (_, abi) in CONTRACTS.items():
+        contract = w3.eth.contract(address=address, abi=abi)
+        for event_abi in abi:
+            event_obj = getattr(contract.events, event_abi["name"])()
+            event_decoders["0x" + event_topic(event_abi).hex()] = event_obj
+
+    started = time.perf_counter()
+    decoded = 0
+    for log in logs:
+        if log["address"].lower() not in [addr.lower() for addr in CONTRACTS.keys()]:
+            continue
+        event_obj = event_decoders.get(Web3.to_hex(log["topics"][0]))
+        if event_obj is None:
+            continue
+        dict(event_obj.process_log(log)["args"])
+        decoded += 1
+    return decoded, time.perf_counter() - started
+
+
+def bench_registry(logs):
+    """Compiled: frozenset address check + (address, topic0) lookup + specialized decoder"""
+    registry = DecoderRegistry(CONTRACTS)
+
+    started = time.perf_counter()
+    decoded = 0
+    for log in logs:
+        if log["address"].lower() not in registry.addresses:
+            continue
+        decoder = registry.lookup(log["address"], log["topics"][0])
+        if decoder is None:
+            continue
+        decoder.decode(log["topics"], log["data"])
+        decoded += 1
+    return decoded, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"Generating {count} synthetic logs...")
+    logs = synthetic_logs(count)
+
+    before_count, before_elapsed = bench_web3(logs)
+    after_count, after_elapsed = bench_registry(logs)
+
+    before_rate = before_count / before_elapsed
+    after_rate = after_count / after_elapsed
+    print(f"web3 process_log:   {before_count} logs in {before_elapsed:.2f}s ({before_rate:,.0f} logs/sec)")
+    print(f"DecoderRegistry:    {after_count} logs in {after_elapsed:.2f}s ({after_rate:,.0f} logs/sec)")
+    print(f"Speedup: {after_rate / before_rate:.1f}x")
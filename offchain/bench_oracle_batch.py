@@ -0,0 +1,100 @@
+"""
+Gas benchmark: one updateOracleSignal transaction per pair vs one OracleSignalBatcher transaction for all pairs
+Deploys GovernanceRoles, RiskController and OracleSignalBatcher on anvil, then submits signed updates for
+N pairs both ways; the first round writes fresh storage slots, the second updates existing ones
+
+Usage:
+    forge build && anvil &
+    python bench_oracle_batch.py [pair counts, comma-separated]
+"""
+import json
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from eth_account import Account
+from web3 import Web3
+
+RPC_URL = os.getenv("RPC_URL", "http://localhost:8545")
+# Anvil's second dev account signs and sends the oracle updates
+ORACLE_KEY = "0x59c6995e998f97a5a0044966f0945389dc9c86dae88c7a8412f4603b6b78690d"
+# Same values as script/Deploy.s.sol
+RISK_PARAMS = (3000, 200, 9000, 50000 * 10 ** 18, 2000, 300, 100, 100000 * 10 ** 18)
+
+
+def rpc(w3, method, params):
+    response = w3.provider.make_request(method, params)
+    if "error" in response:
+        raise RuntimeError(f"{method}: {response['error']}")
+    return response["result"]
+
+
+def load_artifact(name):
+    with open(f"../out/{name}.sol/{name}.json") as f:
+        return json.load(f)
+
+
+def deploy(w3, name, *args):
+    artifact = load_artifact(name)
+    factory = w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bytecode"]["object"])
+    receipt = w3.eth.wait_for_transaction_receipt(factory.constructor(*args).transact({"from": w3.eth.accounts[0]}))
+    return w3.eth.contract(address=receipt.contractAddress, abi=artifact["abi"])
+
+
+def signed_updates(oracle_relay, pair_ids):
+    """Next signal for each pair, timestamped at the latest block so every round is monotonic"""
+    oracle_relay.w3.provider.make_request("evm_increaseTime", [1])
+    oracle_relay.w3.provider.make_request("evm_mine", [])
+    timestamp = oracle_relay.w3.eth.get_block("latest")["timestamp"]
+    updates = []
+    for pair_id in pair_ids:
+        dex_data = {"referenceTick": -12, "pegDeviation": 1, "orderbookDepthBid": 10 ** 23,
+                    "orderbookDepthAsk": 10 ** 23, "timestamp": timestamp}
+        signal = oracle_relay.build_signal(dex_data, oracle_relay.get_current_nonce(pair_id))
+        updates.append((pair_id, signal, oracle_relay.sign_oracle_signal(pair_id, signal)))
+    return updates
+
+
+def single_round(oracle_relay, pair_ids):
+    """Total gas of one updateOracleSignal transaction per pair"""
+    hashes = [oracle_relay.send_oracle_signal(*update) for update in signed_updates(oracle_relay, pair_ids)]
+    receipts = [oracle_relay.w3.eth.wait_for_transaction_receipt(h) for h in hashes]
+    assert all(receipt["status"] == 1 for receipt in receipts)
+    return sum(receipt["gasUsed"] for receipt in receipts)
+
+
+def batch_round(oracle_relay, pair_ids):
+    """Gas of one updateOracleSignals transaction carrying every pair"""
+    tx_hash = oracle_relay.send_oracle_batch(signed_updates(oracle_relay, pair_ids))
+    receipt = oracle_relay.w3.eth.wait_for_transaction_receipt(tx_hash)
+    assert all(oracle_relay.batch_results(receipt, len(pair_ids))), "an update in the batch was rejected"
+    return receipt["gasUsed"]
+
+
+if __name__ == "__main__":
+    pair_counts = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1, 5, 10, 30]
+
+    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    oracle = Account.from_key(ORACLE_KEY)
+    governance = deploy(w3, "GovernanceRoles", w3.eth.accounts[0])
+    risk_controller = deploy(w3, "RiskController", governance.address, RISK_PARAMS)
+    batcher = deploy(w3, "OracleSignalBatcher", risk_controller.address)
+    w3.eth.wait_for_transaction_receipt(governance.functions.grantRole(
+        governance.functions.ORACLE_ROLE().call(), oracle.address
+    ).transact({"from": w3.eth.accounts[0]}))
+    print(f"RiskController {risk_controller.address}, OracleSignalBatcher {batcher.address}")
+
+    # oracle_relay reads its configuration at import
+    os.environ.update({"RPC_URL": RPC_URL, "ORACLE_PRIVATE_KEY": ORACLE_KEY,
+                       "RISK_CONTROLLER_ADDRESS": risk_controller.address, "ORACLE_BATCHER_ADDRESS": batcher.address})
+    import oracle_relay
+
+    print(f"\n{'pairs':>5} {'round':>6} {'single gas/upd':>15} {'batch gas/upd':>14} {'saved':>7}")
+    for count in pair_counts:
+        single_pairs = [Web3.to_hex(Web3.keccak(text=f"single-{count}-{i}")) for i in range(count)]
+        batch_pairs = [Web3.to_hex(Web3.keccak(text=f"batch-{count}-{i}")) for i in range(count)]
+        for label in ("first", "steady"):
+            single = single_round(oracle_relay, single_pairs) / count
+            batched = batch_round(oracle_relay, batch_pairs) / count
+            print(f"{count:>5} {label:>6} {single:>15,.0f} {batched:>14,.0f} {1 - batched / single:>7.1%}")
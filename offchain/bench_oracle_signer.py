@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: OracleSigner vs the generic encode_structured_data path for OracleUpdate signatures
+Signs random signals both ways, checks the signatures are byte-identical, and reports signatures/sec
+(the generic path here gets the chain ID as a constant; sign_oracle_signal used to fetch it over RPC each time)
+
+Usage: python bench_oracle_signer.py [num_signatures]
+"""
+
+import random
+import sys
+import time
+from eth_account import Account
+from eth_account.messages import encode_structured_data
+from web3 import Web3
+from oracle_signer import OracleSigner
+
+# Anvil's first dev account and RiskController address on a fresh anvil
+PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+RISK_CONTROLLER_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+CHAIN_ID = 42431
+
+
+def sign_structured(account, chain_id, pair_id, signal):
+    """The previous sign_oracle_signal body: full types/domain dict through encode_structured_data"""
+    structured_data = {
+        "types": {
+            "EIP712Domain": [
+                {"name": "name", "type": "string"},
+                {"name": "version", "type": "string"},
+                {"name": "chainId", "type": "uint256"},
+                {"name": "verifyingContract", "type": "address"}
+            ],
+            "OracleUpdate": [
+                {"name": "pairId", "type": "bytes32"},
+                {"name": "referenceTick", "type": "int16"},
+                {"name": "pegDeviation", "type": "uint256"},
+                {"name": "orderbookDepthBid", "type": "uint256"},
+                {"name": "orderbookDepthAsk", "type": "uint256"},
+                {"name": "timestamp", "type": "uint256"},
+                {"name": "nonce", "type": "uint256"}
+            ]
+        },
+        "domain": {
+            "name": "TempoVaultRiskController",
+            "version": "1",
+            "chainId": chain_id,
+            "verifyingContract": RISK_CONTROLLER_ADDRESS
+        },
+        "primaryType": "OracleUpdate",
+        "message": {"pairId": Web3.to_bytes(hexstr=pair_id), **signal}
+    }
+    return account.sign_message(encode_structured_data(structured_data)).signature.hex()
+
+
+def random_signals(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        ("0x" + rng.randbytes(32).hex(), {
+            "referenceTick": rng.randint(-2 ** 15, 2 ** 15 - 1),
+            "pegDeviation": rng.randint(0, 3000),
+            "orderbookDepthBid": rng.randint(0, 2 ** 128 - 1),
+            "orderbookDepthAsk": rng.randint(0, 2 ** 128 - 1),
+            "timestamp": rng.randint(1_700_000_000, 1_900_000_000),
+            "nonce": rng.randint(1, 2 ** 64),
+        })
+        for _ in range(count)
+    ]
+
+
+def rate(sign, signals):
+    started = time.perf_counter()
+    signatures = [sign(pair_id, signal) for pair_id, signal in signals]
+    return signatures, len(signals) / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    account = Account.from_key(PRIVATE_KEY)
+    signer = OracleSigner(PRIVATE_KEY, CHAIN_ID, RISK_CONTROLLER_ADDRESS)
+    signals = random_signals(count)
+
+    generic, generic_rate = rate(lambda pair_id, signal: sign_structured(account, CHAIN_ID, pair_id, signal), signals)
+    cached, cached_rate = rate(signer.sign, signals)
+
+    mismatches = sum(a != b for a, b in zip(generic, cached))
+    print(f"secp256k1 backend: {type(signer.key.backend).__name__}")
+    print(f"encode_structured_data: {generic_rate:>9,.0f} signatures/sec")
+    print(f"OracleSigner:           {cached_rate:>9,.0f} signatures/sec ({cached_rate / generic_rate:.1f}x)")
+    print(f"{count - mismatches}/{count} signatures byte-identical")
+    sys.exit(1 if mismatches else 0)
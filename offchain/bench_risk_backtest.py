@@ -0,0 +1,74 @@
+"""
+Benchmark: risk_backtest over a year of per-minute oracle signals and the default 10,000-set grid
+Compares the histogram scan with replaying a sample of parameter sets minute by minute (extrapolated
+to the full grid), and checks the sampled sets agree
+
+Usage: python bench_risk_backtest.py [pairs] [sampled_sets]
+"""
+
+import sys
+import time
+import numpy as np
+import risk_backtest
+
+YEAR_MINUTES = 365 * 24 * 60
+START = 1_735_689_600
+
+
+def year_of_signals(seed):
+    """One update a minute (with jitter and occasional outages) for a year, and a few recorded breaker trips"""
+    rng = np.random.default_rng(seed)
+    gaps = np.where(rng.random(YEAR_MINUTES) < 0.002, rng.integers(300, 3600, YEAR_MINUTES), rng.integers(45, 75, YEAR_MINUTES))
+    times = START + np.cumsum(gaps)
+    times = times[times < START + YEAR_MINUTES * 60]
+    peg = np.abs(np.cumsum(rng.normal(0, 3, len(times))) % 400 - 200)
+    depth = rng.lognormal(np.log(2e6), 1.2, len(times))
+    trigger_times = np.sort(rng.choice(times, 12, replace=False))
+    breakers = {
+        "time": np.ravel(np.column_stack((trigger_times, trigger_times + 3600))),
+        "triggered": np.tile([True, False], len(trigger_times)),
+    }
+    return {"time": times, "peg": peg, "depth": depth}, breakers
+
+
+def replay(history, max_peg, min_depth, staleness, covered):
+    """One parameter set, minute by minute"""
+    minutes, peg, depth, age = risk_backtest.minute_series(history["time"], history["peg"], history["depth"])
+    in_breach = (peg > max_peg) | (depth < min_depth) | (age > staleness)
+    onsets = in_breach & ~np.concatenate(([False], in_breach[:-1]))
+    return onsets.sum(), (onsets & ~covered).sum(), in_breach.sum()
+
+
+if __name__ == "__main__":
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    grid = risk_backtest.DEFAULT_GRID
+    grid_size = int(np.prod([len(values) for values in grid.values()]))
+
+    data = [year_of_signals(seed) for seed in range(pairs)]
+    updates = {f"pair{n}": history for n, (history, _) in enumerate(data)}
+    breakers = {f"pair{n}": breaker_history for n, (_, breaker_history) in enumerate(data)}
+
+    started = time.perf_counter()
+    results = risk_backtest.backtest(updates, breakers, grid)
+    scan_seconds = time.perf_counter() - started
+    minutes = sum(result["minutes"] for result in results.values())
+    print(f"{pairs} pair(s), {minutes:,} signal-minutes, {grid_size:,} parameter sets")
+    print(f"Histogram scan:    {scan_seconds:8.2f}s ({minutes * grid_size / scan_seconds / 1e9:,.0f}G set-minutes/s)")
+
+    # Brute force on a sample of grid points, checked against the scan and extrapolated to the whole grid
+    rng = np.random.default_rng(0)
+    axes = [np.sort(np.asarray(grid[axis], dtype=np.float64)) for axis in ("max_peg_deviation", "min_depth", "staleness")]
+    started = time.perf_counter()
+    for pair_id, history in updates.items():
+        series_minutes = risk_backtest.minute_series(history["time"], history["peg"], history["depth"])[0]
+        covered = risk_backtest.breaker_coverage(series_minutes, breakers[pair_id]["time"], breakers[pair_id]["triggered"])
+        result = results[pair_id]
+        for _ in range(samples):
+            index = tuple(int(rng.integers(len(axis))) for axis in axes)
+            expected = replay(history, *(axis[i] for axis, i in zip(axes, index)), covered)
+            got = (result["trips"][index], result["false_trips"][index], result["breach_minutes"][index])
+            assert tuple(int(v) for v in expected) == tuple(int(v) for v in got), (index, expected, got)
+    brute_seconds = (time.perf_counter() - started) / samples * grid_size
+    print(f"Per-set replay:    {brute_seconds:8.0f}s extrapolated from {samples} sets per pair "
+          f"({brute_seconds / scan_seconds:,.0f}x slower); sampled sets agree")
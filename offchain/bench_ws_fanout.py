@@ -0,0 +1,125 @@
+"""
+Benchmark: WebSocket event fan-out to 1k simulated clients
+Compares EventFanout (per-client queues and senders) with the old sequential broadcast loop,
+with a few deliberately slow clients in the mix
+
+Usage: python bench_ws_fanout.py [clients] [batches] [slow_clients]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from ws_fanout import EventFanout
+
+FAST_SEND_SECONDS = 0.0005
+SLOW_SEND_SECONDS = 0.25
+BATCH_INTERVAL = 0.02
+
+
+class SimulatedWebSocket:
+    """Records when each message arrives; send_json takes a fixed time like a real socket write"""
+
+    def __init__(self, send_seconds):
+        self.send_seconds = send_seconds
+        self.latencies = []
+        self.closed = False
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.send_seconds)
+        self.latencies.append(time.time() - message["published_at"])
+
+    async def close(self, code=1000, reason=""):
+        self.closed = True
+
+
+class SequentialBroadcast:
+    """The previous ConnectionManager.broadcast: await every socket in turn"""
+
+    def __init__(self):
+        self.active_connections = []
+
+    async def broadcast(self, message):
+        for connection in self.active_connections:
+            try:
+                await connection.send_json(message)
+            except Exception:
+                pass
+
+
+def make_batch(rng, n):
+    batch = []
+    for _ in range(rng.randint(1, 8)):
+        vault_id = rng.randint(1, 20)
+        batch.append({
+            "block_number": n,
+            "event_type": rng.choice(["Deposited", "Withdrawn", "OracleSignalUpdated"]),
+            "data": {"vaultId": vault_id, "pairId": f"0x{vault_id:064x}", "amount": rng.randint(1, 10 ** 24)},
+        })
+    return batch
+
+
+def summarize(name, sockets, elapsed):
+    latencies = sorted(l for ws in sockets for l in ws.latencies)
+    if not latencies:
+        print(f"{name}: no deliveries")
+        return
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    print(f"{name}: {len(latencies)} deliveries to fast clients in {elapsed:.2f}s  "
+          f"p50={pct(50):.1f}ms  p99={pct(99):.1f}ms  max={latencies[-1] * 1000:.1f}ms")
+
+
+async def bench_fanout(clients, batches, slow):
+    rng = random.Random(1)
+    fanout = EventFanout(queue_size=64)
+    fast_sockets = []
+    for i in range(clients):
+        ws = SimulatedWebSocket(SLOW_SEND_SECONDS if i < slow else FAST_SEND_SECONDS)
+        # A third of the clients follow a single vault, the rest take everything
+        filters = {"vault_ids": str(rng.randint(1, 20))} if i % 3 == 0 else {}
+        await fanout.subscribe(ws, **filters)
+        if i >= slow:
+            fast_sockets.append(ws)
+
+    started = time.time()
+    for n in range(batches):
+        fanout.publish(make_batch(rng, n))
+        await asyncio.sleep(BATCH_INTERVAL)
+    while any(s.queue.qsize() for s in fanout.subscribers if s.websocket.send_seconds == FAST_SEND_SECONDS):
+        await asyncio.sleep(0.01)
+    elapsed = time.time() - started
+
+    summarize("EventFanout        ", fast_sockets, elapsed)
+    status = fanout.status()
+    print(f"  subscribers left={status['subscribers']} dropped slow clients={status['dropped_clients']} "
+          f"max queue depth={status['max_queue_depth']}")
+    for subscriber in list(fanout.subscribers):
+        await fanout.unsubscribe(subscriber)
+
+
+async def bench_sequential(clients, batches, slow):
+    rng = random.Random(1)
+    manager = SequentialBroadcast()
+    fast_sockets = []
+    for i in range(clients):
+        ws = SimulatedWebSocket(SLOW_SEND_SECONDS if i < slow else FAST_SEND_SECONDS)
+        manager.active_connections.append(ws)
+        if i >= slow:
+            fast_sockets.append(ws)
+
+    started = time.time()
+    for n in range(batches):
+        await manager.broadcast({"type": "events", "published_at": time.time(), "events": make_batch(rng, n)})
+        await asyncio.sleep(BATCH_INTERVAL)
+    summarize("Sequential broadcast", fast_sockets, time.time() - started)
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    batches = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    slow = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print(f"{clients} clients ({slow} slow at {SLOW_SEND_SECONDS * 1000:.0f}ms/send), "
+          f"{batches} batches every {BATCH_INTERVAL * 1000:.0f}ms")
+    asyncio.run(bench_fanout(clients, batches, slow))
+    # Every sequential batch waits on each slow socket in turn, so keep the baseline short
+    asyncio.run(bench_sequential(clients, min(batches, 10), slow))
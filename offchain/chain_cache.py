@@ -0,0 +1,161 @@
+"""
+TempoVault Chain Read Cache
+Block-keyed LRU read-through cache with single-flight loading for on-chain view calls
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+# Maximum cached call results; least recently used entries are evicted first
+CHAIN_CACHE_SIZE = int(os.getenv("CHAIN_CACHE_SIZE", "10000"))
+# Seconds between eth_blockNumber polls; requests inside the interval share the last observed head
+CHAIN_HEAD_TTL = float(os.getenv("CHAIN_HEAD_TTL", "1"))
+
+
+def call_key(fn, block_number):
+    """(contract, function + args, block) with the call data standing in for function and args"""
+    return (fn.address, fn._encode_transaction_data(), block_number)
+
+
+class BlockCache:
+    """
+    Caches view-call results keyed by (contract, function, args, block_number)
+
+    Chain state only changes per block, so a result is valid for as long as
+    its block is the head. When a new head is observed, entries for older
+    blocks are dropped. Concurrent misses for the same key share one load
+    (single-flight): a burst of identical requests costs one batch of
+    eth_calls through the OnchainReader.
+    """
+
+    def __init__(self, w3, reader, max_entries=CHAIN_CACHE_SIZE, head_ttl=CHAIN_HEAD_TTL):
+        self.w3 = w3
+        self.reader = reader
+        self.max_entries = max_entries
+        self.head_ttl = head_ttl
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.loading = set()
+        self.head_block = None
+        self.head_checked_at = 0.0
+        self.head_task = None
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "loads": 0, "heads": 0}
+
+    async def head(self):
+        """Latest block number, polled at most once per head_ttl"""
+        if self.head_block is not None and time.monotonic() - self.head_checked_at < self.head_ttl:
+            return self.head_block
+        if self.head_task is None:
+            self.head_task = asyncio.ensure_future(asyncio.to_thread(lambda: self.w3.eth.block_number))
+            self.head_task.add_done_callback(self.head_done)
+        # Shielded: cancelling one waiter must not cancel the poll shared with the others
+        block_number = await asyncio.shield(self.head_task)
+        self.observe_head(block_number)
+        return block_number
+
+    def head_done(self, task):
+        """Clear the finished poll, so the next head() past head_ttl starts a new one"""
+        if self.head_task is task:
+            self.head_task = None
+        # Mark retrieved so a poll whose waiters were all cancelled does not log "exception never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def observe_head(self, block_number):
+        """Record the head; a new head invalidates entries for older blocks"""
+        self.head_checked_at = time.monotonic()
+        if self.head_block is not None and block_number <= self.head_block:
+            return
+        self.head_block = block_number
+        self.stats["heads"] += 1
+        stale = [key for key in self.entries if key[2] < block_number]
+        for key in stale:
+            del self.entries[key]
+
+    def store(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def read(self, calls, block_number=None):
+        """
+        Results for calls at block_number (default: head); returns (block_number, values)
+
+        Hits are served from memory, calls already being loaded are awaited,
+        and the remaining misses are fetched with one reader.read.
+        """
+        if block_number is None:
+            block_number = await self.head()
+
+        values = [None] * len(calls)
+        waiting = []
+        to_load = []
+        loop = asyncio.get_running_loop()
+
+        for i, fn in enumerate(calls):
+            key = call_key(fn, block_number)
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                values[i] = self.entries[key]
+                self.stats["hits"] += 1
+            elif key in self.inflight:
+                waiting.append((i, self.inflight[key]))
+                self.stats["coalesced"] += 1
+            else:
+                future = loop.create_future()
+                self.inflight[key] = future
+                waiting.append((i, future))
+                to_load.append((key, fn, future))
+                self.stats["misses"] += 1
+
+        if to_load:
+            self.stats["loads"] += 1
+            # Own task, so a cancelled requester cannot strand the callers coalesced onto its futures
+            task = asyncio.ensure_future(self.load(to_load, block_number))
+            self.loading.add(task)
+            task.add_done_callback(self.loading.discard)
+
+        for i, future in waiting:
+            # Shielded: cancelling one waiter must not cancel the future shared with the others
+            values[i] = await asyncio.shield(future)
+        return block_number, values
+
+    async def load(self, to_load, block_number):
+        """Fetch [(key, fn, future)] with one reader.read and resolve every future"""
+        try:
+            _, loaded = await asyncio.to_thread(self.reader.read, [fn for _, fn, _ in to_load], block_number)
+        except Exception as e:
+            for key, _, future in to_load:
+                self.inflight.pop(key, None)
+                future.set_exception(e)
+                # Mark retrieved so an abandoned future does not log "exception never retrieved"
+                future.exception()
+            return
+
+        for (key, _, future), value in zip(to_load, loaded):
+            self.inflight.pop(key, None)
+            # A head that moved on while loading makes the result stale for future lookups
+            if self.head_block is None or block_number >= self.head_block:
+                self.store(key, value)
+            future.set_result(value)
+
+    async def call(self, fn, block_number=None):
+        """Single view call through the cache"""
+        _, values = await self.read([fn], block_number)
+        return values[0]
+
+    def status(self):
+        """Counters for the cache stats endpoint"""
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self.inflight),
+            "head_block": self.head_block,
+            "hit_rate": round((self.stats["hits"] + self.stats["coalesced"]) / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,140 @@
+"""
+TempoVault Database Pool
+Bounded psycopg2 connection pool with health checks, guaranteed release and an asyncio entry point
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Seconds a caller waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+# Connections idle longer than this are pinged with SELECT 1 before being handed out
+DB_POOL_CHECK_IDLE = float(os.getenv("DB_POOL_CHECK_IDLE", "30"))
+
+
+class PoolTimeout(Exception):
+    """No connection became free within DB_POOL_TIMEOUT"""
+
+
+class DatabasePool:
+    """
+    ThreadedConnectionPool that waits for a free connection instead of failing
+
+    psycopg2's pool raises as soon as maxconn connections are checked out; a
+    semaphore sized to maxconn makes callers queue instead. Connections are
+    checked before use (closed, left in a failed state, or idle past
+    DB_POOL_CHECK_IDLE and failing SELECT 1) and replaced when broken. Every
+    checkout is rolled back and returned to the pool, including on errors.
+    """
+
+    def __init__(self, dsn, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT, **connect_kwargs):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+        self.pool = None
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self.last_used = {}
+        # Guards in_use and stats, which worker threads update concurrently
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "replaced": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def open(self):
+        if self.pool is None:
+            self.pool = ThreadedConnectionPool(self.minconn, self.maxconn, self.dsn, **self.connect_kwargs)
+            print(f"Database pool opened (min={self.minconn}, max={self.maxconn})", flush=True)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+            self.last_used.clear()
+            print("Database pool closed", flush=True)
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        if conn.info.transaction_status not in (psycopg2.extensions.TRANSACTION_STATUS_IDLE,
+                                                psycopg2.extensions.TRANSACTION_STATUS_INTRANS):
+            return False
+        if time.monotonic() - self.last_used.get(id(conn), 0) < DB_POOL_CHECK_IDLE:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        for _ in range(self.maxconn + 1):
+            conn = self.pool.getconn()
+            if self._healthy(conn):
+                return conn
+            self.pool.putconn(conn, close=True)
+            self.last_used.pop(id(conn), None)
+            self.count("replaced")
+        raise psycopg2.OperationalError("Could not obtain a healthy database connection")
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; it is rolled back and returned (or discarded if broken) on exit"""
+        if self.pool is None:
+            self.open()
+
+        if not self.slots.acquire(blocking=False):
+            self.count("waits")
+            if not self.slots.acquire(timeout=self.timeout):
+                self.count("timeouts")
+                raise PoolTimeout(f"No database connection available within {self.timeout}s")
+        with self.lock:
+            self.in_use += 1
+
+        conn = None
+        try:
+            conn = self._checkout()
+            self.count("checkouts")
+            yield conn
+        finally:
+            if conn is not None:
+                broken = bool(conn.closed)
+                if not broken:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        broken = True
+                self.last_used[id(conn)] = time.monotonic()
+                if broken:
+                    self.last_used.pop(id(conn), None)
+                if self.pool is not None:
+                    self.pool.putconn(conn, close=broken)
+            with self.lock:
+                self.in_use -= 1
+            self.slots.release()
+
+    def run_sync(self, fn, *args):
+        with self.connection() as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn, *args):
+        """Run fn(conn, *args) on a pooled connection in a worker thread, off the event loop"""
+        return await asyncio.to_thread(self.run_sync, fn, *args)
+
+    def status(self):
+        """Pool size and counters for health endpoints"""
+        with self.lock:
+            return {"min": self.minconn, "max": self.maxconn, "in_use": self.in_use, **self.stats}
@@ -6,14 +6,20 @@ Indexes all protocol events to PostgreSQL for querying and analytics
 import os
 import time
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from web3 import Web3
 try:
     from web3.middleware import geth_poa_middleware
 except ImportError:
     from web3.middleware import ExtraDataToPOAMiddleware as geth_poa_middleware
 import psycopg2
+import requests
+from web3.exceptions import BlockNotFound
 from psycopg2.extras import Json, execute_values
 from datetime import datetime
+from log_decoder import DecoderRegistry, event_topic
+from partitions import ensure_partitions, apply_retention, PARTITION_RETENTION_DAYS
 
 print("Starting Event Indexer initialization...", flush=True)
 
@@ -23,6 +29,32 @@ DB_URL = os.getenv("INDEXER_DB_URL", "postgresql://localhost:5432/tempovault")
 START_BLOCK = int(os.getenv("START_BLOCK", "0"))
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "5"))
 
+# "range" batches eth_getLogs over adaptive block windows, "block" indexes one block at a time
+INDEX_MODE = os.getenv("INDEX_MODE", "range")
+LOG_RANGE_INITIAL = int(os.getenv("LOG_RANGE_INITIAL", "2000"))
+LOG_RANGE_MIN = int(os.getenv("LOG_RANGE_MIN", "1"))
+LOG_RANGE_MAX = int(os.getenv("LOG_RANGE_MAX", "100000"))
+
+# Blocks kept behind head before indexing (0 = index unconfirmed blocks right up to head)
+FINALITY_DEPTH = int(os.getenv("FINALITY_DEPTH", "0"))
+# How many recent block hashes are kept for reorg detection
+REORG_WINDOW = int(os.getenv("REORG_WINDOW", "128"))
+
+# Backfill: chunk size in blocks, worker threads, and cap on concurrent RPC requests
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "10000"))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+RPC_MAX_INFLIGHT = int(os.getenv("RPC_MAX_INFLIGHT", "8"))
+
+# Rows per multi-row INSERT statement in the batched write path
+WRITE_PAGE_SIZE = int(os.getenv("WRITE_PAGE_SIZE", "5000"))
+
+# Postgres NOTIFY channel that newly committed events are published on (empty disables publishing)
+EVENT_NOTIFY_CHANNEL = os.getenv("EVENT_NOTIFY_CHANNEL", "tempovault_events")
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+# Seconds between partition retention runs in the indexer loop (PARTITION_RETENTION_DAYS enables retention)
+PARTITION_RETENTION_INTERVAL = int(os.getenv("PARTITION_RETENTION_INTERVAL", "3600"))
+
 print(f"Connecting to RPC: {RPC_URL}", flush=True)
 w3 = Web3(Web3.HTTPProvider(RPC_URL))
 print("Web3 instance created", flush=True)
@@ -52,20 +84,6 @@ DEPLOYED_CONTRACTS = {
     "0x2f0b1a0c816377f569533385a30d2afe2cb4899e": ("DexStrategyCompact", strategy_abi),
 }
 
-# Build event signature to contract mapping
-print("Building event decoders...", flush=True)
-event_decoders = {}
-for address, (contract_name, abi) in DEPLOYED_CONTRACTS.items():
-    print(f"Processing contract {contract_name} at {address}", flush=True)
-    contract = w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi)
-    print(f"Contract instance created for {contract_name}", flush=True)
-    for event in contract.events:
-        event_obj = getattr(contract.events, event.event_name)
-        signature_hash = w3.keccak(text=event_obj.event_name + "(" + ",".join([inp["type"] for inp in event_obj.abi["inputs"]]) + ")").hex()
-        event_decoders[signature_hash] = (contract, event_obj, event.event_name)
-        print(f"  Registered event: {event.event_name}", flush=True)
-print(f"Event decoders built: {len(event_decoders)} events", flush=True)
-
 EVENT_SIGNATURES = {
     "Deposited": "Deposited(uint256,address,uint256,address,uint256)",
     "Withdrawn": "Withdrawn(uint256,address,uint256,address,uint256)",
@@ -74,12 +92,53 @@ EVENT_SIGNATURES = {
     "LossRealized": "LossRealized(uint256,uint256,address,uint256,uint256,uint256)",
     "PerformanceFeeAccrued": "PerformanceFeeAccrued(uint256,address,uint256,uint256)",
     "ManagementFeeAccrued": "ManagementFeeAccrued(uint256,address,uint256,uint256)",
-    "OracleSignalUpdated": "OracleSignalUpdated(bytes32,(int24,uint256,uint256,uint256,uint256),uint256)",
+    "OracleSignalUpdated": "OracleSignalUpdated(bytes32,(int16,uint256,uint256,uint256,uint256,uint256),uint256)",
     "CircuitBreakerTriggered": "CircuitBreakerTriggered(bytes32,address)",
     "CircuitBreakerReset": "CircuitBreakerReset(bytes32,address)",
     "OrderPlaced": "OrderPlaced(bytes32,uint256,int24,uint256,bool,bool)",
 }
 
+# Compile (address, topic0) -> decoder registry once at startup
+print("Building event decoders...", flush=True)
+decoder_registry = DecoderRegistry(DEPLOYED_CONTRACTS)
+CONTRACT_ADDRESSES = decoder_registry.addresses
+
+event_decoders = {}
+for address, (contract_name, abi) in DEPLOYED_CONTRACTS.items():
+    print(f"Processing contract {contract_name} at {address}", flush=True)
+    contract = w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi)
+    for event_abi in abi:
+        if event_abi.get("type") != "event":
+            continue
+        event_name = event_abi["name"]
+        event_obj = getattr(contract.events, event_name)()
+        event_decoders["0x" + event_topic(event_abi).hex()] = (contract, event_obj, event_name)
+        print(f"  Registered event: {event_name}", flush=True)
+print(f"Event decoders built: {len(event_decoders)} events", flush=True)
+
+for decoder in decoder_registry.topics.values():
+    expected = EVENT_SIGNATURES.get(decoder.name)
+    if expected and expected != decoder.signature:
+        print(f"WARNING: ABI signature {decoder.signature} does not match EVENT_SIGNATURES {expected}", flush=True)
+
+# Server-side eth_getLogs filter: any of our contracts, any topic0 we can decode
+LOG_FILTER_ADDRESSES = [Web3.to_checksum_address(addr) for addr in DEPLOYED_CONTRACTS.keys()]
+LOG_FILTER_TOPICS = decoder_registry.topic_filter()
+
+# Provider error fragments meaning the getLogs window was too large (geth, erigon, alchemy, infura, reth)
+RANGE_ERROR_MARKERS = (
+    "too many",
+    "query returned more than",
+    "limit exceeded",
+    "response size",
+    "range too large",
+    "block range",
+    "timeout",
+    "timed out",
+)
+
+rpc_slots = threading.BoundedSemaphore(RPC_MAX_INFLIGHT)
+
 
 def get_db_connection():
     """Create PostgreSQL connection"""
@@ -110,204 +169,436 @@ def update_last_indexed_block(conn, block_number):
     conn.commit()
 
 
+EVENT_COLUMNS = (
+    "block_number", "block_timestamp", "transaction_hash", "log_index",
+    "event_type", "contract_address", "event_data"
+)
+
+
+def event_values(event_data):
+    """events table row for a decoded event"""
+    return (
+        event_data["block_number"],
+        datetime.fromtimestamp(event_data["block_timestamp"]),
+        event_data["transaction_hash"],
+        event_data["log_index"],
+        event_data["event_type"],
+        event_data["contract_address"],
+        Json(event_data["decoded_data"])
+    )
+
+
 def insert_event(conn, event_data):
     """Insert raw event into events table"""
     with conn.cursor() as cur:
-        cur.execute("""
+        cur.execute(f"""
             INSERT INTO events
-            (block_number, block_timestamp, transaction_hash, log_index, event_type, contract_address, event_data)
+            ({", ".join(EVENT_COLUMNS)})
             VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (transaction_hash, log_index) DO NOTHING
+            ON CONFLICT (transaction_hash, log_index, block_number) DO NOTHING
             RETURNING id
-        """, (
-            event_data["block_number"],
-            datetime.fromtimestamp(event_data["block_timestamp"]),
-            event_data["transaction_hash"],
-            event_data["log_index"],
-            event_data["event_type"],
-            event_data["contract_address"],
-            Json(event_data["decoded_data"])
-        ))
+        """, event_values(event_data))
         result = cur.fetchone()
         return result[0] if result else None
 
 
+def deposit_values(data):
+    """Deposited → deposits columns"""
+    return (data["vaultId"], data["token"], str(data["amount"]), data["depositor"], str(data["newBalance"]))
+
+
+def withdrawal_values(data):
+    """Withdrawn → withdrawals columns"""
+    return (data["vaultId"], data["token"], str(data["amount"]), data["recipient"], str(data["newBalance"]))
+
+
+def deployment_values(data):
+    """CapitalDeployed → deployments columns"""
+    return (data["vaultId"], data["deploymentId"], data["strategy"], data["token"], str(data["amount"]), data["pairId"])
+
+
+def recall_values(data):
+    """CapitalRecalled → recalls columns"""
+    return (data["vaultId"], data["deploymentId"], str(data["returnedAmount"]))
+
+
+def loss_values(data):
+    """LossRealized → losses columns"""
+    return (
+        data["vaultId"], data["deploymentId"], data["token"],
+        str(data["deployedAmount"]), str(data["returnedAmount"]), str(data["loss"])
+    )
+
+
+def oracle_update_values(data):
+    """OracleSignalUpdated → oracle_updates columns"""
+    signal = data["signal"]
+    return (
+        data["pairId"], signal["pegDeviation"], str(signal["orderbookDepthBid"]),
+        str(signal["orderbookDepthAsk"]), signal["nonce"]
+    )
+
+
+def performance_fee_values(data):
+    """PerformanceFeeAccrued → performance_fees columns"""
+    return (data["vaultId"], data["token"], str(data["yieldAmount"]), str(data["feeAmount"]))
+
+
+def management_fee_values(data):
+    """ManagementFeeAccrued → management_fees columns"""
+    return (data["vaultId"], data["token"], str(data["feeAmount"]), data["periodSeconds"])
+
+
+def circuit_breaker_values(data, triggered):
+    """CircuitBreakerTriggered/Reset → circuit_breakers columns"""
+    return (
+        data["pairId"],
+        triggered,
+        data.get("triggeredBy", data.get("resetBy", "0x0000000000000000000000000000000000000000"))
+    )
+
+
+def order_placed_values(data):
+    """OrderPlaced → orders_placed columns"""
+    return (data["pairId"], data["orderId"], data["tick"], str(data["amount"]), data["isBid"], data["isFlip"])
+
+
+# event_type -> (table, columns, row builder); every row is wrapped as (event_id, *columns, block_timestamp)
+TYPED_TABLES = {
+    "Deposited": (
+        "deposits", ("vault_id", "token", "amount", "depositor", "new_balance"), deposit_values),
+    "Withdrawn": (
+        "withdrawals", ("vault_id", "token", "amount", "recipient", "new_balance"), withdrawal_values),
+    "CapitalDeployed": (
+        "deployments", ("vault_id", "deployment_id", "strategy", "token", "amount", "pair_id"), deployment_values),
+    "CapitalRecalled": (
+        "recalls", ("vault_id", "deployment_id", "returned_amount"), recall_values),
+    "LossRealized": (
+        "losses", ("vault_id", "deployment_id", "token", "deployed_amount", "returned_amount", "loss"), loss_values),
+    "OracleSignalUpdated": (
+        "oracle_updates", ("pair_id", "peg_deviation", "orderbook_depth_bid", "orderbook_depth_ask", "nonce"),
+        oracle_update_values),
+    "PerformanceFeeAccrued": (
+        "performance_fees", ("vault_id", "token", "yield_amount", "fee_amount"), performance_fee_values),
+    "ManagementFeeAccrued": (
+        "management_fees", ("vault_id", "token", "fee_amount", "period_seconds"), management_fee_values),
+    "CircuitBreakerTriggered": (
+        "circuit_breakers", ("pair_id", "triggered", "triggered_by"),
+        lambda data: circuit_breaker_values(data, True)),
+    "CircuitBreakerReset": (
+        "circuit_breakers", ("pair_id", "triggered", "triggered_by"),
+        lambda data: circuit_breaker_values(data, False)),
+    "OrderPlaced": (
+        "orders_placed", ("pair_id", "order_id", "tick", "amount", "is_bid", "is_flip"), order_placed_values),
+}
+
+
+# vault_totals column fed by each event type, and the typed-table column holding the amount
+VAULT_TOTALS = {
+    "Deposited": ("total_deposited", "amount"),
+    "Withdrawn": ("total_withdrawn", "amount"),
+    "CapitalDeployed": ("total_deployed", "amount"),
+    "LossRealized": ("total_losses", "loss"),
+    "PerformanceFeeAccrued": ("total_performance_fees", "fee_amount"),
+    "ManagementFeeAccrued": ("total_management_fees", "fee_amount"),
+}
+VAULT_TOTALS_COLUMNS = tuple(column for column, _ in VAULT_TOTALS.values())
+
+
+def insert_typed_rows(conn, table, columns, rows):
+    """Insert (event_id, *columns, block_timestamp) rows into a typed table with one multi-row INSERT"""
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            f"INSERT INTO {table} (event_id, {', '.join(columns)}, block_timestamp) VALUES %s",
+            rows,
+            page_size=WRITE_PAGE_SIZE
+        )
+
+
+def insert_typed_event(conn, event_type, event_id, data, timestamp):
+    """Insert the typed-table row for a single event"""
+    table, columns, values = TYPED_TABLES[event_type]
+    insert_typed_rows(conn, table, columns, [(event_id, *values(data), timestamp)])
+
+
+def add_vault_totals(deltas, event_type, data):
+    """Accumulate one event's amount into {(vault_id, token): [per-column deltas]}"""
+    if event_type not in VAULT_TOTALS:
+        return
+    _, columns, values = TYPED_TABLES[event_type]
+    row = dict(zip(columns, values(data)))
+    total_column, amount_column = VAULT_TOTALS[event_type]
+    key = (row["vault_id"], row["token"])
+    if key not in deltas:
+        deltas[key] = [0] * len(VAULT_TOTALS_COLUMNS)
+    deltas[key][VAULT_TOTALS_COLUMNS.index(total_column)] += int(row[amount_column])
+
+
+def apply_vault_totals(conn, deltas):
+    """
+    Add accumulated deltas to vault_totals with one upsert
+
+    Rows are written in key order so concurrent backfill workers lock
+    vault_totals rows in the same order. Does not commit.
+    """
+    if not deltas:
+        return
+    rows = [(vault_id, token, *(str(v) for v in totals)) for (vault_id, token), totals in sorted(deltas.items())]
+    updates = ", ".join(f"{c} = vault_totals.{c} + EXCLUDED.{c}" for c in VAULT_TOTALS_COLUMNS)
+    with conn.cursor() as cur:
+        execute_values(cur, f"""
+            INSERT INTO vault_totals (vault_id, token, {", ".join(VAULT_TOTALS_COLUMNS)}) VALUES %s
+            ON CONFLICT (vault_id, token) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP
+        """, rows, page_size=WRITE_PAGE_SIZE)
+
+
+def vault_totals_query(event_filter=""):
+    """SELECT vault_id, token, <totals> aggregated from the typed tables, optionally limited by an events filter"""
+    parts = []
+    for event_type, (total_column, amount_column) in VAULT_TOTALS.items():
+        table = TYPED_TABLES[event_type][0]
+        sums = ", ".join(
+            f"SUM({amount_column}) AS {c}" if c == total_column else f"0 AS {c}" for c in VAULT_TOTALS_COLUMNS
+        )
+        where = f"WHERE event_id IN (SELECT id FROM events WHERE {event_filter})" if event_filter else ""
+        parts.append(f"SELECT vault_id, token, {sums} FROM {table} {where} GROUP BY vault_id, token")
+    sums = ", ".join(f"SUM({c}) AS {c}" for c in VAULT_TOTALS_COLUMNS)
+    return f"SELECT vault_id, token, {sums} FROM ({' UNION ALL '.join(parts)}) t GROUP BY vault_id, token"
+
+
+def rebuild_vault_totals(conn):
+    """Recompute vault_totals from the typed tables in one transaction"""
+    columns = ", ".join(VAULT_TOTALS_COLUMNS)
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE vault_totals IN EXCLUSIVE MODE")
+        cur.execute("DELETE FROM vault_totals")
+        cur.execute(f"INSERT INTO vault_totals (vault_id, token, {columns}) {vault_totals_query()}")
+        rows = cur.rowcount
+    conn.commit()
+    print(f"Rebuilt vault_totals: {rows} (vault, token) rows", flush=True)
+    return rows
+
+
 def process_deposit_event(conn, event_id, data, timestamp):
     """Process Deposited event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO deposits
-            (event_id, vault_id, token, amount, depositor, new_balance, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["vaultId"],
-            data["token"],
-            str(data["amount"]),
-            data["depositor"],
-            str(data["newBalance"]),
-            timestamp
-        ))
+    insert_typed_event(conn, "Deposited", event_id, data, timestamp)
 
 
 def process_withdrawal_event(conn, event_id, data, timestamp):
     """Process Withdrawn event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO withdrawals
-            (event_id, vault_id, token, amount, recipient, new_balance, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["vaultId"],
-            data["token"],
-            str(data["amount"]),
-            data["recipient"],
-            str(data["newBalance"]),
-            timestamp
-        ))
+    insert_typed_event(conn, "Withdrawn", event_id, data, timestamp)
 
 
 def process_deployment_event(conn, event_id, data, timestamp):
     """Process CapitalDeployed event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO deployments
-            (event_id, vault_id, deployment_id, strategy, token, amount, pair_id, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["vaultId"],
-            data["deploymentId"],
-            data["strategy"],
-            data["token"],
-            str(data["amount"]),
-            data["pairId"],
-            timestamp
-        ))
+    insert_typed_event(conn, "CapitalDeployed", event_id, data, timestamp)
 
 
 def process_recall_event(conn, event_id, data, timestamp):
     """Process CapitalRecalled event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO recalls
-            (event_id, vault_id, deployment_id, returned_amount, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["vaultId"],
-            data["deploymentId"],
-            str(data["returnedAmount"]),
-            timestamp
-        ))
+    insert_typed_event(conn, "CapitalRecalled", event_id, data, timestamp)
 
 
 def process_loss_event(conn, event_id, data, timestamp):
     """Process LossRealized event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO losses
-            (event_id, vault_id, deployment_id, token, deployed_amount, returned_amount, loss, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["vaultId"],
-            data["deploymentId"],
-            data["token"],
-            str(data["deployedAmount"]),
-            str(data["returnedAmount"]),
-            str(data["loss"]),
-            timestamp
-        ))
+    insert_typed_event(conn, "LossRealized", event_id, data, timestamp)
 
 
 def process_oracle_update_event(conn, event_id, data, timestamp):
     """Process OracleSignalUpdated event"""
-    signal = data["signal"]
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO oracle_updates
-            (event_id, pair_id, peg_deviation, orderbook_depth_bid, orderbook_depth_ask, nonce, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["pairId"],
-            signal["pegDeviation"],
-            str(signal["orderbookDepthBid"]),
-            str(signal["orderbookDepthAsk"]),
-            signal["nonce"],
-            timestamp
-        ))
+    insert_typed_event(conn, "OracleSignalUpdated", event_id, data, timestamp)
 
 
 def process_performance_fee_event(conn, event_id, data, timestamp):
     """Process PerformanceFeeAccrued event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO performance_fees
-            (event_id, vault_id, token, yield_amount, fee_amount, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["vaultId"],
-            data["token"],
-            str(data["yieldAmount"]),
-            str(data["feeAmount"]),
-            timestamp
-        ))
+    insert_typed_event(conn, "PerformanceFeeAccrued", event_id, data, timestamp)
 
 
 def process_management_fee_event(conn, event_id, data, timestamp):
     """Process ManagementFeeAccrued event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO management_fees
-            (event_id, vault_id, token, fee_amount, period_seconds, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["vaultId"],
-            data["token"],
-            str(data["feeAmount"]),
-            data["periodSeconds"],
-            timestamp
-        ))
+    insert_typed_event(conn, "ManagementFeeAccrued", event_id, data, timestamp)
 
 
 def process_circuit_breaker_event(conn, event_id, data, timestamp, triggered):
     """Process CircuitBreakerTriggered or CircuitBreakerReset event"""
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO circuit_breakers
-            (event_id, pair_id, triggered, triggered_by, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (
-            event_id,
-            data["pairId"],
-            triggered,
-            data.get("triggeredBy", data.get("resetBy", "0x0000000000000000000000000000000000000000")),
-            timestamp
-        ))
+    insert_typed_event(
+        conn, "CircuitBreakerTriggered" if triggered else "CircuitBreakerReset", event_id, data, timestamp
+    )
 
 
 def process_order_placed_event(conn, event_id, data, timestamp):
     """Process OrderPlaced event"""
+    insert_typed_event(conn, "OrderPlaced", event_id, data, timestamp)
+
+
+def event_message(event_data):
+    """JSON-safe live message for a decoded event"""
+    return {
+        "block_number": event_data["block_number"],
+        "block_timestamp": event_data["block_timestamp"],
+        "transaction_hash": event_data["transaction_hash"],
+        "log_index": event_data["log_index"],
+        "event_type": event_data["event_type"],
+        "contract_address": event_data["contract_address"],
+        "data": event_data["decoded_data"],
+    }
+
+
+def publish_events(conn, events):
+    """
+    Queue pg_notify messages (JSON arrays of events) on EVENT_NOTIFY_CHANNEL
+
+    NOTIFY is transactional: listeners only receive the messages once the
+    caller commits, and never for a rolled-back batch. Events are packed into
+    as few payloads as fit under NOTIFY_PAYLOAD_LIMIT.
+    """
+    if not EVENT_NOTIFY_CHANNEL or not events:
+        return
+
+    payloads, current, size = [], [], 2
+    for event_data in events:
+        message = event_message(event_data)
+        encoded = json.dumps(message, separators=(",", ":"))
+        if len(encoded) + 2 > NOTIFY_PAYLOAD_LIMIT:
+            encoded = json.dumps({**message, "data": None, "truncated": True}, separators=(",", ":"))
+        if current and size + len(encoded) + 1 > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append("[" + ",".join(current) + "]")
+            current, size = [], 2
+        current.append(encoded)
+        size += len(encoded) + 1
+    payloads.append("[" + ",".join(current) + "]")
+
     with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO orders_placed
-            (event_id, pair_id, order_id, tick, amount, is_bid, is_flip, block_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
+        cur.execute("SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload", (EVENT_NOTIFY_CHANNEL, payloads))
+
+
+def write_events_batch(conn, events, totals=None, notify=True):
+    """
+    Write decoded events for a block range with one multi-row INSERT per table
+
+    Inserts into events with ON CONFLICT (transaction_hash, log_index,
+    block_number) DO NOTHING RETURNING id, so typed rows and vault_totals are only updated for
+    events that were not already indexed. Pass a totals dict to accumulate
+    vault_totals deltas and apply them later with apply_vault_totals instead
+    of immediately. With notify, the new events are published to live
+    subscribers when the transaction commits. Does not commit; the caller
+    owns the transaction. Returns the number of newly inserted events.
+    """
+    unique_events = {}
+    for event_data in events:
+        unique_events.setdefault((event_data["transaction_hash"], event_data["log_index"]), event_data)
+    if not unique_events:
+        return 0
+
+    blocks = [event_data["block_number"] for event_data in unique_events.values()]
+    times = [datetime.fromtimestamp(event_data["block_timestamp"]) for event_data in unique_events.values()]
+    ensure_partitions(conn, min(blocks), max(blocks), min(times), max(times))
+
+    with conn.cursor() as cur:
+        inserted = execute_values(cur, f"""
+            INSERT INTO events ({", ".join(EVENT_COLUMNS)}) VALUES %s
+            ON CONFLICT (transaction_hash, log_index, block_number) DO NOTHING
+            RETURNING id, transaction_hash, log_index
+        """, [event_values(event_data) for event_data in unique_events.values()],
+            page_size=WRITE_PAGE_SIZE, fetch=True)
+
+    typed_rows = {}
+    deltas = {} if totals is None else totals
+    for event_id, transaction_hash, log_index in inserted:
+        event_data = unique_events[(transaction_hash, log_index)]
+        if event_data["event_type"] not in TYPED_TABLES:
+            continue
+        table, columns, values = TYPED_TABLES[event_data["event_type"]]
+        row = (event_id, *values(event_data["decoded_data"]), datetime.fromtimestamp(event_data["block_timestamp"]))
+        typed_rows.setdefault((table, columns), []).append(row)
+        add_vault_totals(deltas, event_data["event_type"], event_data["decoded_data"])
+
+    for (table, columns), rows in typed_rows.items():
+        insert_typed_rows(conn, table, columns, rows)
+
+    if totals is None:
+        apply_vault_totals(conn, deltas)
+
+    if notify:
+        new_events = [unique_events[(transaction_hash, log_index)] for _, transaction_hash, log_index in inserted]
+        publish_events(conn, sorted(new_events, key=lambda e: (e["block_number"], e["log_index"])))
+
+    return len(inserted)
+
+
+def decode_log(log, block_timestamp):
+    """Decode a log from one of our contracts into event_data, or None if it cannot be decoded"""
+    # Skip if not from our contracts
+    if log["address"].lower() not in CONTRACT_ADDRESSES or not log["topics"]:
+        return None
+
+    decoder = decoder_registry.lookup(log["address"], log["topics"][0])
+    if decoder is None:
+        return None
+
+    try:
+        decoded_data = decoder.decode(log["topics"], log["data"])
+    except Exception as e:
+        print(f"Failed to decode event {decoder.name}: {e}")
+        return None
+
+    return {
+        "block_number": log["blockNumber"],
+        "block_timestamp": block_timestamp,
+        "transaction_hash": Web3.to_hex(log["transactionHash"]),
+        "log_index": log["logIndex"],
+        "contract_address": log["address"],
+        "event_type": decoder.name,
+        "decoded_data": decoded_data
+    }
+
+
+def process_log(conn, log, block_timestamp):
+    """Decode a single log and write it to events and its typed table"""
+    try:
+        event_data = decode_log(log, block_timestamp)
+        if not event_data:
+            return
+
+        timestamp = datetime.fromtimestamp(block_timestamp)
+        ensure_partitions(conn, event_data["block_number"], event_data["block_number"], timestamp, timestamp)
+
+        # Insert raw event
+        event_id = insert_event(conn, event_data)
+        if not event_id:
+            return
+
+        publish_events(conn, [event_data])
+        if event_data["event_type"] not in TYPED_TABLES:
+            return
+
+        insert_typed_event(
+            conn,
+            event_data["event_type"],
             event_id,
-            data["pairId"],
-            data["orderId"],
-            data["tick"],
-            str(data["amount"]),
-            data["isBid"],
-            data["isFlip"],
+            event_data["decoded_data"],
             timestamp
-        ))
+        )
+
+        deltas = {}
+        add_vault_totals(deltas, event_data["event_type"], event_data["decoded_data"])
+        apply_vault_totals(conn, deltas)
+
+    except Exception as e:
+        print(f"Error processing log: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+def decode_logs(logs, timestamps):
+    """Decode a batch of logs, skipping ones that are not ours or fail to decode"""
+    events = []
+    for log in logs:
+        event_data = decode_log(log, timestamps[log["blockNumber"]])
+        if event_data:
+            events.append(event_data)
+    return events
 
 
 def index_block(conn, block_number):
@@ -322,84 +613,396 @@ def index_block(conn, block_number):
         })
 
         for log in logs:
-            try:
-                # Skip if not from our contracts
-                contract_address = log["address"].lower()
-                if contract_address not in [addr.lower() for addr in DEPLOYED_CONTRACTS.keys()]:
-                    continue
+            process_log(conn, log, block_timestamp)
 
-                topic0 = log["topics"][0].hex()
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO indexed_blocks (block_number, block_hash, parent_hash) VALUES (%s, %s, %s)
+                ON CONFLICT (block_number) DO UPDATE
+                SET block_hash = EXCLUDED.block_hash, parent_hash = EXCLUDED.parent_hash, indexed_at = CURRENT_TIMESTAMP
+            """, (block_number, Web3.to_hex(block["hash"]), Web3.to_hex(block["parentHash"])))
 
-                # Decode event using web3.py
-                decoded_event = None
-                event_type = None
+        conn.commit()
 
-                if topic0 in event_decoders:
-                    contract, event_obj, event_name = event_decoders[topic0]
-                    try:
-                        decoded_event = event_obj.process_log(log)
-                        event_type = event_name
-                    except Exception as e:
-                        print(f"Failed to decode event {event_name}: {e}")
-                        continue
+    except Exception as e:
+        print(f"Error indexing block {block_number}: {e}")
+        conn.rollback()
 
-                if not decoded_event:
-                    continue
 
-                # Prepare event data for storage
-                event_data = {
-                    "block_number": block_number,
-                    "block_timestamp": block_timestamp,
-                    "transaction_hash": log["transactionHash"].hex(),
-                    "log_index": log["logIndex"],
-                    "contract_address": log["address"],
-                    "event_type": event_type,
-                    "decoded_data": dict(decoded_event["args"])
-                }
-
-                # Insert raw event
-                event_id = insert_event(conn, event_data)
-                if not event_id:
-                    continue
+class ReorgDetected(Exception):
+    """Fetched blocks or logs no longer match the recorded canonical chain"""
 
-                timestamp = datetime.fromtimestamp(block_timestamp)
-                decoded_data = event_data["decoded_data"]
-
-                # Process event based on type
-                if event_type == "Deposited":
-                    process_deposit_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "Withdrawn":
-                    process_withdrawal_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "CapitalDeployed":
-                    process_deployment_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "CapitalRecalled":
-                    process_recall_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "LossRealized":
-                    process_loss_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "OracleSignalUpdated":
-                    process_oracle_update_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "PerformanceFeeAccrued":
-                    process_performance_fee_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "ManagementFeeAccrued":
-                    process_management_fee_event(conn, event_id, decoded_data, timestamp)
-                elif event_type == "CircuitBreakerTriggered":
-                    process_circuit_breaker_event(conn, event_id, decoded_data, timestamp, True)
-                elif event_type == "CircuitBreakerReset":
-                    process_circuit_breaker_event(conn, event_id, decoded_data, timestamp, False)
-                elif event_type == "OrderPlaced":
-                    process_order_placed_event(conn, event_id, decoded_data, timestamp)
 
-            except Exception as e:
-                print(f"Error processing log: {e}")
-                import traceback
-                traceback.print_exc()
+def record_block_hashes(conn, from_block, to_block, head, log_block_hashes=None):
+    """
+    Record hashes for the blocks in [from_block, to_block] that fall inside REORG_WINDOW of head
+
+    Raises ReorgDetected if the new blocks do not chain onto the recorded
+    parent, or if a log's blockHash disagrees with the block fetched here
+    (the chain moved between eth_getLogs and eth_getBlockByNumber).
+    Does not commit; the hashes land with the events of the same range.
+    Returns {block_number: timestamp} of the fetched blocks, for get_block_timestamps.
+    """
+    first_block = max(from_block, head - REORG_WINDOW + 1)
+    if first_block > to_block:
+        return {}
+
+    rows = []
+    timestamps = {}
+    for block_number in range(first_block, to_block + 1):
+        with rpc_slots:
+            block = w3.eth.get_block(block_number, full_transactions=False)
+        rows.append((block_number, Web3.to_hex(block["hash"]), Web3.to_hex(block["parentHash"])))
+        timestamps[block_number] = block["timestamp"]
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT block_hash FROM indexed_blocks WHERE block_number = %s", (first_block - 1,))
+        result = cur.fetchone()
+        expected_parent = result[0] if result else None
+
+        for block_number, block_hash, parent_hash in rows:
+            if expected_parent is not None and parent_hash != expected_parent:
+                raise ReorgDetected(f"block {block_number} parent {parent_hash} != recorded {expected_parent}")
+            if log_block_hashes and log_block_hashes.get(block_number, block_hash) != block_hash:
+                raise ReorgDetected(f"logs for block {block_number} came from non-canonical block")
+            expected_parent = block_hash
+
+        execute_values(cur, """
+            INSERT INTO indexed_blocks (block_number, block_hash, parent_hash) VALUES %s
+            ON CONFLICT (block_number) DO UPDATE
+            SET block_hash = EXCLUDED.block_hash, parent_hash = EXCLUDED.parent_hash, indexed_at = CURRENT_TIMESTAMP
+        """, rows)
+    return timestamps
+
+
+def prune_block_hashes(conn, head):
+    """Drop recorded hashes that fell out of REORG_WINDOW"""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM indexed_blocks WHERE block_number <= %s", (head - REORG_WINDOW,))
+    conn.commit()
+
+
+def find_fork_point(conn, last_indexed):
+    """
+    Compare recorded block hashes with the chain, newest first
+
+    Returns None while the recorded tip is still canonical. Otherwise returns
+    the highest recorded block that is still canonical; everything above it
+    has to be rolled back and re-indexed.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT block_number, block_hash FROM indexed_blocks
+            WHERE block_number <= %s
+            ORDER BY block_number DESC
+        """, (last_indexed,))
+        recorded = cur.fetchall()
+
+    for i, (block_number, block_hash) in enumerate(recorded):
+        try:
+            with rpc_slots:
+                chain_hash = Web3.to_hex(w3.eth.get_block(block_number)["hash"])
+        except BlockNotFound:
+            chain_hash = None
+        if chain_hash == block_hash:
+            return None if i == 0 else block_number
+
+    if not recorded:
+        return None
+
+    print(f"WARNING: reorg deeper than the {REORG_WINDOW}-block window, rolling back below it", flush=True)
+    return recorded[-1][0] - 1
+
+
+def rollback_to_block(conn, fork_block):
+    """Delete everything indexed above fork_block and rewind indexer_state to it"""
+    typed_tables = sorted({table for table, _, _ in TYPED_TABLES.values()})
+    subtract = ", ".join(f"{c} = vault_totals.{c} - orphaned.{c}" for c in VAULT_TOTALS_COLUMNS)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE vault_totals SET {subtract}, updated_at = CURRENT_TIMESTAMP
+            FROM ({vault_totals_query("block_number > %s")}) orphaned
+            WHERE vault_totals.vault_id = orphaned.vault_id AND vault_totals.token = orphaned.token
+        """, (fork_block,) * len(VAULT_TOTALS))
+        for table in typed_tables:
+            cur.execute(f"""
+                DELETE FROM {table}
+                WHERE event_id IN (SELECT id FROM events WHERE block_number > %s)
+            """, (fork_block,))
+        cur.execute("DELETE FROM events WHERE block_number > %s", (fork_block,))
+        cur.execute("DELETE FROM indexed_blocks WHERE block_number > %s", (fork_block,))
+        cur.execute("UPDATE indexer_chunks SET completed = FALSE WHERE chunk_end > %s", (fork_block,))
+        cur.execute(
+            "UPDATE indexer_state SET last_indexed_block = %s, last_indexed_at = %s WHERE id = 1",
+            (fork_block, datetime.now())
+        )
+    conn.commit()
+
+
+def check_reorg(conn, last_indexed):
+    """Roll back if the chain reorganized below last_indexed; returns the block to resume after"""
+    fork_block = find_fork_point(conn, last_indexed)
+    if fork_block is None:
+        return last_indexed
+
+    print(f"Reorg detected: rolling back from block {last_indexed} to fork point {fork_block}", flush=True)
+    rollback_to_block(conn, fork_block)
+    return fork_block
+
+
+def is_range_too_large(error):
+    """Whether a getLogs failure means the block window should shrink"""
+    if isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+def fetch_logs(from_block, to_block):
+    """Fetch our contracts' decodable logs for a block range in one eth_getLogs"""
+    with rpc_slots:
+        return w3.eth.get_logs({
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": LOG_FILTER_ADDRESSES,
+            "topics": [LOG_FILTER_TOPICS]
+        })
+
+
+def iter_log_windows(from_block, to_block, window=None):
+    """
+    Yield (start, end, logs) covering [from_block, to_block] in adaptive windows
+
+    The window halves whenever the provider rejects a query as too large or
+    times out. It doubles after each success until the first rejection, then
+    grows by 10% per success, so it settles just under the provider limit
+    instead of oscillating around it.
+    """
+    window = window or LOG_RANGE_INITIAL
+    growth = 2.0
+    start = from_block
+    while start <= to_block:
+        end = min(start + window - 1, to_block)
+        try:
+            logs = fetch_logs(start, end)
+        except Exception as e:
+            if window > LOG_RANGE_MIN and is_range_too_large(e):
+                window = max(LOG_RANGE_MIN, window // 2)
+                growth = 1.1
+                print(f"getLogs {start}-{end} rejected ({e}), window now {window} blocks", flush=True)
                 continue
+            raise
 
-        conn.commit()
+        yield start, end, logs
 
-    except Exception as e:
-        print(f"Error indexing block {block_number}: {e}")
+        start = end + 1
+        window = min(LOG_RANGE_MAX, max(window + 1, int(window * growth)))
+
+
+def get_block_timestamps(block_numbers, known=None):
+    """
+    Fetch timestamps for the given blocks only (blocks without logs are never requested)
+
+    Blocks already in known ({block_number: timestamp}) are not fetched again.
+    """
+    timestamps = {}
+    for block_number in sorted(set(block_numbers)):
+        if known and block_number in known:
+            timestamps[block_number] = known[block_number]
+            continue
+        with rpc_slots:
+            timestamps[block_number] = w3.eth.get_block(block_number, full_transactions=False)["timestamp"]
+    return timestamps
+
+
+def index_range(conn, from_block, to_block, head=None):
+    """
+    Index all events in [from_block, to_block] using range getLogs
+
+    Each window is written with write_events_batch and committed together
+    with indexer_state and the hashes of any blocks within REORG_WINDOW of
+    head, so a failure resumes from the last fully indexed window.
+    Returns the last committed block.
+    """
+    head = to_block if head is None else head
+    last_indexed = from_block - 1
+    for start, end, logs in iter_log_windows(from_block, to_block):
+        log_block_hashes = {log["blockNumber"]: Web3.to_hex(log["blockHash"]) for log in logs}
+        # Blocks near head were just fetched for their hashes; reuse their timestamps
+        fetched = record_block_hashes(conn, start, end, head, log_block_hashes)
+
+        timestamps = get_block_timestamps((log["blockNumber"] for log in logs), fetched)
+        inserted = write_events_batch(conn, decode_logs(logs, timestamps))
+
+        update_last_indexed_block(conn, end)
+        last_indexed = end
+        print(f"Indexed blocks {start}-{end} ({len(logs)} logs, {inserted} new events)", flush=True)
+
+    return last_indexed
+
+
+def plan_backfill_chunks(conn, from_block, to_block):
+    """
+    Record chunk rows covering [from_block, to_block] that are not planned yet
+
+    Returns the (chunk_start, chunk_end) pairs still to be indexed, including
+    unfinished chunks left over from an earlier interrupted backfill.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(chunk_end) FROM indexer_chunks")
+        planned_end = cur.fetchone()[0]
+        first_block = from_block if planned_end is None else max(from_block, planned_end + 1)
+
+        new_chunks = [
+            (chunk_start, min(chunk_start + BACKFILL_CHUNK_SIZE - 1, to_block))
+            for chunk_start in range(first_block, to_block + 1, BACKFILL_CHUNK_SIZE)
+        ]
+        if new_chunks:
+            execute_values(cur, """
+                INSERT INTO indexer_chunks (chunk_start, chunk_end) VALUES %s
+                ON CONFLICT (chunk_start) DO NOTHING
+            """, new_chunks)
+
+        cur.execute("""
+            SELECT chunk_start, chunk_end FROM indexer_chunks
+            WHERE NOT completed
+            ORDER BY chunk_start
+        """)
+        pending = cur.fetchall()
+    conn.commit()
+    return pending
+
+
+_worker_state = threading.local()
+_worker_connections = []
+_worker_connections_lock = threading.Lock()
+
+
+def get_worker_connection():
+    """Per-thread database connection for backfill workers"""
+    conn = getattr(_worker_state, "conn", None)
+    if conn is None or conn.closed:
+        conn = psycopg2.connect(DB_URL)
+        _worker_state.conn = conn
+        with _worker_connections_lock:
+            _worker_connections.append(conn)
+    return conn
+
+
+def backfill_chunk(chunk_start, chunk_end):
+    """
+    Fetch, decode and write one chunk in a single transaction
+
+    The chunk is marked completed in the same transaction as its events, so a
+    crash leaves it either fully indexed or untouched. Returns (blocks, logs).
+    """
+    conn = get_worker_connection()
+    log_count = 0
+    totals = {}
+    try:
+        for start, end, logs in iter_log_windows(chunk_start, chunk_end):
+            timestamps = get_block_timestamps(log["blockNumber"] for log in logs)
+            # Historical chunks are not pushed to live subscribers
+            write_events_batch(conn, decode_logs(logs, timestamps), totals, notify=False)
+            log_count += len(logs)
+
+        # Touch the shared vault_totals rows only at the end so workers do not hold their locks across RPC calls
+        apply_vault_totals(conn, totals)
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE indexer_chunks
+                SET completed = TRUE, log_count = %s, completed_at = %s
+                WHERE chunk_start = %s
+            """, (log_count, datetime.now(), chunk_start))
+        conn.commit()
+    except Exception:
         conn.rollback()
+        raise
+
+    return chunk_end - chunk_start + 1, log_count
+
+
+def advance_indexer_state_from_chunks(conn):
+    """Move indexer_state up to the end of the contiguous run of completed chunks"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT MIN(chunk_start) FROM indexer_chunks WHERE NOT completed")
+        first_pending = cur.fetchone()[0]
+        if first_pending is None:
+            cur.execute("SELECT MAX(chunk_end) FROM indexer_chunks")
+            contiguous_end = cur.fetchone()[0]
+        else:
+            contiguous_end = first_pending - 1
+
+        if contiguous_end is not None:
+            cur.execute("""
+                UPDATE indexer_state
+                SET last_indexed_block = GREATEST(last_indexed_block, %s), last_indexed_at = %s
+                WHERE id = 1
+            """, (contiguous_end, datetime.now()))
+    conn.commit()
+    return contiguous_end
+
+
+def backfill(from_block=None, to_block=None, workers=None):
+    """
+    Index historical blocks with parallel chunk workers
+
+    Splits [from_block, to_block] (default [START_BLOCK, head]) into
+    BACKFILL_CHUNK_SIZE chunks tracked in indexer_chunks. Re-running after a
+    crash only processes the chunks that never completed.
+    """
+    from_block = START_BLOCK if from_block is None else from_block
+    to_block = w3.eth.block_number if to_block is None else to_block
+    workers = workers or BACKFILL_WORKERS
+
+    conn = get_db_connection()
+    try:
+        pending = plan_backfill_chunks(conn, from_block, to_block)
+
+        # Create every partition the chunks write to up front, so workers never wait on each other's DDL
+        timestamps = get_block_timestamps([from_block, to_block])
+        ensure_partitions(conn, from_block, to_block,
+                          datetime.fromtimestamp(timestamps[from_block]), datetime.fromtimestamp(timestamps[to_block]))
+
+        print(f"Backfilling {len(pending)} chunks up to block {to_block} "
+              f"with {workers} workers (max {RPC_MAX_INFLIGHT} RPC requests in flight)", flush=True)
+
+        started = time.time()
+        blocks_done = 0
+        logs_done = 0
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(backfill_chunk, start, end): (start, end) for start, end in pending}
+            for future in as_completed(futures):
+                start, end = futures[future]
+                try:
+                    blocks, logs = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"Chunk {start}-{end} failed: {e}", flush=True)
+                    continue
+
+                blocks_done += blocks
+                logs_done += logs
+                elapsed = max(time.time() - started, 1e-6)
+                print(f"Chunk {start}-{end} done ({logs} logs) | "
+                      f"{blocks_done / elapsed:.0f} blocks/sec, {logs_done / elapsed:.1f} logs/sec", flush=True)
+
+        elapsed = max(time.time() - started, 1e-6)
+        print(f"Backfill finished in {elapsed:.1f}s: {blocks_done} blocks, {logs_done} logs, {failed} failed chunks "
+              f"({blocks_done / elapsed:.0f} blocks/sec, {logs_done / elapsed:.1f} logs/sec)", flush=True)
+
+        last_indexed = advance_indexer_state_from_chunks(conn)
+        print(f"indexer_state advanced to block {last_indexed}", flush=True)
+
+    finally:
+        with _worker_connections_lock:
+            for worker_conn in _worker_connections:
+                worker_conn.close()
+            _worker_connections.clear()
+        conn.close()
 
 
 def main():
@@ -414,14 +1017,23 @@ def main():
         print("Getting last indexed block...", flush=True)
         last_indexed = get_last_indexed_block(conn)
         print(f"Last indexed block: {last_indexed}", flush=True)
+        last_retention = 0.0
 
         while True:
             print(f"Fetching current block number... (last indexed: {last_indexed})", flush=True)
-            current_block = w3.eth.block_number
-            print(f"Current block: {current_block}", flush=True)
+            head_block = w3.eth.block_number
+            current_block = head_block - FINALITY_DEPTH
+            print(f"Current block: {head_block} (indexing up to {current_block})", flush=True)
+
+            try:
+                last_indexed = check_reorg(conn, last_indexed)
+            except Exception as e:
+                print(f"Error checking for reorg: {e}", flush=True)
+                conn.rollback()
+
             print(f"Checking if {last_indexed} < {current_block}...", flush=True)
 
-            if last_indexed < current_block:
+            if last_indexed < current_block and INDEX_MODE == "block":
                 print(f"Indexing blocks {last_indexed + 1} to {current_block}...", flush=True)
 
                 for block_num in range(last_indexed + 1, current_block + 1):
@@ -429,8 +1041,30 @@ def main():
                     last_indexed = block_num
 
                 update_last_indexed_block(conn, last_indexed)
+                prune_block_hashes(conn, head_block)
+                print(f"Indexed up to block {last_indexed}")
+
+            elif last_indexed < current_block:
+                print(f"Indexing blocks {last_indexed + 1} to {current_block} in ranges...", flush=True)
+
+                try:
+                    last_indexed = index_range(conn, last_indexed + 1, current_block, head_block)
+                    prune_block_hashes(conn, head_block)
+                except Exception as e:
+                    print(f"Error indexing range: {e}", flush=True)
+                    conn.rollback()
+                    last_indexed = get_last_indexed_block(conn)
+
                 print(f"Indexed up to block {last_indexed}")
 
+            if PARTITION_RETENTION_DAYS and time.time() - last_retention >= PARTITION_RETENTION_INTERVAL:
+                last_retention = time.time()
+                try:
+                    apply_retention(conn)
+                except Exception as e:
+                    print(f"Error applying partition retention: {e}", flush=True)
+                    conn.rollback()
+
             time.sleep(POLL_INTERVAL)
 
     except KeyboardInterrupt:
@@ -440,4 +1074,17 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        # python event_indexer.py backfill [to_block]
+        backfill(to_block=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild-totals":
+        # python event_indexer.py rebuild-totals
+        conn = get_db_connection()
+        try:
+            rebuild_vault_totals(conn)
+        finally:
+            conn.close()
+    else:
+        main()
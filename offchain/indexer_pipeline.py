@@ -0,0 +1,189 @@
+"""
+TempoVault Async Indexer Pipeline
+Overlaps RPC fetch, decode and database writes using bounded asyncio queues
+
+    fetch (async RPC, several ranges in flight) -> decode -> write (one DB thread)
+
+Each stage hands work to the next through a bounded queue, so a slow
+database stops the fetcher instead of buffering unbounded ranges in memory.
+Decoding and writing reuse event_indexer.decode_logs and
+event_indexer.write_events_batch, so the resulting tables are identical to
+the synchronous indexer.
+
+Usage: python indexer_pipeline.py
+"""
+
+import asyncio
+import os
+import time
+from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+import event_indexer as indexer
+
+PIPELINE_WINDOW = int(os.getenv("PIPELINE_WINDOW", "2000"))
+PIPELINE_FETCH_CONCURRENCY = int(os.getenv("PIPELINE_FETCH_CONCURRENCY", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+
+class RpcRangeSource:
+    """Async JSON-RPC source of (logs, block timestamps) for block ranges"""
+
+    def __init__(self, rpc_url=indexer.RPC_URL):
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(rpc_url))
+
+    async def head(self):
+        return await self.w3.eth.block_number
+
+    async def fetch(self, start, end):
+        """Logs for [start, end], halving the range when the provider rejects it as too large"""
+        try:
+            logs = await self.w3.eth.get_logs({
+                "fromBlock": start,
+                "toBlock": end,
+                "address": indexer.LOG_FILTER_ADDRESSES,
+                "topics": [indexer.LOG_FILTER_TOPICS]
+            })
+        except Exception as e:
+            if start == end or not indexer.is_range_too_large(e):
+                raise
+            mid = (start + end) // 2
+            first, second = await asyncio.gather(self.fetch(start, mid), self.fetch(mid + 1, end))
+            return first[0] + second[0], {**first[1], **second[1]}
+
+        block_numbers = sorted({log["blockNumber"] for log in logs})
+        blocks = await asyncio.gather(*(self.w3.eth.get_block(n) for n in block_numbers))
+        return logs, {n: block["timestamp"] for n, block in zip(block_numbers, blocks)}
+
+
+async def fetch_stage(source, from_block, to_block, fetched):
+    """Schedule range fetches in block order; at most PIPELINE_FETCH_CONCURRENCY run at once"""
+    slots = asyncio.Semaphore(PIPELINE_FETCH_CONCURRENCY)
+
+    async def fetch_range(start, end):
+        async with slots:
+            return await source.fetch(start, end)
+
+    for start in range(from_block, to_block + 1, PIPELINE_WINDOW):
+        end = min(start + PIPELINE_WINDOW - 1, to_block)
+        # Queue the task itself so the decoder consumes ranges in order even if they finish out of order
+        await fetched.put((start, end, asyncio.create_task(fetch_range(start, end))))
+    await fetched.put(None)
+
+
+async def decode_stage(fetched, decoded):
+    """Await fetched ranges in order and decode their logs"""
+    while True:
+        item = await fetched.get()
+        if item is None:
+            await decoded.put(None)
+            return
+        start, end, task = item
+        logs, timestamps = await task
+        log_block_hashes = {log["blockNumber"]: Web3.to_hex(log["blockHash"]) for log in logs if "blockHash" in log}
+        await decoded.put((start, end, len(logs), log_block_hashes, indexer.decode_logs(logs, timestamps)))
+
+
+def write_range(conn, start, end, head, log_block_hashes, events):
+    """Write one decoded range, its recent block hashes and indexer_state in the same transaction"""
+    try:
+        if head is not None:
+            indexer.record_block_hashes(conn, start, end, head, log_block_hashes)
+        inserted = indexer.write_events_batch(conn, events)
+        indexer.update_last_indexed_block(conn, end)
+    except Exception:
+        conn.rollback()
+        raise
+    return inserted
+
+
+async def write_stage(conn, decoded, stats, head):
+    """Single writer: ranges are committed strictly in block order"""
+    while True:
+        item = await decoded.get()
+        if item is None:
+            return
+        start, end, log_count, log_block_hashes, events = item
+        inserted = await asyncio.to_thread(write_range, conn, start, end, head, log_block_hashes, events)
+        stats["last_indexed"] = end
+        stats["blocks"] += end - start + 1
+        stats["logs"] += log_count
+        print(f"Indexed blocks {start}-{end} ({log_count} logs, {inserted} new events)", flush=True)
+
+
+async def run_pipeline(conn, source, from_block, to_block, head=None):
+    """
+    Index [from_block, to_block] through the fetch -> decode -> write pipeline
+
+    With head set, hashes of blocks within REORG_WINDOW of it are recorded
+    for reorg detection. Returns the last committed block. If any stage fails
+    the others are cancelled and the error is raised; committed ranges stay
+    committed.
+    """
+    fetched = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    decoded = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stats = {"last_indexed": from_block - 1, "blocks": 0, "logs": 0}
+    started = time.time()
+
+    stages = [
+        asyncio.create_task(fetch_stage(source, from_block, to_block, fetched)),
+        asyncio.create_task(decode_stage(fetched, decoded)),
+        asyncio.create_task(write_stage(conn, decoded, stats, head)),
+    ]
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        for stage in stages:
+            stage.cancel()
+        # Drop fetches that were scheduled but never consumed
+        while not fetched.empty():
+            item = fetched.get_nowait()
+            if item is not None:
+                item[2].cancel()
+
+    elapsed = max(time.time() - started, 1e-6)
+    print(f"Pipeline indexed {stats['blocks']} blocks, {stats['logs']} logs in {elapsed:.1f}s "
+          f"({stats['blocks'] / elapsed:.0f} blocks/sec, {stats['logs'] / elapsed:.1f} logs/sec)", flush=True)
+    return stats["last_indexed"]
+
+
+async def main():
+    """Follow the chain head with the async pipeline"""
+    print("Starting TempoVault async indexer pipeline...", flush=True)
+    conn = indexer.get_db_connection()
+    source = RpcRangeSource()
+
+    try:
+        last_indexed = indexer.get_last_indexed_block(conn)
+        last_retention = 0.0
+        while True:
+            head_block = await source.head()
+            current_block = head_block - indexer.FINALITY_DEPTH
+
+            try:
+                last_indexed = await asyncio.to_thread(indexer.check_reorg, conn, last_indexed)
+                if last_indexed < current_block:
+                    last_indexed = await run_pipeline(conn, source, last_indexed + 1, current_block, head_block)
+                    await asyncio.to_thread(indexer.prune_block_hashes, conn, head_block)
+            except Exception as e:
+                print(f"Error in indexer pipeline: {e}", flush=True)
+                conn.rollback()
+                last_indexed = indexer.get_last_indexed_block(conn)
+
+            if indexer.PARTITION_RETENTION_DAYS and time.time() - last_retention >= indexer.PARTITION_RETENTION_INTERVAL:
+                last_retention = time.time()
+                try:
+                    await asyncio.to_thread(indexer.apply_retention, conn)
+                except Exception as e:
+                    print(f"Error applying partition retention: {e}", flush=True)
+                    conn.rollback()
+
+            await asyncio.sleep(indexer.POLL_INTERVAL)
+
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nShutting down indexer pipeline...")
@@ -1,8 +1,12 @@
 -- TempoVault Event Indexer Schema
 -- PostgreSQL 14+
 
+-- Range-partitioned by block_number, EVENTS_PARTITION_BLOCKS blocks per partition. Partitions are created by the
+-- indexer and archived by the retention policy (partitions.py); unique constraints must include block_number.
+-- The typed tables keep event_id without a foreign key, since one would have to reference (id, block_number).
+-- Existing unpartitioned databases: python partitions.py migrate
 CREATE TABLE IF NOT EXISTS events (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     block_number BIGINT NOT NULL,
     block_timestamp TIMESTAMP NOT NULL,
     transaction_hash VARCHAR(66) NOT NULL,
@@ -11,8 +15,9 @@ CREATE TABLE IF NOT EXISTS events (
     contract_address VARCHAR(42) NOT NULL,
     event_data JSONB NOT NULL,
     indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(transaction_hash, log_index)
-);
+    PRIMARY KEY (id, block_number),
+    UNIQUE (transaction_hash, log_index, block_number)
+) PARTITION BY RANGE (block_number);
 
 CREATE INDEX idx_events_block_number ON events(block_number);
 CREATE INDEX idx_events_event_type ON events(event_type);
@@ -23,7 +28,7 @@ CREATE INDEX idx_events_data_pair_id ON events((event_data->>'pairId'));
 
 CREATE TABLE IF NOT EXISTS deposits (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     vault_id BIGINT NOT NULL,
     token VARCHAR(42) NOT NULL,
     amount NUMERIC(78, 0) NOT NULL,
@@ -32,12 +37,15 @@ CREATE TABLE IF NOT EXISTS deposits (
     block_timestamp TIMESTAMP NOT NULL
 );
 
-CREATE INDEX idx_deposits_vault_id ON deposits(vault_id);
+-- Keyset pagination of a vault's history: WHERE vault_id = ? ORDER BY block_timestamp DESC, id DESC
+CREATE INDEX idx_deposits_vault_time ON deposits(vault_id, block_timestamp DESC, id DESC);
+-- event_id lookups: reorg rollback and the block-range joins of parquet_export.py
+CREATE INDEX idx_deposits_event_id ON deposits(event_id);
 CREATE INDEX idx_deposits_token ON deposits(token);
 
 CREATE TABLE IF NOT EXISTS withdrawals (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     vault_id BIGINT NOT NULL,
     token VARCHAR(42) NOT NULL,
     amount NUMERIC(78, 0) NOT NULL,
@@ -46,12 +54,13 @@ CREATE TABLE IF NOT EXISTS withdrawals (
     block_timestamp TIMESTAMP NOT NULL
 );
 
-CREATE INDEX idx_withdrawals_vault_id ON withdrawals(vault_id);
+CREATE INDEX idx_withdrawals_vault_time ON withdrawals(vault_id, block_timestamp DESC, id DESC);
+CREATE INDEX idx_withdrawals_event_id ON withdrawals(event_id);
 CREATE INDEX idx_withdrawals_token ON withdrawals(token);
 
 CREATE TABLE IF NOT EXISTS deployments (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     vault_id BIGINT NOT NULL,
     deployment_id BIGINT NOT NULL,
     strategy VARCHAR(42) NOT NULL,
@@ -61,25 +70,27 @@ CREATE TABLE IF NOT EXISTS deployments (
     block_timestamp TIMESTAMP NOT NULL
 );
 
-CREATE INDEX idx_deployments_vault_id ON deployments(vault_id);
+CREATE INDEX idx_deployments_vault_time ON deployments(vault_id, block_timestamp DESC, id DESC);
+CREATE INDEX idx_deployments_event_id ON deployments(event_id);
 CREATE INDEX idx_deployments_deployment_id ON deployments(deployment_id);
 CREATE INDEX idx_deployments_pair_id ON deployments(pair_id);
 
 CREATE TABLE IF NOT EXISTS recalls (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     vault_id BIGINT NOT NULL,
     deployment_id BIGINT NOT NULL,
     returned_amount NUMERIC(78, 0) NOT NULL,
     block_timestamp TIMESTAMP NOT NULL
 );
 
-CREATE INDEX idx_recalls_vault_id ON recalls(vault_id);
+CREATE INDEX idx_recalls_vault_time ON recalls(vault_id, block_timestamp DESC, id DESC);
+CREATE INDEX idx_recalls_event_id ON recalls(event_id);
 CREATE INDEX idx_recalls_deployment_id ON recalls(deployment_id);
 
 CREATE TABLE IF NOT EXISTS losses (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     vault_id BIGINT NOT NULL,
     deployment_id BIGINT NOT NULL,
     token VARCHAR(42) NOT NULL,
@@ -89,12 +100,13 @@ CREATE TABLE IF NOT EXISTS losses (
     block_timestamp TIMESTAMP NOT NULL
 );
 
-CREATE INDEX idx_losses_vault_id ON losses(vault_id);
+CREATE INDEX idx_losses_vault_time ON losses(vault_id, block_timestamp DESC, id DESC);
+CREATE INDEX idx_losses_event_id ON losses(event_id);
 CREATE INDEX idx_losses_token ON losses(token);
 
 CREATE TABLE IF NOT EXISTS performance_fees (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     vault_id BIGINT NOT NULL,
     token VARCHAR(42) NOT NULL,
     yield_amount NUMERIC(78, 0) NOT NULL,
@@ -102,11 +114,12 @@ CREATE TABLE IF NOT EXISTS performance_fees (
     block_timestamp TIMESTAMP NOT NULL
 );
 
-CREATE INDEX idx_performance_fees_vault_id ON performance_fees(vault_id);
+CREATE INDEX idx_performance_fees_vault_time ON performance_fees(vault_id, block_timestamp DESC, id DESC);
+CREATE INDEX idx_performance_fees_event_id ON performance_fees(event_id);
 
 CREATE TABLE IF NOT EXISTS management_fees (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     vault_id BIGINT NOT NULL,
     token VARCHAR(42) NOT NULL,
     fee_amount NUMERIC(78, 0) NOT NULL,
@@ -114,25 +127,30 @@ CREATE TABLE IF NOT EXISTS management_fees (
     block_timestamp TIMESTAMP NOT NULL
 );
 
-CREATE INDEX idx_management_fees_vault_id ON management_fees(vault_id);
+CREATE INDEX idx_management_fees_vault_time ON management_fees(vault_id, block_timestamp DESC, id DESC);
+CREATE INDEX idx_management_fees_event_id ON management_fees(event_id);
 
+-- One row per relay tick per pair, range-partitioned by month of block_timestamp (partitions.py)
 CREATE TABLE IF NOT EXISTS oracle_updates (
-    id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    id BIGSERIAL,
+    event_id BIGINT,
     pair_id VARCHAR(66) NOT NULL,
     peg_deviation INTEGER NOT NULL,
     orderbook_depth_bid NUMERIC(78, 0) NOT NULL,
     orderbook_depth_ask NUMERIC(78, 0) NOT NULL,
     nonce BIGINT NOT NULL,
-    block_timestamp TIMESTAMP NOT NULL
-);
+    block_timestamp TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, block_timestamp)
+) PARTITION BY RANGE (block_timestamp);
 
-CREATE INDEX idx_oracle_updates_pair_id ON oracle_updates(pair_id);
+-- Latest signal per pair: WHERE pair_id = ? ORDER BY block_timestamp DESC LIMIT 1
+CREATE INDEX idx_oracle_updates_pair_time ON oracle_updates(pair_id, block_timestamp DESC, id DESC);
 CREATE INDEX idx_oracle_updates_nonce ON oracle_updates(nonce);
+CREATE INDEX idx_oracle_updates_event_id ON oracle_updates(event_id);
 
 CREATE TABLE IF NOT EXISTS circuit_breakers (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     pair_id VARCHAR(66) NOT NULL,
     triggered BOOLEAN NOT NULL,
     triggered_by VARCHAR(42) NOT NULL,
@@ -143,7 +161,7 @@ CREATE INDEX idx_circuit_breakers_pair_id ON circuit_breakers(pair_id);
 
 CREATE TABLE IF NOT EXISTS orders_placed (
     id BIGSERIAL PRIMARY KEY,
-    event_id BIGINT REFERENCES events(id),
+    event_id BIGINT,
     pair_id VARCHAR(66) NOT NULL,
     order_id BIGINT NOT NULL,
     tick INTEGER NOT NULL,
@@ -166,22 +184,49 @@ CREATE TABLE IF NOT EXISTS indexer_state (
 INSERT INTO indexer_state (id, last_indexed_block) VALUES (1, 0)
 ON CONFLICT (id) DO NOTHING;
 
+-- Per-chunk progress for parallel backfill (event_indexer.py backfill)
+CREATE TABLE IF NOT EXISTS indexer_chunks (
+    chunk_start BIGINT PRIMARY KEY,
+    chunk_end BIGINT NOT NULL,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    log_count INTEGER NOT NULL DEFAULT 0,
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX idx_indexer_chunks_pending ON indexer_chunks(chunk_start) WHERE NOT completed;
+
+-- Hashes of recently indexed blocks (last REORG_WINDOW blocks) for reorg detection
+CREATE TABLE IF NOT EXISTS indexed_blocks (
+    block_number BIGINT PRIMARY KEY,
+    block_hash VARCHAR(66) NOT NULL,
+    parent_hash VARCHAR(66) NOT NULL,
+    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Running per-(vault, token) totals, updated by the indexer in the same transaction as each event insert
+-- Rebuild from the typed tables with: python event_indexer.py rebuild-totals
+CREATE TABLE IF NOT EXISTS vault_totals (
+    vault_id BIGINT NOT NULL,
+    token VARCHAR(42) NOT NULL,
+    total_deposited NUMERIC(78, 0) NOT NULL DEFAULT 0,
+    total_withdrawn NUMERIC(78, 0) NOT NULL DEFAULT 0,
+    total_deployed NUMERIC(78, 0) NOT NULL DEFAULT 0,
+    total_losses NUMERIC(78, 0) NOT NULL DEFAULT 0,
+    total_performance_fees NUMERIC(78, 0) NOT NULL DEFAULT 0,
+    total_management_fees NUMERIC(78, 0) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (vault_id, token)
+);
+
+DROP VIEW IF EXISTS vault_summary;
 CREATE VIEW vault_summary AS
 SELECT
-    d.vault_id,
-    d.token,
-    COALESCE(SUM(d.amount), 0) as total_deposited,
-    COALESCE(SUM(w.amount), 0) as total_withdrawn,
-    COALESCE(SUM(dep.amount), 0) as total_deployed,
-    COALESCE(SUM(l.loss), 0) as total_losses,
-    COALESCE(SUM(pf.fee_amount), 0) as total_performance_fees,
-    COALESCE(SUM(mf.fee_amount), 0) as total_management_fees
-FROM
-    (SELECT DISTINCT vault_id, token FROM deposits) AS vaults
-LEFT JOIN deposits d USING (vault_id, token)
-LEFT JOIN withdrawals w USING (vault_id, token)
-LEFT JOIN deployments dep USING (vault_id, token)
-LEFT JOIN losses l USING (vault_id, token)
-LEFT JOIN performance_fees pf USING (vault_id, token)
-LEFT JOIN management_fees mf USING (vault_id, token)
-GROUP BY vaults.vault_id, vaults.token;
+    vault_id,
+    token,
+    total_deposited,
+    total_withdrawn,
+    total_deployed,
+    total_losses,
+    total_performance_fees,
+    total_management_fees
+FROM vault_totals;
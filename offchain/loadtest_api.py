@@ -0,0 +1,74 @@
+"""
+Load test for the API server: p50/p99 latency of /api/v1/vault/{id}/pnl at a fixed concurrency
+
+Usage: API_URL=http://localhost:3000 python loadtest_api.py <vault_id> <token> [concurrency] [requests]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import aiohttp
+
+API_URL = os.getenv("API_URL", "http://localhost:3000")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def worker(session, url, params, remaining, latencies, errors):
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        started = time.perf_counter()
+        try:
+            async with session.get(url, params=params) as response:
+                await response.read()
+                if response.status != 200:
+                    errors[response.status] = errors.get(response.status, 0) + 1
+                    continue
+        except aiohttp.ClientError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run(vault_id, token, concurrency, requests):
+    url = f"{API_URL.rstrip('/')}/api/v1/vault/{vault_id}/pnl"
+    params = {"token": token}
+    latencies, errors = [], {}
+    remaining = [requests]
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Warm up connections (and the server's pool) before measuring
+        async with session.get(url, params=params) as response:
+            await response.read()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(session, url, params, remaining, latencies, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"GET {url} x{requests} at concurrency {concurrency}")
+    print(f"  ok: {len(latencies)}  errors: {sum(errors.values())} {errors if errors else ''}")
+    print(f"  throughput: {len(latencies) / elapsed:,.0f} req/s over {elapsed:.2f}s")
+    print(f"  latency ms: p50={percentile(latencies, 50):.1f}  p90={percentile(latencies, 90):.1f}  "
+          f"p99={percentile(latencies, 99):.1f}  max={latencies[-1] if latencies else 0:.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    asyncio.run(run(
+        int(sys.argv[1]),
+        sys.argv[2],
+        int(sys.argv[3]) if len(sys.argv) > 3 else 50,
+        int(sys.argv[4]) if len(sys.argv) > 4 else 5000,
+    ))
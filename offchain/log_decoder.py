@@ -0,0 +1,192 @@
+"""
+TempoVault Log Decoder
+Compiled per-event ABI decoders and (address, topic0) dispatch for the event indexer
+"""
+
+from functools import lru_cache
+from eth_abi import decode as abi_decode
+from eth_utils import keccak, to_checksum_address
+
+
+def canonical_type(abi_input):
+    """Canonical ABI type string, expanding tuples into (t1,t2,...)"""
+    abi_type = abi_input["type"]
+    if abi_type.startswith("tuple"):
+        components = ",".join(canonical_type(c) for c in abi_input["components"])
+        return f"({components}){abi_type[len('tuple'):]}"
+    return abi_type
+
+
+def event_signature(event_abi):
+    """Canonical event signature, e.g. Deposited(uint256,address,uint256,address,uint256)"""
+    return f"{event_abi['name']}({','.join(canonical_type(i) for i in event_abi['inputs'])})"
+
+
+def event_topic(event_abi):
+    """topic0 of an event as raw bytes"""
+    return keccak(text=event_signature(event_abi))
+
+
+def field_name(abi_input):
+    """Argument name as stored in event_data (Solidity's leading underscore dropped: _pairId -> pairId)"""
+    return abi_input["name"].lstrip("_")
+
+
+@lru_cache(maxsize=4096)
+def _checksum(address_bytes):
+    return to_checksum_address(address_bytes)
+
+
+def _is_static(abi_input):
+    """Whether a type occupies a fixed number of 32-byte head words"""
+    abi_type = abi_input["type"]
+    if abi_type.endswith("]"):
+        return False
+    if abi_type == "tuple":
+        return all(_is_static(c) for c in abi_input["components"])
+    return abi_type not in ("bytes", "string")
+
+
+def _word_count(abi_input):
+    if abi_input["type"] == "tuple":
+        return sum(_word_count(c) for c in abi_input["components"])
+    return 1
+
+
+def _word_converter(abi_type):
+    """Converter from one 32-byte ABI word to a JSON-safe value"""
+    if abi_type.startswith("uint"):
+        return lambda word: int.from_bytes(word, "big")
+    if abi_type.startswith("int"):
+        return lambda word: int.from_bytes(word, "big", signed=True)
+    if abi_type == "address":
+        return lambda word: _checksum(word[12:])
+    if abi_type == "bool":
+        return lambda word: word[31] == 1
+    if abi_type.startswith("bytes"):
+        size = int(abi_type[len("bytes"):])
+        return lambda word: "0x" + bytes(word[:size]).hex()
+    raise ValueError(f"Not a single-word type: {abi_type}")
+
+
+def _static_reader(abi_input):
+    """(word_count, reader) where reader(words, offset) decodes a static value from head words"""
+    if abi_input["type"] == "tuple":
+        fields = [(field_name(c), _static_reader(c)) for c in abi_input["components"]]
+
+        def read_tuple(words, offset):
+            value = {}
+            for name, (count, reader) in fields:
+                value[name] = reader(words, offset)
+                offset += count
+            return value
+
+        return _word_count(abi_input), read_tuple
+
+    convert = _word_converter(abi_input["type"])
+    return 1, lambda words, offset: convert(words[offset])
+
+
+def normalize_value(abi_input, value):
+    """JSON-safe form of an eth_abi decoded value: checksummed addresses, 0x-hex bytes, tuples as dicts"""
+    abi_type = abi_input["type"]
+    if abi_type.endswith("]"):
+        element = dict(abi_input, type=abi_type[:abi_type.rindex("[")])
+        return [normalize_value(element, v) for v in value]
+    if abi_type == "tuple":
+        return {field_name(c): normalize_value(c, v) for c, v in zip(abi_input["components"], value)}
+    if abi_type == "address":
+        return to_checksum_address(value)
+    if abi_type.startswith("bytes"):
+        return "0x" + bytes(value).hex()
+    return value
+
+
+class EventDecoder:
+    """
+    Decoder specialized for one event ABI
+
+    Indexed arguments are read straight from topics. When every
+    non-indexed argument is static (the common case for our events) the data
+    section is sliced into 32-byte words and converted without going through
+    eth_abi; otherwise eth_abi.decode is used for the data section.
+    """
+
+    def __init__(self, event_abi):
+        self.name = event_abi["name"]
+        self.signature = event_signature(event_abi)
+        self.topic = keccak(text=self.signature)
+
+        self.indexed = []
+        data_inputs = []
+        for abi_input in event_abi["inputs"]:
+            if abi_input.get("indexed"):
+                if _is_static(abi_input) and abi_input["type"] != "tuple":
+                    convert = _word_converter(abi_input["type"])
+                else:
+                    # Dynamic indexed values are stored as their keccak hash
+                    convert = lambda word: "0x" + bytes(word).hex()
+                self.indexed.append((field_name(abi_input), convert))
+            else:
+                data_inputs.append(abi_input)
+
+        self.data_inputs = data_inputs
+        self.data_types = [canonical_type(i) for i in data_inputs]
+        self.data_static = all(_is_static(i) for i in data_inputs)
+        self.data_words = sum(_word_count(i) for i in data_inputs) if self.data_static else None
+        self.data_readers = [(field_name(i), _static_reader(i)) for i in data_inputs] if self.data_static else None
+
+    def decode(self, topics, data):
+        """Decode topics[1:] and data into a {name: value} dict"""
+        if len(topics) != len(self.indexed) + 1:
+            raise ValueError(f"{self.name}: expected {len(self.indexed) + 1} topics, got {len(topics)}")
+
+        args = {}
+        for (name, convert), topic in zip(self.indexed, topics[1:]):
+            args[name] = convert(topic)
+
+        data = bytes(data)
+        if self.data_static:
+            if len(data) < self.data_words * 32:
+                raise ValueError(f"{self.name}: data too short ({len(data)} bytes)")
+            words = [data[i:i + 32] for i in range(0, self.data_words * 32, 32)]
+            offset = 0
+            for name, (count, reader) in self.data_readers:
+                args[name] = reader(words, offset)
+                offset += count
+        else:
+            values = abi_decode(self.data_types, data)
+            for abi_input, value in zip(self.data_inputs, values):
+                args[field_name(abi_input)] = normalize_value(abi_input, value)
+
+        return args
+
+
+class DecoderRegistry:
+    """
+    Compiled (address, topic0) -> EventDecoder map, built once at startup
+
+    contracts is {address: (contract_name, abi)} as in DEPLOYED_CONTRACTS.
+    Lookups key on the lowercase address and the raw 32-byte topic0.
+    """
+
+    def __init__(self, contracts):
+        self.addresses = frozenset(address.lower() for address in contracts)
+        self.decoders = {}
+        self.topics = {}
+
+        for address, (contract_name, abi) in contracts.items():
+            for event_abi in abi:
+                if event_abi.get("type") != "event" or event_abi.get("anonymous"):
+                    continue
+                decoder = EventDecoder(event_abi)
+                self.decoders[(address.lower(), decoder.topic)] = decoder
+                self.topics.setdefault(decoder.topic, decoder)
+
+    def lookup(self, address, topic0):
+        """Decoder for a log's (address, topic0), or None if it is not one of ours"""
+        return self.decoders.get((address.lower(), topic0))
+
+    def topic_filter(self):
+        """0x-hex topic0 list for eth_getLogs filters"""
+        return ["0x" + topic.hex() for topic in self.topics]
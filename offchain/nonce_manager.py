@@ -0,0 +1,297 @@
+"""
+TempoVault Transaction Nonce Manager
+Assigns account nonces locally so several transactions from one key can be pending at once
+
+The next nonce is read from the node once and then incremented locally; every
+sent transaction is tracked until it is mined. When the node rejects a nonce
+(another process sending with the same key, a dropped transaction, a restart)
+the manager resyncs: it rebroadcasts its own dropped transactions, fills
+nonce gaps with no-op transactions and continues after the node's pending
+count. Stuck transactions can be sped up or cancelled at the same nonce with
+bumped fees. On start it adopts the account's transactions still in the
+node's txpool, so a restarted relay can replace what it sent before.
+
+Usage:
+    python nonce_manager.py                 # account nonces and pending transactions
+    python nonce_manager.py cancel <nonce>  # replace a pending transaction with a 0-value self-transfer
+"""
+
+import os
+import threading
+import time
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+# Percent a replacement's fees are raised over the pending transaction's (geth and anvil require at least 10)
+NONCE_FEE_BUMP_PERCENT = int(os.getenv("NONCE_FEE_BUMP_PERCENT", "15"))
+# Seconds a transaction may stay pending before replace_stuck() resends it with bumped fees
+NONCE_STUCK_AFTER = float(os.getenv("NONCE_STUCK_AFTER", "90"))
+# Resyncs and retries after the node rejects a nonce
+NONCE_SEND_RETRIES = int(os.getenv("NONCE_SEND_RETRIES", "3"))
+
+# Node error messages meaning the nonce, not the transaction, was the problem
+NONCE_ERRORS = (
+    "nonce too low", "nonce too high", "invalid nonce", "already known", "known transaction",
+    "replacement transaction underpriced",
+)
+FEE_FIELDS = ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas")
+
+
+def is_nonce_error(error):
+    message = str(error).lower()
+    return any(text in message for text in NONCE_ERRORS)
+
+
+def is_underpriced(error):
+    """Fees below the node's minimum; not a nonce conflict, so the nonce is kept and the fees raised"""
+    message = str(error).lower()
+    return "underpriced" in message and "replacement transaction underpriced" not in message
+
+
+def bump_fees(tx, previous, percent=NONCE_FEE_BUMP_PERCENT):
+    """tx with every fee field of previous raised by percent (and never below tx's own fee)"""
+    bumped = {key: value for key, value in tx.items() if key not in FEE_FIELDS}
+    for key in FEE_FIELDS:
+        if key in previous:
+            bumped[key] = max(previous[key] * (100 + percent) // 100 + 1, tx.get(key, 0))
+    return bumped
+
+
+class NonceManager:
+    """Local nonce assignment and bookkeeping of pending transactions for one account"""
+
+    def __init__(self, w3, account):
+        self.w3 = w3
+        self.account = account
+        self.lock = threading.Lock()
+        self.next_nonce = None
+        # nonce -> {"tx", "raw", "hash", "hashes" (every hash sent at this nonce), "sent_at", "replacements"}
+        self.pending = {}
+        self.hash_nonces = {}
+
+    def _count(self, block_identifier):
+        return self.w3.eth.get_transaction_count(self.account.address, block_identifier)
+
+    def _known(self, tx_hash):
+        try:
+            self.w3.eth.get_transaction(tx_hash)
+            return True
+        except TransactionNotFound:
+            return False
+
+    def _forget(self, nonce):
+        entry = self.pending.pop(nonce, None)
+        if entry:
+            for tx_hash in entry["hashes"]:
+                self.hash_nonces.pop(tx_hash, None)
+
+    def _record(self, nonce, tx, signed, replacing=None):
+        tx_hash = signed.hash
+        hashes = (replacing["hashes"] if replacing else []) + [tx_hash]
+        self.pending[nonce] = {
+            "tx": tx, "raw": signed.rawTransaction, "hash": tx_hash, "hashes": hashes,
+            "sent_at": time.time(), "replacements": replacing["replacements"] + 1 if replacing else 0,
+        }
+        self.hash_nonces[tx_hash] = nonce
+        return tx_hash
+
+    def _adopt_txpool(self):
+        """Track this account's transactions that are still in the node's txpool (sent before a restart)"""
+        try:
+            response = self.w3.provider.make_request("txpool_content", [])
+        except Exception:
+            return
+        pool = response.get("result") or {}
+        for section in ("pending", "queued"):
+            for address, transactions in (pool.get(section) or {}).items():
+                if address.lower() != self.account.address.lower():
+                    continue
+                for nonce, tx in transactions.items():
+                    nonce = int(nonce)
+                    if nonce in self.pending:
+                        continue
+                    fields = {
+                        "to": Web3.to_checksum_address(tx["to"]) if tx.get("to") else b"", "value": int(tx["value"], 16), "gas": int(tx["gas"], 16),
+                        "data": tx.get("input", "0x"), "chainId": self.w3.eth.chain_id,
+                    }
+                    fields.update({key: int(tx[key], 16) for key in FEE_FIELDS if tx.get(key)})
+                    if "maxFeePerGas" in fields:
+                        fields.pop("gasPrice", None)
+                    tx_hash = Web3.to_bytes(hexstr=tx["hash"])
+                    self.pending[nonce] = {
+                        "tx": fields, "raw": None, "hash": tx_hash, "hashes": [tx_hash],
+                        "sent_at": time.time(), "replacements": 0,
+                    }
+                    self.hash_nonces[tx_hash] = nonce
+
+    def _sync(self, adopt=False):
+        mined = self._count("latest")
+        for nonce in [n for n in self.pending if n < mined]:
+            self._forget(nonce)
+        if adopt:
+            self._adopt_txpool()
+
+        # Rebroadcast our transactions the node no longer has; nonces it cannot take are forgotten
+        for nonce in sorted(self.pending):
+            entry = self.pending[nonce]
+            if entry["raw"] is None or self._known(entry["hash"]):
+                continue
+            try:
+                self.w3.eth.send_raw_transaction(entry["raw"])
+                print(f"Rebroadcast dropped transaction {Web3.to_hex(entry['hash'])} (nonce {nonce})", flush=True)
+            except Exception as e:
+                print(f"Dropping nonce {nonce} from tracking: {e}", flush=True)
+                self._forget(nonce)
+
+        # Fill gaps below our highest pending nonce, otherwise nothing after them can be mined
+        node_pending = self._count("pending")
+        while self.pending and node_pending < max(self.pending) and node_pending not in self.pending:
+            print(f"Filling nonce gap at {node_pending}", flush=True)
+            self._send_at(node_pending, {**self._cancel_tx(), "gasPrice": self.w3.eth.gas_price})
+            node_pending = self._count("pending")
+
+        self.next_nonce = max([node_pending] + [nonce + 1 for nonce in self.pending])
+
+    def _cancel_tx(self):
+        """0-value self-transfer, without fees"""
+        return {"to": self.account.address, "value": 0, "gas": 21000, "data": b"", "chainId": self.w3.eth.chain_id}
+
+    def _send_at(self, nonce, tx, replacing=None):
+        signed = self.account.sign_transaction({**tx, "nonce": nonce})
+        try:
+            self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception as e:
+            # Our own identical transaction is already in the pool: the send succeeded
+            if "already known" not in str(e).lower() and "known transaction" not in str(e).lower():
+                raise
+        return self._record(nonce, tx, signed, replacing)
+
+    def sync(self):
+        """Reload the next nonce from the node and reconcile pending transactions with it"""
+        with self.lock:
+            self._sync(adopt=self.next_nonce is None)
+
+    def send(self, tx):
+        """
+        Sign and broadcast tx (a transaction dict without nonce) at the next local nonce
+
+        Nonce errors trigger a resync and a retry. A transaction priced
+        below the node's minimum is retried at the same nonce with fees
+        bumped by NONCE_FEE_BUMP_PERCENT (and at least the node's gas price),
+        since skipping the nonce would leave a gap that blocks every later
+        transaction. Any other error is re-raised and the next send resyncs
+        first, in case the node took the transaction anyway (e.g. a timeout).
+        Returns the transaction hash.
+        """
+        with self.lock:
+            if self.next_nonce is None:
+                self._sync(adopt=True)
+            for attempt in range(NONCE_SEND_RETRIES + 1):
+                nonce = self.next_nonce
+                try:
+                    tx_hash = self._send_at(nonce, tx)
+                except Exception as e:
+                    if attempt == NONCE_SEND_RETRIES or not (is_nonce_error(e) or is_underpriced(e)):
+                        self.next_nonce = None
+                        raise
+                    if is_underpriced(e):
+                        print(f"Transaction at nonce {nonce} underpriced ({e}); raising fees", flush=True)
+                        tx = bump_fees(tx, tx)
+                        if "gasPrice" in tx:
+                            tx["gasPrice"] = max(tx["gasPrice"], self.w3.eth.gas_price)
+                        continue
+                    print(f"Nonce {nonce} rejected ({e}); resyncing", flush=True)
+                    self._sync()
+                    if "replacement transaction underpriced" in str(e).lower():
+                        # Another sender's transaction holds this nonce in the pool
+                        self.next_nonce = max(self.next_nonce, nonce + 1)
+                    continue
+                self.next_nonce = nonce + 1
+                return tx_hash
+
+    def replace(self, nonce, tx=None):
+        """
+        Resend the pending transaction at nonce with fees bumped by NONCE_FEE_BUMP_PERCENT
+
+        tx=None resends the same transaction (a speed-up). Returns the new
+        hash, or None if the nonce was mined in the meantime.
+        """
+        with self.lock:
+            entry = self.pending.get(nonce)
+            if entry is None:
+                raise ValueError(f"No pending transaction tracked at nonce {nonce}")
+            replacement = bump_fees(tx if tx is not None else entry["tx"], entry["tx"])
+            if "gasPrice" in replacement:
+                replacement["gasPrice"] = max(replacement["gasPrice"], self.w3.eth.gas_price)
+            try:
+                return self._send_at(nonce, replacement, replacing=entry)
+            except Exception as e:
+                if "nonce too low" not in str(e).lower():
+                    raise
+                self._forget(nonce)
+                return None
+
+    def cancel(self, nonce):
+        """Replace the pending transaction at nonce with a 0-value self-transfer"""
+        return self.replace(nonce, self._cancel_tx())
+
+    def replace_stuck(self, max_age=NONCE_STUCK_AFTER):
+        """Speed up every transaction pending for longer than max_age seconds; returns [(nonce, new_hash)]"""
+        with self.lock:
+            mined = self._count("latest")
+            for nonce in [n for n in self.pending if n < mined]:
+                self._forget(nonce)
+            stuck = sorted(n for n, entry in self.pending.items() if time.time() - entry["sent_at"] >= max_age)
+        replaced = []
+        for nonce in stuck:
+            new_hash = self.replace(nonce)
+            if new_hash is not None:
+                print(f"Replaced stuck transaction at nonce {nonce} with {Web3.to_hex(new_hash)}", flush=True)
+                replaced.append((nonce, new_hash))
+        return replaced
+
+    def receipt(self, tx_hash):
+        """Receipt of tx_hash or of whichever transaction replaced it; None while pending"""
+        tx_hash = bytes(tx_hash)
+        with self.lock:
+            nonce = self.hash_nonces.get(tx_hash)
+            hashes = list(self.pending[nonce]["hashes"]) if nonce in self.pending else [tx_hash]
+        for candidate in reversed(hashes):
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(candidate)
+            except TransactionNotFound:
+                continue
+            if nonce is not None:
+                with self.lock:
+                    self._forget(nonce)
+            return receipt
+        return None
+
+    def status(self):
+        with self.lock:
+            return {
+                "address": self.account.address,
+                "next_nonce": self.next_nonce,
+                "pending": {
+                    nonce: {"hash": Web3.to_hex(entry["hash"]), "age": round(time.time() - entry["sent_at"], 1),
+                            "replacements": entry["replacements"]}
+                    for nonce, entry in sorted(self.pending.items())
+                },
+            }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    from eth_account import Account
+
+    w3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL", "https://rpc.moderato.tempo.xyz")))
+    manager = NonceManager(w3, Account.from_key(os.getenv("ORACLE_PRIVATE_KEY")))
+    manager.sync()
+
+    if len(sys.argv) > 2 and sys.argv[1] == "cancel":
+        tx_hash = manager.cancel(int(sys.argv[2]))
+        print(f"Cancellation sent: {Web3.to_hex(tx_hash)}" if tx_hash else "Already mined", flush=True)
+    else:
+        print(f"Mined nonce count: {manager._count('latest')}, pending count: {manager._count('pending')}")
+        print(json.dumps(manager.status(), indent=2))
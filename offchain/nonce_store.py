@@ -0,0 +1,99 @@
+"""
+TempoVault Nonce Store
+Per-pair oracle signal nonces in a SQLite file shared by every process on the host
+
+Each allocation is a single upsert ... RETURNING statement, which SQLite runs
+under the database write lock, so uvicorn workers (or separate engines)
+pointed at the same file never hand out the same nonce, and the counters
+survive restarts. advance() raises a pair's counter to at least a given
+value, such as RiskController.oracleNonces, and never lowers it. issue()
+also hands out the signal timestamp with the nonce, so both increase together.
+
+Usage: python nonce_store.py [db_path]   # current nonce of every pair
+"""
+
+import os
+import sqlite3
+import threading
+
+# SQLite file holding the counters; every engine process on the host must use the same one
+RISK_ENGINE_NONCE_DB = os.getenv("RISK_ENGINE_NONCE_DB", "risk_nonces.db")
+# Milliseconds a process waits for another one's write lock before failing
+NONCE_STORE_BUSY_TIMEOUT = int(os.getenv("NONCE_STORE_BUSY_TIMEOUT", "5000"))
+
+
+class NonceStore:
+    """Atomic per-pair counters; one connection per store, usable from any thread"""
+
+    def __init__(self, path=RISK_ENGINE_NONCE_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        # Autocommit: every statement is its own transaction
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute(f"PRAGMA busy_timeout = {NONCE_STORE_BUSY_TIMEOUT}")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS nonces (pair_id TEXT PRIMARY KEY, nonce INTEGER NOT NULL)")
+        # Files written before issue() existed have no issued_at column
+        if "issued_at" not in [row[1] for row in self.db.execute("PRAGMA table_info(nonces)")]:
+            self.db.execute("ALTER TABLE nonces ADD COLUMN issued_at INTEGER NOT NULL DEFAULT 0")
+
+    def _one(self, sql, params):
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()[0][0]
+
+    def allocate(self, pair_id: str) -> int:
+        """Next nonce for the pair (1 for a new pair); never returned to any other caller"""
+        return self._one(
+            "INSERT INTO nonces (pair_id, nonce) VALUES (?, 1) "
+            "ON CONFLICT (pair_id) DO UPDATE SET nonce = nonce + 1 RETURNING nonce",
+            (pair_id.lower(),)
+        )
+
+    def issue(self, pair_id: str, now: int) -> tuple[int, int]:
+        """
+        Next (nonce, timestamp) for a signal of the pair
+
+        The timestamp is now, or one second past the pair's last issued one,
+        as RiskController requires strictly increasing timestamps; a burst of
+        issues runs ahead of the clock by a second per signal.
+        """
+        with self.lock:
+            return self.db.execute(
+                "INSERT INTO nonces (pair_id, nonce, issued_at) VALUES (?, 1, ?) "
+                "ON CONFLICT (pair_id) DO UPDATE "
+                "SET nonce = nonce + 1, issued_at = max(excluded.issued_at, issued_at + 1) "
+                "RETURNING nonce, issued_at",
+                (pair_id.lower(), now)
+            ).fetchone()
+
+    def advance(self, pair_id: str, nonce: int) -> int:
+        """Raise the pair's counter to at least nonce (the next allocation is above it); returns the counter"""
+        return self._one(
+            "INSERT INTO nonces (pair_id, nonce) VALUES (?, ?) "
+            "ON CONFLICT (pair_id) DO UPDATE SET nonce = max(nonce, excluded.nonce) RETURNING nonce",
+            (pair_id.lower(), nonce)
+        )
+
+    def current(self, pair_id: str) -> int:
+        """Last nonce allocated for the pair, 0 if none"""
+        with self.lock:
+            row = self.db.execute("SELECT nonce FROM nonces WHERE pair_id = ?", (pair_id.lower(),)).fetchone()
+        return row[0] if row else 0
+
+    def all(self) -> dict:
+        with self.lock:
+            return dict(self.db.execute("SELECT pair_id, nonce FROM nonces ORDER BY pair_id"))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = NonceStore(sys.argv[1] if len(sys.argv) > 1 else RISK_ENGINE_NONCE_DB)
+    nonces = store.all()
+    print(f"{len(nonces)} pairs in {store.path}")
+    for pair_id, nonce in nonces.items():
+        print(f"  {pair_id}: {nonce}")
@@ -0,0 +1,120 @@
+"""
+TempoVault On-chain Reader
+Batches contract view calls into one Multicall3 aggregate3 call (or one JSON-RPC batch) pinned to a single block
+"""
+
+import os
+import requests
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from log_decoder import canonical_type
+
+# Canonical Multicall3 deployment (same address on every chain it is deployed to); empty disables it
+MULTICALL3_ADDRESS = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+# Calls per aggregate3 / JSON-RPC batch request; larger read sets are split but stay on the same block
+MULTICALL_BATCH_SIZE = int(os.getenv("MULTICALL_BATCH_SIZE", "200"))
+
+AGGREGATE3_ABI = [{
+    "type": "function",
+    "name": "aggregate3",
+    "stateMutability": "payable",
+    "inputs": [{"name": "calls", "type": "tuple[]", "components": [
+        {"name": "target", "type": "address"},
+        {"name": "allowFailure", "type": "bool"},
+        {"name": "callData", "type": "bytes"},
+    ]}],
+    "outputs": [{"name": "returnData", "type": "tuple[]", "components": [
+        {"name": "success", "type": "bool"},
+        {"name": "returnData", "type": "bytes"},
+    ]}],
+}]
+
+
+class OnchainReadError(Exception):
+    """A batched view call reverted or the RPC rejected it"""
+
+
+def describe_call(fn):
+    return f"{fn.address}.{fn.fn_name}({', '.join(str(a) for a in fn.args)})"
+
+
+class OnchainReader:
+    """
+    Executes a list of web3 ContractFunction view calls as one consistent read
+
+    Every call is evaluated against the same block. Multicall3 aggregate3 is
+    used when code exists at MULTICALL3_ADDRESS, otherwise the calls are sent
+    as one JSON-RPC batch of eth_call requests.
+    """
+
+    def __init__(self, w3, multicall_address=MULTICALL3_ADDRESS):
+        self.w3 = w3
+        self.multicall = None
+        if multicall_address:
+            self.multicall = w3.eth.contract(address=Web3.to_checksum_address(multicall_address), abi=AGGREGATE3_ABI)
+        self.multicall_deployed = None
+        self.session = requests.Session()
+
+    def mode(self):
+        """"multicall" or "batch", checking once whether Multicall3 is deployed"""
+        if self.multicall_deployed is None:
+            self.multicall_deployed = bool(self.multicall and self.w3.eth.get_code(self.multicall.address))
+        return "multicall" if self.multicall_deployed else "batch"
+
+    def decode(self, fn, data):
+        """Decode return data exactly as ContractFunction.call would"""
+        output_types = [canonical_type(o) for o in fn.abi["outputs"]]
+        values = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, self.w3.codec.decode(output_types, data))
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def read(self, calls, block_identifier=None):
+        """
+        Execute calls at one block; returns (block_number, [decoded result per call])
+
+        block_identifier defaults to the current head, resolved to a number
+        once so every batch reads the same state.
+        """
+        if block_identifier is None or isinstance(block_identifier, str):
+            block_identifier = self.w3.eth.get_block(block_identifier or "latest")["number"]
+        if not calls:
+            return block_identifier, []
+
+        read_batch = self.read_multicall if self.mode() == "multicall" else self.read_batch
+        results = []
+        for start in range(0, len(calls), MULTICALL_BATCH_SIZE):
+            results.extend(read_batch(calls[start:start + MULTICALL_BATCH_SIZE], block_identifier))
+        return block_identifier, results
+
+    def read_multicall(self, calls, block_number):
+        encoded = [(fn.address, True, fn._encode_transaction_data()) for fn in calls]
+        returned = self.multicall.functions.aggregate3(encoded).call(block_identifier=block_number)
+
+        results = []
+        for fn, (success, data) in zip(calls, returned):
+            if not success:
+                raise OnchainReadError(f"{describe_call(fn)} reverted at block {block_number}")
+            results.append(self.decode(fn, data))
+        return results
+
+    def read_batch(self, calls, block_number):
+        payload = [{
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "eth_call",
+            "params": [{"to": fn.address, "data": fn._encode_transaction_data()}, hex(block_number)],
+        } for i, fn in enumerate(calls)]
+        response = self.session.post(self.w3.provider.endpoint_uri, json=payload, timeout=30)
+        response.raise_for_status()
+        replies = response.json()
+        if isinstance(replies, dict):
+            raise OnchainReadError(f"RPC rejected batch: {replies.get('error', replies)}")
+
+        by_id = {reply["id"]: reply for reply in replies}
+        results = []
+        for i, fn in enumerate(calls):
+            reply = by_id.get(i, {"error": "missing from batch response"})
+            if "error" in reply:
+                raise OnchainReadError(f"{describe_call(fn)} failed at block {block_number}: {reply['error']}")
+            results.append(self.decode(fn, Web3.to_bytes(hexstr=reply["result"])))
+        return results
@@ -7,14 +7,41 @@ Updated for Tempo protocol: uses books() and getTickLevel() from DEX contract
 import os
 import time
 from web3 import Web3
+from web3.logs import DISCARD
 from eth_account import Account
-from eth_account.messages import encode_structured_data
 import json
+from nonce_manager import NonceManager
+from oracle_signer import OracleSigner
+from orderbook import OrderbookTracker
 
 # Environment variables
 RPC_URL = os.getenv("RPC_URL", "https://rpc.moderato.tempo.xyz")  # Tempo Testnet
 ORACLE_PRIVATE_KEY = os.getenv("ORACLE_PRIVATE_KEY")
 RISK_CONTROLLER_ADDRESS = os.getenv("RISK_CONTROLLER_ADDRESS")
+# OracleSignalBatcher (src/OracleSignalBatcher.sol) for send_oracle_batch; unset disables batching
+ORACLE_BATCHER_ADDRESS = os.getenv("ORACLE_BATCHER_ADDRESS")
+
+# Seconds submit_oracle_signal waits for a receipt
+ORACLE_RECEIPT_TIMEOUT = int(os.getenv("ORACLE_RECEIPT_TIMEOUT", "120"))
+
+# When to submit: "interval" sends a signal every interval seconds; "deviation" reads the DEX every
+# interval seconds and sends only when the signal moved past a threshold or the heartbeat is due
+ORACLE_TRIGGER = os.getenv("ORACLE_TRIGGER", "interval")
+# Deviation thresholds: referenceTick move (ticks, 10 = 1 bp), pegDeviation move (bps),
+# and bid or ask depth change relative to the last submitted signal (bps)
+ORACLE_TICK_THRESHOLD = int(os.getenv("ORACLE_TICK_THRESHOLD", "10"))
+ORACLE_DEVIATION_THRESHOLD = int(os.getenv("ORACLE_DEVIATION_THRESHOLD", "1"))
+ORACLE_DEPTH_THRESHOLD_BPS = int(os.getenv("ORACLE_DEPTH_THRESHOLD_BPS", "1000"))
+# Seconds after which an unchanged signal is sent anyway; keep below RiskController's oracleStalenessThreshold
+ORACLE_HEARTBEAT = float(os.getenv("ORACLE_HEARTBEAT", "240"))
+
+# Report bid/ask depth as the liquidity within this many ticks of the mid, from a reconstructed
+# book (orderbook.py); 0 reports only the liquidity at the best bid and ask
+ORACLE_DEPTH_TICKS = int(os.getenv("ORACLE_DEPTH_TICKS", "0"))
+
+# Gas limit per oracle update; a batch gets one per update on top of the batch overhead
+ORACLE_UPDATE_GAS = 200000
+ORACLE_BATCH_GAS_OVERHEAD = 50000
 
 # Tempo DEX predeployed address (same on testnet and mainnet)
 TEMPO_DEX_ADDRESS = "0xdec0000000000000000000000000000000000000"
@@ -38,7 +65,28 @@ tempo_dex = w3.eth.contract(
     abi=tempo_dex_abi
 )
 
+oracle_batcher = None
+if ORACLE_BATCHER_ADDRESS:
+    with open("../out/OracleSignalBatcher.sol/OracleSignalBatcher.json") as f:
+        oracle_batcher = w3.eth.contract(
+            address=Web3.to_checksum_address(ORACLE_BATCHER_ADDRESS),
+            abi=json.load(f)["abi"]
+        )
+
+# Orderbook events; a poll with none of these since the last read cannot have changed any book
+ORDERBOOK_EVENT_TOPICS = [
+    Web3.to_hex(Web3.keccak(text=signature)) for signature in (
+        "OrderPlaced(uint128,address,address,uint128,bool,int16,bool,int16)",
+        "OrderCancelled(uint128)",
+        "OrderFilled(uint128,address,address,uint128,bool)",
+    )
+]
+
+orderbook_tracker = OrderbookTracker(w3, TEMPO_DEX_ADDRESS, tempo_dex_abi) if ORACLE_DEPTH_TICKS > 0 else None
+
 oracle_account = Account.from_key(ORACLE_PRIVATE_KEY)
+oracle_signer = None
+nonce_manager = NonceManager(w3, oracle_account)
 
 
 def get_current_nonce(pair_id: str) -> int:
@@ -65,12 +113,16 @@ def query_tempo_dex(token_a: str, token_b: str) -> dict:
     best_bid_tick = books_data[2]  # int16
     best_ask_tick = books_data[3]  # int16
 
-    # Get liquidity at best levels
-    bid_liquidity_data = tempo_dex.functions.getTickLevel(base, best_bid_tick, True).call()
-    ask_liquidity_data = tempo_dex.functions.getTickLevel(base, best_ask_tick, False).call()
+    if orderbook_tracker is not None:
+        # Liquidity within ORACLE_DEPTH_TICKS of the mid, from the incrementally maintained book
+        bid_liquidity, ask_liquidity = orderbook_tracker.depth(base, ORACLE_DEPTH_TICKS)
+    else:
+        # Get liquidity at best levels
+        bid_liquidity_data = tempo_dex.functions.getTickLevel(base, best_bid_tick, True).call()
+        ask_liquidity_data = tempo_dex.functions.getTickLevel(base, best_ask_tick, False).call()
 
-    bid_liquidity = bid_liquidity_data[2]  # totalLiquidity (uint128)
-    ask_liquidity = ask_liquidity_data[2]  # totalLiquidity (uint128)
+        bid_liquidity = bid_liquidity_data[2]  # totalLiquidity (uint128)
+        ask_liquidity = ask_liquidity_data[2]  # totalLiquidity (uint128)
 
     # Calculate reference tick (midpoint)
     reference_tick = (best_bid_tick + best_ask_tick) // 2
@@ -98,64 +150,72 @@ def sign_oracle_signal(pair_id: str, signal: dict) -> str:
     """
     Sign oracle signal using EIP-712
     Updated for Tempo: includes referenceTick field
+    The OracleSigner is built on first use, so the chain ID is fetched once and the
+    domain separator and type hash are computed once per (chain, RiskController)
     """
-    domain = {
-        "name": "TempoVaultRiskController",
-        "version": "1",
-        "chainId": w3.eth.chain_id,
-        "verifyingContract": RISK_CONTROLLER_ADDRESS
-    }
+    global oracle_signer
+    if oracle_signer is None:
+        oracle_signer = OracleSigner(ORACLE_PRIVATE_KEY, w3.eth.chain_id, RISK_CONTROLLER_ADDRESS)
+    return oracle_signer.sign(pair_id, signal)
 
-    types = {
-        "EIP712Domain": [
-            {"name": "name", "type": "string"},
-            {"name": "version", "type": "string"},
-            {"name": "chainId", "type": "uint256"},
-            {"name": "verifyingContract", "type": "address"}
-        ],
-        "OracleUpdate": [
-            {"name": "pairId", "type": "bytes32"},
-            {"name": "referenceTick", "type": "int16"},  # NEW: Tempo reference tick
-            {"name": "pegDeviation", "type": "uint256"},
-            {"name": "orderbookDepthBid", "type": "uint256"},
-            {"name": "orderbookDepthAsk", "type": "uint256"},
-            {"name": "timestamp", "type": "uint256"},
-            {"name": "nonce", "type": "uint256"}
-        ]
-    }
 
-    message = {
-        "pairId": Web3.to_bytes(hexstr=pair_id),
-        "referenceTick": signal["referenceTick"],  # NEW
-        "pegDeviation": signal["pegDeviation"],
-        "orderbookDepthBid": signal["orderbookDepthBid"],
-        "orderbookDepthAsk": signal["orderbookDepthAsk"],
-        "timestamp": signal["timestamp"],
-        "nonce": signal["nonce"]
-    }
-
-    structured_data = {
-        "types": types,
-        "domain": domain,
-        "primaryType": "OracleUpdate",
-        "message": message
+def build_signal(dex_data: dict, onchain_nonce: int) -> dict:
+    """Oracle signal for the queried DEX state, with the next nonce after the onchain one"""
+    return {
+        "referenceTick": dex_data["referenceTick"],
+        "pegDeviation": dex_data["pegDeviation"],
+        "orderbookDepthBid": dex_data["orderbookDepthBid"],
+        "orderbookDepthAsk": dex_data["orderbookDepthAsk"],
+        "timestamp": dex_data["timestamp"],
+        "nonce": onchain_nonce + 1
     }
 
-    encoded_data = encode_structured_data(structured_data)
-    signed_message = oracle_account.sign_message(encoded_data)
-
-    return signed_message.signature.hex()
-
 
-def submit_oracle_signal(pair_id: str, signal: dict, signature: str):
+def update_triggers(last_signal, dex_data: dict, since_last: float,
+                    tick_threshold: int = ORACLE_TICK_THRESHOLD,
+                    deviation_threshold: int = ORACLE_DEVIATION_THRESHOLD,
+                    depth_threshold_bps: int = ORACLE_DEPTH_THRESHOLD_BPS,
+                    heartbeat: float = ORACLE_HEARTBEAT) -> list:
     """
-    Submit signed oracle signal to RiskController
-    Updated for Tempo: includes referenceTick in signal tuple
+    Reasons to submit dex_data, compared with the last submitted signal sent since_last seconds ago
+    Empty when nothing crossed its threshold and the heartbeat is not due yet
     """
-    pair_id_bytes = Web3.to_bytes(hexstr=pair_id)
-
-    # Signal tuple must match OracleSignal struct in RiskController
-    signal_tuple = (
+    if last_signal is None:
+        return ["first update"]
+
+    triggers = []
+    tick_move = dex_data["referenceTick"] - last_signal["referenceTick"]
+    if abs(tick_move) >= tick_threshold:
+        triggers.append(f"tick {tick_move:+d}")
+    deviation_move = dex_data["pegDeviation"] - last_signal["pegDeviation"]
+    if abs(deviation_move) >= deviation_threshold:
+        triggers.append(f"deviation {deviation_move:+d} bps")
+    for side in ("Bid", "Ask"):
+        previous, current = last_signal[f"orderbookDepth{side}"], dex_data[f"orderbookDepth{side}"]
+        if previous == 0:
+            change_bps = 10000 if current else 0
+        else:
+            change_bps = (current - previous) * 10000 // previous
+        if abs(change_bps) >= depth_threshold_bps:
+            triggers.append(f"{side.lower()} depth {change_bps / 100:+.1f}%")
+    if since_last >= heartbeat:
+        triggers.append("heartbeat")
+    return triggers
+
+
+def orderbook_activity(from_block: int, to_block: int) -> int:
+    """Number of OrderPlaced/OrderCancelled/OrderFilled logs the DEX emitted in [from_block, to_block]"""
+    return len(w3.eth.get_logs({
+        "address": Web3.to_checksum_address(TEMPO_DEX_ADDRESS),
+        "fromBlock": from_block,
+        "toBlock": to_block,
+        "topics": [ORDERBOOK_EVENT_TOPICS],
+    }))
+
+
+def signal_tuple(signal: dict) -> tuple:
+    """Signal tuple matching the OracleSignal struct in RiskController"""
+    return (
         signal["referenceTick"],  # NEW: int16 referenceTick
         signal["pegDeviation"],   # uint256 pegDeviation
         signal["orderbookDepthBid"],  # uint256 orderbookDepthBid
@@ -164,23 +224,79 @@ def submit_oracle_signal(pair_id: str, signal: dict, signature: str):
         signal["nonce"]  # uint256 nonce
     )
 
+
+def send_oracle_signal(pair_id: str, signal: dict, signature: str):
+    """
+    Build, sign and broadcast updateOracleSignal without waiting for it to be mined
+    Updated for Tempo: includes referenceTick in signal tuple
+    The account nonce comes from nonce_manager, so several updates can be pending at once
+    """
+    pair_id_bytes = Web3.to_bytes(hexstr=pair_id)
+
     tx = risk_controller.functions.updateOracleSignal(
         pair_id_bytes,
-        signal_tuple,
+        signal_tuple(signal),
         Web3.to_bytes(hexstr=signature)
     ).build_transaction({
         "from": oracle_account.address,
-        "nonce": w3.eth.get_transaction_count(oracle_account.address),
-        "gas": 200000,
+        "gas": ORACLE_UPDATE_GAS,
         "gasPrice": w3.eth.gas_price
     })
 
-    signed_tx = oracle_account.sign_transaction(tx)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+    return nonce_manager.send(tx)
+
+
+def send_oracle_batch(updates: list):
+    """
+    Submit several signed updates in one OracleSignalBatcher transaction without waiting for it to be mined
+    updates: [(pair_id, signal, signature)], each signed by sign_oracle_signal as for the single-pair path
+    """
+    if oracle_batcher is None:
+        raise RuntimeError("ORACLE_BATCHER_ADDRESS is not set")
+
+    tx = oracle_batcher.functions.updateOracleSignals([
+        (Web3.to_bytes(hexstr=pair_id), signal_tuple(signal), Web3.to_bytes(hexstr=signature))
+        for pair_id, signal, signature in updates
+    ]).build_transaction({
+        "from": oracle_account.address,
+        "gas": ORACLE_BATCH_GAS_OVERHEAD + ORACLE_UPDATE_GAS * len(updates),
+        "gasPrice": w3.eth.gas_price
+    })
+
+    return nonce_manager.send(tx)
+
+
+def batch_results(receipt, count: int) -> list:
+    """Accepted flag of each update in a mined batch, from the batcher's OracleUpdateFailed events"""
+    if receipt["status"] != 1:
+        return [False] * count
+    failed = {
+        event["args"]["index"]
+        for event in oracle_batcher.events.OracleUpdateFailed().process_receipt(receipt, errors=DISCARD)
+    }
+    return [index not in failed for index in range(count)]
+
+
+def get_receipt(tx_hash):
+    """Receipt of a sent transaction (or of its fee-bumped replacement), or None while it is still pending"""
+    return nonce_manager.receipt(tx_hash)
+
+
+def submit_oracle_signal(pair_id: str, signal: dict, signature: str):
+    """
+    Submit signed oracle signal to RiskController and wait for the receipt
+    """
+    tx_hash = send_oracle_signal(pair_id, signal, signature)
 
     print(f"Submitted oracle signal. Tx hash: {tx_hash.hex()}")
 
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    deadline = time.time() + ORACLE_RECEIPT_TIMEOUT
+    while (receipt := get_receipt(tx_hash)) is None:
+        if time.time() >= deadline:
+            raise TimeoutError(f"{tx_hash.hex()} not mined after {ORACLE_RECEIPT_TIMEOUT}s")
+        nonce_manager.replace_stuck()
+        time.sleep(1)
+
     if receipt["status"] == 1:
         print(f"✓ Oracle signal accepted. Nonce: {signal['nonce']}")
     else:
@@ -189,59 +305,113 @@ def submit_oracle_signal(pair_id: str, signal: dict, signature: str):
     return receipt
 
 
-def relay_loop(pair_id: str, token_a: str, token_b: str, interval: int = 60):
+def relay_loop(pair_id: str, token_a: str, token_b: str, interval: int = 60, trigger: str = ORACLE_TRIGGER):
     """
     Main relay loop
     Queries Tempo DEX directly instead of external API
+    Updates are pipelined: each round reports the receipts mined since the last one
+    instead of waiting for its own, so slow blocks do not delay the next update.
+
+    With trigger="deviation", interval is the polling period. Each poll first
+    checks for orderbook events since the last read (one eth_getLogs); the DEX
+    is only read when there were some, and a signal is only sent when
+    update_triggers finds a reason, so a stable peg costs one transaction per
+    ORACLE_HEARTBEAT while a depeg is reported within one poll.
     """
+    if trigger not in ("interval", "deviation"):
+        raise ValueError(f"Unknown oracle trigger {trigger!r}")
+
     print(f"Starting oracle relay for pair {pair_id}")
     print(f"Oracle address: {oracle_account.address}")
     print(f"Tempo DEX: {TEMPO_DEX_ADDRESS}")
     print(f"Chain ID: {w3.eth.chain_id}")
     print(f"Token A: {token_a}")
     print(f"Token B: {token_b}")
+    if trigger == "deviation":
+        print(f"Trigger: deviation (poll {interval}s, tick {ORACLE_TICK_THRESHOLD}, "
+              f"deviation {ORACLE_DEVIATION_THRESHOLD} bps, depth {ORACLE_DEPTH_THRESHOLD_BPS} bps, "
+              f"heartbeat {ORACLE_HEARTBEAT:g}s)")
+
+    in_flight = {}  # tx hash -> signal nonce
+    last_signal_nonce = 0
+    last_sent, last_sent_at, last_block = None, 0.0, None
+    counts = {"sent": 0, "no orderbook activity": 0, "below threshold": 0}
 
     while True:
         try:
-            # Get current nonce from RiskController
-            onchain_nonce = get_current_nonce(pair_id)
-            print(f"\nCurrent onchain nonce: {onchain_nonce}")
-
-            # Query Tempo DEX directly
-            dex_data = query_tempo_dex(token_a, token_b)
-            print(f"Queried Tempo DEX:")
-            print(f"  Base: {dex_data['base']}")
-            print(f"  Quote: {dex_data['quote']}")
-            print(f"  Best Bid Tick: {dex_data['bestBidTick']}")
-            print(f"  Best Ask Tick: {dex_data['bestAskTick']}")
-            print(f"  Reference Tick: {dex_data['referenceTick']}")
-            print(f"  Peg Deviation: {dex_data['pegDeviation']} bps")
-            print(f"  Bid Liquidity: {dex_data['orderbookDepthBid']}")
-            print(f"  Ask Liquidity: {dex_data['orderbookDepthAsk']}")
-
-            # Prepare signal with incremented nonce
-            signal = {
-                "referenceTick": dex_data["referenceTick"],
-                "pegDeviation": dex_data["pegDeviation"],
-                "orderbookDepthBid": dex_data["orderbookDepthBid"],
-                "orderbookDepthAsk": dex_data["orderbookDepthAsk"],
-                "timestamp": dex_data["timestamp"],
-                "nonce": onchain_nonce + 1
-            }
-
-            # Sign with EIP-712
-            signature = sign_oracle_signal(pair_id, signal)
-            print(f"Signed with EIP-712")
-
-            # Submit to RiskController
-            submit_oracle_signal(pair_id, signal, signature)
+            # Report updates mined since the last round, speed up any that are stuck
+            for tx_hash, nonce in list(in_flight.items()):
+                receipt = get_receipt(tx_hash)
+                if receipt is None:
+                    continue
+                del in_flight[tx_hash]
+                if receipt["status"] == 1:
+                    print(f"✓ Oracle signal accepted. Nonce: {nonce}")
+                else:
+                    print(f"✗ Oracle signal rejected. Nonce: {nonce}")
+            nonce_manager.replace_stuck()
+
+            dex_data, reasons = None, ["interval"]
+            if trigger == "deviation":
+                head = w3.eth.block_number
+                quiet = last_block is not None and (head <= last_block or orderbook_activity(last_block + 1, head) == 0)
+                if quiet and time.time() - last_sent_at < ORACLE_HEARTBEAT:
+                    reasons = []
+                    counts["no orderbook activity"] += 1
+                else:
+                    dex_data = query_tempo_dex(token_a, token_b)
+                    reasons = update_triggers(last_sent, dex_data, time.time() - last_sent_at)
+                    if not reasons:
+                        counts["below threshold"] += 1
+
+            if reasons:
+                # Get current nonce from RiskController
+                onchain_nonce = get_current_nonce(pair_id)
+                print(f"\nCurrent onchain nonce: {onchain_nonce}")
+
+                # Query Tempo DEX directly
+                if dex_data is None:
+                    dex_data = query_tempo_dex(token_a, token_b)
+                print(f"Queried Tempo DEX:")
+                print(f"  Base: {dex_data['base']}")
+                print(f"  Quote: {dex_data['quote']}")
+                print(f"  Best Bid Tick: {dex_data['bestBidTick']}")
+                print(f"  Best Ask Tick: {dex_data['bestAskTick']}")
+                print(f"  Reference Tick: {dex_data['referenceTick']}")
+                print(f"  Peg Deviation: {dex_data['pegDeviation']} bps")
+                print(f"  Bid Liquidity: {dex_data['orderbookDepthBid']}")
+                print(f"  Ask Liquidity: {dex_data['orderbookDepthAsk']}")
+
+                # Prepare signal with incremented nonce; RiskController only requires signal nonces
+                # to increase, so this may run ahead of the onchain nonce while updates are pending
+                signal = build_signal(dex_data, max(onchain_nonce, last_signal_nonce))
+
+                # Sign with EIP-712
+                signature = sign_oracle_signal(pair_id, signal)
+                print(f"Signed with EIP-712")
+
+                # Submit to RiskController without waiting for the receipt
+                tx_hash = send_oracle_signal(pair_id, signal, signature)
+                last_signal_nonce = signal["nonce"]
+                last_sent, last_sent_at = signal, time.time()
+                in_flight[tx_hash] = signal["nonce"]
+                counts["sent"] += 1
+                print(f"Submitted oracle signal ({', '.join(reasons)}). Tx hash: {tx_hash.hex()} "
+                      f"({len(in_flight)} in flight)")
+                if trigger == "deviation":
+                    print("Updates: " + ", ".join(f"{count} {label}" for label, count in counts.items()))
+
+            # Only move past blocks once their orderbook activity has been acted on
+            if trigger == "deviation":
+                last_block = max(head, last_block or 0)
 
         except Exception as e:
             print(f"Error in relay loop: {e}")
             import traceback
             traceback.print_exc()
 
-        print(f"\nSleeping for {interval} seconds...")
+        if trigger == "interval":
+            print(f"\nSleeping for {interval} seconds...")
         time.sleep(interval)
 
 
@@ -250,6 +420,7 @@ if __name__ == "__main__":
 
     if len(sys.argv) < 4:
         print("Usage: python oracle_relay.py <pair_id> <token_a> <token_b> [interval]")
+        print("  ORACLE_TRIGGER=deviation polls the DEX every interval seconds and sends only on a change")
         print("\nExample:")
         print("  python oracle_relay.py 0x1234... 0xUSDC... 0xpathUSD... 60")
         sys.exit(1)
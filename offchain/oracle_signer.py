@@ -0,0 +1,70 @@
+"""
+TempoVault Oracle Signer
+EIP-712 signing of RiskController OracleUpdate messages with the domain separator and type hash precomputed
+
+The digest is built exactly as RiskController.updateOracleSignal rebuilds it
+(keccak256("\\x19\\x01" || DOMAIN_SEPARATOR || structHash)), so only the
+message struct is hashed per signature and no RPC is made after construction.
+"""
+
+from functools import lru_cache
+from eth_keys import keys
+from eth_utils import keccak, to_bytes, to_checksum_address
+
+EIP712_DOMAIN_TYPEHASH = keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+ORACLE_UPDATE_TYPEHASH = keccak(
+    text="OracleUpdate(bytes32 pairId,int16 referenceTick,uint256 pegDeviation,uint256 orderbookDepthBid,"
+         "uint256 orderbookDepthAsk,uint256 timestamp,uint256 nonce)"
+)
+DOMAIN_NAME = "TempoVaultRiskController"
+DOMAIN_VERSION = "1"
+
+
+def _word(value):
+    """ABI-encode an int (negative for int16) as one 32-byte word"""
+    return (value % 2 ** 256).to_bytes(32, "big")
+
+
+@lru_cache(maxsize=16)
+def domain_separator(chain_id: int, verifying_contract: str) -> bytes:
+    """RiskController's DOMAIN_SEPARATOR for a chain and deployment"""
+    return keccak(
+        EIP712_DOMAIN_TYPEHASH
+        + keccak(text=DOMAIN_NAME)
+        + keccak(text=DOMAIN_VERSION)
+        + _word(chain_id)
+        + bytes(12) + to_bytes(hexstr=to_checksum_address(verifying_contract))
+    )
+
+
+class OracleSigner:
+    """Signs OracleUpdate messages for one oracle key, chain and RiskController"""
+
+    def __init__(self, private_key, chain_id: int, verifying_contract: str):
+        self.key = keys.PrivateKey(to_bytes(hexstr=private_key) if isinstance(private_key, str) else bytes(private_key))
+        self.address = self.key.public_key.to_checksum_address()
+        self.prefix = b"\x19\x01" + domain_separator(chain_id, verifying_contract)
+
+    def digest(self, pair_id, signal: dict) -> bytes:
+        """The EIP-712 digest RiskController recovers the signer from"""
+        pair_id = to_bytes(hexstr=pair_id) if isinstance(pair_id, str) else bytes(pair_id)
+        if len(pair_id) != 32:
+            raise ValueError(f"pairId must be 32 bytes, got {len(pair_id)}")
+        if not -2 ** 15 <= signal["referenceTick"] < 2 ** 15:
+            raise ValueError(f"referenceTick {signal['referenceTick']} does not fit int16")
+        struct_hash = keccak(
+            ORACLE_UPDATE_TYPEHASH
+            + pair_id
+            + _word(signal["referenceTick"])
+            + _word(signal["pegDeviation"])
+            + _word(signal["orderbookDepthBid"])
+            + _word(signal["orderbookDepthAsk"])
+            + _word(signal["timestamp"])
+            + _word(signal["nonce"])
+        )
+        return keccak(self.prefix + struct_hash)
+
+    def sign(self, pair_id, signal: dict) -> str:
+        """0x-hex 65-byte r || s || v signature (v = 27/28), the same string the encode_structured_data path returns"""
+        signature = self.key.sign_msg_hash(self.digest(pair_id, signal))
+        return "0x" + (signature.r.to_bytes(32, "big") + signature.s.to_bytes(32, "big") + bytes([signature.v + 27])).hex()
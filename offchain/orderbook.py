@@ -0,0 +1,263 @@
+"""
+TempoVault Orderbook Reconstruction
+Tick-indexed Tempo DEX books kept in memory, so the oracle can report depth beyond the best bid and ask
+
+A book is seeded with one getTickLevel scan of every tick (batched through
+OnchainReader, pinned to one block) and then kept current from the DEX's
+OrderPlaced / OrderCancelled / OrderFilled logs. Cancels and fills only carry
+an order id, so the tracker keeps every open order's side, tick and remaining
+amount; orders placed before it started are learned by replaying
+ORDERBOOK_HISTORY_BLOCKS of logs. A fill or cancel of an order it never saw,
+or ORDERBOOK_RESYNC_BLOCKS without a scan, triggers a rescan.
+
+Usage: python orderbook.py <token_a> <token_b> [depth_ticks]
+"""
+
+import bisect
+import json
+import os
+import threading
+from web3 import Web3
+from log_decoder import DecoderRegistry
+from onchain_reader import OnchainReader
+
+# Tempo DEX predeployed address (same on testnet and mainnet)
+TEMPO_DEX_ADDRESS = "0xdec0000000000000000000000000000000000000"
+
+# Blocks of DEX logs replayed at startup to learn the orders already resting on the books
+ORDERBOOK_HISTORY_BLOCKS = int(os.getenv("ORDERBOOK_HISTORY_BLOCKS", "100000"))
+# Blocks after which the books are rescanned to catch any drift from the event stream (0 = never)
+ORDERBOOK_RESYNC_BLOCKS = int(os.getenv("ORDERBOOK_RESYNC_BLOCKS", "1000"))
+# Blocks per eth_getLogs request
+ORDERBOOK_LOG_RANGE = int(os.getenv("ORDERBOOK_LOG_RANGE", "2000"))
+
+
+class OrderBook:
+    """Liquidity per tick on each side of one base token's book, with occupied ticks kept sorted"""
+
+    def __init__(self):
+        self.levels = {True: {}, False: {}}  # is_bid -> {tick: liquidity}
+        self.ticks = {True: [], False: []}   # is_bid -> sorted ticks with liquidity
+
+    def set_level(self, is_bid, tick, liquidity):
+        levels, ticks = self.levels[is_bid], self.ticks[is_bid]
+        if liquidity > 0:
+            if tick not in levels:
+                bisect.insort(ticks, tick)
+            levels[tick] = liquidity
+        elif tick in levels:
+            del levels[tick]
+            del ticks[bisect.bisect_left(ticks, tick)]
+
+    def add(self, is_bid, tick, amount):
+        """Change a level's liquidity by amount (negative to remove)"""
+        self.set_level(is_bid, tick, self.levels[is_bid].get(tick, 0) + amount)
+
+    def best_bid(self):
+        return self.ticks[True][-1] if self.ticks[True] else None
+
+    def best_ask(self):
+        return self.ticks[False][0] if self.ticks[False] else None
+
+    def reference_tick(self):
+        """Midpoint of the best bid and ask (as query_tempo_dex computes it), or the one side's best"""
+        best_bid, best_ask = self.best_bid(), self.best_ask()
+        if best_bid is not None and best_ask is not None:
+            return (best_bid + best_ask) // 2
+        return best_bid if best_bid is not None else best_ask
+
+    def window(self, is_bid, within_ticks):
+        """(tick, liquidity) of one side's levels within within_ticks of the reference tick, best first"""
+        reference = self.reference_tick()
+        if reference is None:
+            return
+        levels, ticks = self.levels[is_bid], self.ticks[is_bid]
+        low = bisect.bisect_left(ticks, reference - within_ticks)
+        high = bisect.bisect_right(ticks, reference + within_ticks)
+        indexes = range(high - 1, low - 1, -1) if is_bid else range(low, high)
+        for index in indexes:
+            yield ticks[index], levels[ticks[index]]
+
+    def depth(self, within_ticks):
+        """(bid, ask) liquidity within within_ticks of the reference tick"""
+        return (sum(liquidity for _, liquidity in self.window(True, within_ticks)),
+                sum(liquidity for _, liquidity in self.window(False, within_ticks)))
+
+    def vwap_mid(self, within_ticks):
+        """Liquidity-weighted mean tick of both sides' levels within within_ticks, or None for an empty book"""
+        weighted = total = 0
+        for is_bid in (True, False):
+            for tick, liquidity in self.window(is_bid, within_ticks):
+                weighted += tick * liquidity
+                total += liquidity
+        return weighted / total if total else None
+
+
+class OrderbookTracker:
+    """
+    Books of the tracked base tokens, updated from DEX logs
+
+    orders maps every open order id (any base) to [base, is_bid, tick,
+    remaining]. apply() is the pure event step; start() and sync() do the RPC.
+    Books change under self.lock, so readers on other threads go through depth().
+    """
+
+    def __init__(self, w3, dex_address=TEMPO_DEX_ADDRESS, abi=None):
+        if abi is None:
+            with open("../out/ITempoOrderbook.sol/ITempoOrderbook.json") as f:
+                abi = json.load(f)["abi"]
+        self.w3 = w3
+        self.dex = w3.eth.contract(address=Web3.to_checksum_address(dex_address), abi=abi)
+        self.decoders = DecoderRegistry({dex_address: ("ITempoOrderbook", abi)})
+        self.reader = OnchainReader(w3)
+        # Reentrant: depth() syncs while holding it
+        self.lock = threading.RLock()
+        self.books = {}
+        self.orders = {}
+        self.last_block = None
+        self.last_scan = None
+        self.counts = {"events": 0, "unknown orders": 0, "rescans": 0, "drifted levels": 0}
+
+    def apply(self, name, args):
+        """
+        Apply one decoded DEX event to the registry and the tracked books
+        Returns False for a fill or cancel of an order the tracker never saw placed
+        """
+        self.counts["events"] += 1
+        if name == "OrderPlaced":
+            # Flip orders re-placed on the other side after a full fill are expected to emit their own
+            # OrderPlaced; if a DEX version does not, the periodic rescan corrects the book
+            base = Web3.to_checksum_address(args["token"])
+            self.orders[args["orderId"]] = [base, args["isBid"], args["tick"], args["amount"]]
+            if base in self.books:
+                self.books[base].add(args["isBid"], args["tick"], args["amount"])
+            return True
+
+        order = self.orders.get(args["orderId"])
+        if order is None:
+            self.counts["unknown orders"] += 1
+            return False
+        base, is_bid, tick, remaining = order
+        if name == "OrderCancelled":
+            removed = remaining
+        else:
+            removed = min(args["amountFilled"], remaining)
+        order[3] -= removed
+        if name == "OrderCancelled" or not args["partialFill"] or order[3] == 0:
+            del self.orders[args["orderId"]]
+        if base in self.books:
+            self.books[base].add(is_bid, tick, -removed)
+        return True
+
+    def logs(self, from_block, to_block):
+        """Decoded DEX events in [from_block, to_block], in chain order"""
+        events = []
+        for start in range(from_block, to_block + 1, ORDERBOOK_LOG_RANGE):
+            for log in self.w3.eth.get_logs({
+                "address": self.dex.address,
+                "fromBlock": start,
+                "toBlock": min(start + ORDERBOOK_LOG_RANGE - 1, to_block),
+                "topics": [self.decoders.topic_filter()],
+            }):
+                decoder = self.decoders.lookup(log["address"], bytes(log["topics"][0]))
+                if decoder is not None:
+                    events.append((decoder.name, decoder.decode(log["topics"], log["data"])))
+        return events
+
+    def scan(self, bases, block):
+        """Replace the books of bases with a getTickLevel scan of every tick at block"""
+        spacing = self.dex.functions.TICK_SPACING().call(block_identifier=block)
+        min_tick = self.dex.functions.MIN_TICK().call(block_identifier=block)
+        max_tick = self.dex.functions.MAX_TICK().call(block_identifier=block)
+        slots = [(base, is_bid, tick) for base in bases for is_bid in (True, False)
+                 for tick in range(min_tick + -min_tick % spacing, max_tick + 1, spacing)]
+        _, results = self.reader.read(
+            [self.dex.functions.getTickLevel(base, tick, is_bid) for base, is_bid, tick in slots], block
+        )
+
+        for base in bases:
+            previous = self.books.get(base)
+            book = OrderBook()
+            for (slot_base, is_bid, tick), (_, _, liquidity) in zip(slots, results):
+                if slot_base == base:
+                    book.set_level(is_bid, tick, liquidity)
+            if previous is not None:
+                for side in (True, False):
+                    old, new = previous.levels[side], book.levels[side]
+                    self.counts["drifted levels"] += sum(old.get(tick) != new.get(tick) for tick in old.keys() | new.keys())
+            self.books[base] = book
+        self.last_scan = block
+        self.counts["rescans"] += 1
+
+    def start(self, token_pairs):
+        """
+        Seed books for [(token_a, token_b)]; returns their base tokens
+        The first call learns the resting orders from history, later calls catch up from the last sync.
+        """
+        with self.lock:
+            head = self.w3.eth.block_number
+            bases = []
+            for token_a, token_b in token_pairs:
+                key = self.dex.functions.pairKey(Web3.to_checksum_address(token_a),
+                                                 Web3.to_checksum_address(token_b)).call()
+                bases.append(Web3.to_checksum_address(self.dex.functions.books(key).call(block_identifier=head)[0]))
+
+            self.seed(bases, head)
+            return bases
+
+    def seed(self, bases, head):
+        """Bring the order registry up to head, then scan the books of bases (and those already tracked)"""
+        # Registry first, then the scan replaces whatever the replay did to the books
+        from_block = max(0, head - ORDERBOOK_HISTORY_BLOCKS) if self.last_block is None else self.last_block + 1
+        for name, args in self.logs(from_block, head):
+            self.apply(name, args)
+        self.scan(sorted(set(self.books) | set(bases)), head)
+        self.last_block = head
+
+    def sync(self):
+        """Apply DEX logs up to the head; rescans when an unknown order shows up or a resync is due"""
+        with self.lock:
+            head = self.w3.eth.block_number
+            if head <= self.last_block:
+                return 0
+            events = self.logs(self.last_block + 1, head)
+            complete = all([self.apply(name, args) for name, args in events])
+            if not complete or (ORDERBOOK_RESYNC_BLOCKS and head - self.last_scan >= ORDERBOOK_RESYNC_BLOCKS):
+                self.scan(list(self.books), head)
+            self.last_block = head
+            return len(events)
+
+    def book(self, base):
+        return self.books[Web3.to_checksum_address(base)]
+
+    def depth(self, base, within_ticks):
+        """
+        (bid, ask) liquidity of base's book within within_ticks, brought up to the head first
+        An untracked base is seeded; sync and read share the lock, so the figures come from one head.
+        """
+        base = Web3.to_checksum_address(base)
+        with self.lock:
+            if base in self.books:
+                self.sync()
+            else:
+                self.seed([base], self.w3.eth.block_number)
+            return self.books[base].depth(within_ticks)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Usage: python orderbook.py <token_a> <token_b> [depth_ticks]")
+        sys.exit(1)
+
+    depth_ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    w3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL", "https://rpc.moderato.tempo.xyz")))
+    tracker = OrderbookTracker(w3)
+    base = tracker.start([(sys.argv[1], sys.argv[2])])[0]
+    book = tracker.book(base)
+    bid_depth, ask_depth = book.depth(depth_ticks)
+    print(f"Book for {base} at block {tracker.last_block}: best bid {book.best_bid()}, best ask {book.best_ask()}")
+    print(f"  {len(book.ticks[True])} bid levels, {len(book.ticks[False])} ask levels, "
+          f"{len(tracker.orders)} open orders known")
+    print(f"  Depth within {depth_ticks} ticks: bid {bid_depth}, ask {ask_depth}, vwap mid {book.vwap_mid(depth_ticks)}")
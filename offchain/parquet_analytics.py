@@ -0,0 +1,104 @@
+"""
+TempoVault Parquet Analytics
+Recomputes vault_summary and vault P&L from parquet_export.py files with vectorized Arrow aggregation,
+so research queries never touch the live database
+"""
+
+import json
+import os
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from parquet_export import PARQUET_EXPORT_DIR, AMOUNT, table_schema
+
+# vault_summary column -> (table, amount column); the same attribution as VAULT_TOTALS in event_indexer.py
+SUMMARY_COLUMNS = {
+    "total_deposited": ("deposits", "amount"),
+    "total_withdrawn": ("withdrawals", "amount"),
+    "total_deployed": ("deployments", "amount"),
+    "total_losses": ("losses", "loss"),
+    "total_performance_fees": ("performance_fees", "fee_amount"),
+    "total_management_fees": ("management_fees", "fee_amount"),
+}
+
+
+def read_table(table, columns, export_dir=PARQUET_EXPORT_DIR, filter=None):
+    """Columns of an exported table as one Arrow table (empty if nothing was exported yet)"""
+    schema = table_schema(table)
+    path = os.path.join(export_dir, table)
+    if not os.path.isdir(path):
+        return schema.empty_table().select(columns)
+    dataset = ds.dataset(path, format="parquet", schema=schema, partitioning="hive")
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+def row_filter(vault_id=None, token=None, to_block=None):
+    conditions = []
+    if vault_id is not None:
+        conditions.append(ds.field("vault_id") == vault_id)
+    if token is not None:
+        conditions.append(ds.field("token") == token)
+    if to_block is not None:
+        # Rows of archived events have no block number and predate every retained block
+        conditions.append((ds.field("block_number") <= to_block) | ~ds.field("block_number").is_valid())
+    if not conditions:
+        return None
+    combined = conditions[0]
+    for condition in conditions[1:]:
+        combined = combined & condition
+    return combined
+
+
+def vault_summary(export_dir=PARQUET_EXPORT_DIR, vault_id=None, token=None, to_block=None):
+    """
+    vault_summary rows (vault_id, token, total_*) as an Arrow table sorted by vault_id, token
+
+    Each source table contributes one total column and nulls for the others;
+    the union is summed with a single group_by, like vault_totals_query.
+    to_block gives the totals as of that block.
+    """
+    filter = row_filter(vault_id, token, to_block)
+    parts = []
+    for total_column, (table, amount_column) in SUMMARY_COLUMNS.items():
+        rows = read_table(table, ["vault_id", "token", amount_column], export_dir, filter)
+        columns = {"vault_id": rows.column("vault_id"), "token": rows.column("token")}
+        for column in SUMMARY_COLUMNS:
+            columns[column] = rows.column(amount_column) if column == total_column else pa.nulls(len(rows), AMOUNT)
+        parts.append(pa.table(columns))
+
+    totals = pa.concat_tables(parts).group_by(["vault_id", "token"]).aggregate(
+        [(column, "sum") for column in SUMMARY_COLUMNS]
+    )
+    summary = pa.table({
+        "vault_id": totals.column("vault_id"),
+        "token": totals.column("token"),
+        **{column: pc.fill_null(totals.column(f"{column}_sum"), pa.scalar(0, AMOUNT)) for column in SUMMARY_COLUMNS},
+    })
+    return summary.sort_by([("vault_id", "ascending"), ("token", "ascending")])
+
+
+def vault_pnl(vault_id, token, export_dir=PARQUET_EXPORT_DIR, to_block=None):
+    """The /api/v1/vault/{vault_id}/pnl response, computed from the export"""
+    rows = vault_summary(export_dir, vault_id, token, to_block).to_pylist()
+    totals = {column: int(rows[0][column]) if rows else 0 for column in SUMMARY_COLUMNS}
+    net_pnl = (totals["total_deposited"] - totals["total_withdrawn"] - totals["total_losses"]
+               - totals["total_performance_fees"] - totals["total_management_fees"])
+    return {
+        "vault_id": vault_id,
+        "token": token,
+        **{column: str(value) for column, value in totals.items()},
+        "net_pnl": str(net_pnl),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 3 and sys.argv[1] == "pnl":
+        # python parquet_analytics.py pnl <vault_id> <token> [to_block]
+        to_block = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        print(json.dumps(vault_pnl(int(sys.argv[2]), sys.argv[3], to_block=to_block), indent=2))
+    else:
+        # python parquet_analytics.py [summary]
+        for row in vault_summary().to_pylist():
+            print(json.dumps({k: str(v) if not isinstance(v, (int, str)) else v for k, v in row.items()}))
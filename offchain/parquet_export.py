@@ -0,0 +1,281 @@
+"""
+TempoVault Parquet Export
+Streams indexed tables into month-partitioned Parquet files for offline analytics, incrementally by block range
+
+Layout: <PARQUET_EXPORT_DIR>/<table>/month=YYYY-MM/part-<from_block>-<to_block>.parquet
+Each run exports, per table, the blocks after that table's last exported block, so nightly runs only
+add files and a table added to EXPORT_TABLES is backfilled from block 0 on the next run. Typed rows whose
+events partition was archived by partitions.py retention are exported by a table's first run, with a null
+block_number; a later run that starts below the retained blocks can no longer place them and warns.
+"""
+
+import glob
+import json
+import os
+import re
+import time
+import psycopg2
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from psycopg2.extensions import ISOLATION_LEVEL_REPEATABLE_READ
+
+DB_URL = os.getenv("INDEXER_DB_URL", "postgresql://localhost:5432/tempovault")
+# Root directory of the exported datasets
+PARQUET_EXPORT_DIR = os.getenv("PARQUET_EXPORT_DIR", "parquet")
+# Rows per server-side cursor fetch; bounds the export's memory use
+PARQUET_BATCH_ROWS = int(os.getenv("PARQUET_BATCH_ROWS", "50000"))
+# Must match REORG_WINDOW in event_indexer.py: blocks that close to the indexed tip can still be rolled back
+REORG_WINDOW = int(os.getenv("REORG_WINDOW", "128"))
+
+STATE_FILE = "_export_state.json"
+
+# NUMERIC(78, 0) token amounts; 76 digits is Arrow's widest decimal and covers any realistic uint256 amount
+AMOUNT = pa.decimal256(76, 0)
+TIMESTAMP = pa.timestamp("us")
+
+# table -> exported columns; typed tables also get the block_number of their event
+EXPORT_TABLES = {
+    "events": [
+        ("id", pa.int64()), ("block_number", pa.int64()), ("block_timestamp", TIMESTAMP),
+        ("transaction_hash", pa.string()), ("log_index", pa.int32()), ("event_type", pa.string()),
+        ("contract_address", pa.string()), ("event_data", pa.string()),
+    ],
+    "deposits": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("vault_id", pa.int64()), ("token", pa.string()),
+        ("amount", AMOUNT), ("depositor", pa.string()), ("new_balance", AMOUNT), ("block_timestamp", TIMESTAMP),
+    ],
+    "withdrawals": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("vault_id", pa.int64()), ("token", pa.string()),
+        ("amount", AMOUNT), ("recipient", pa.string()), ("new_balance", AMOUNT), ("block_timestamp", TIMESTAMP),
+    ],
+    "deployments": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("vault_id", pa.int64()), ("deployment_id", pa.int64()),
+        ("strategy", pa.string()), ("token", pa.string()), ("amount", AMOUNT), ("pair_id", pa.string()),
+        ("block_timestamp", TIMESTAMP),
+    ],
+    "losses": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("vault_id", pa.int64()), ("deployment_id", pa.int64()),
+        ("token", pa.string()), ("deployed_amount", AMOUNT), ("returned_amount", AMOUNT), ("loss", AMOUNT),
+        ("block_timestamp", TIMESTAMP),
+    ],
+    "performance_fees": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("vault_id", pa.int64()), ("token", pa.string()),
+        ("yield_amount", AMOUNT), ("fee_amount", AMOUNT), ("block_timestamp", TIMESTAMP),
+    ],
+    "management_fees": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("vault_id", pa.int64()), ("token", pa.string()),
+        ("fee_amount", AMOUNT), ("period_seconds", pa.int64()), ("block_timestamp", TIMESTAMP),
+    ],
+    "oracle_updates": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("pair_id", pa.string()), ("peg_deviation", pa.int32()),
+        ("orderbook_depth_bid", AMOUNT), ("orderbook_depth_ask", AMOUNT), ("nonce", pa.int64()),
+        ("block_timestamp", TIMESTAMP),
+    ],
+    "circuit_breakers": [
+        ("id", pa.int64()), ("event_id", pa.int64()), ("pair_id", pa.string()), ("triggered", pa.bool_()),
+        ("triggered_by", pa.string()), ("block_timestamp", TIMESTAMP),
+    ],
+}
+
+
+def table_schema(table):
+    """Arrow schema of an exported table"""
+    columns = EXPORT_TABLES[table]
+    if table != "events":
+        columns = columns + [("block_number", pa.int64())]
+    return pa.schema(columns)
+
+
+def export_query(table, include_archived=False):
+    """
+    SELECT for one table over a block range; amounts and JSON come back as text and are converted by Arrow
+    include_archived adds typed rows whose event was archived, with a null block_number.
+    """
+    def expression(alias, column, arrow_type):
+        if arrow_type == AMOUNT or column == "event_data":
+            return f"{alias}.{column}::text"
+        return f"{alias}.{column}"
+
+    if table == "events":
+        columns = ", ".join(expression("e", c, t) for c, t in EXPORT_TABLES[table])
+        return f"SELECT {columns} FROM events e WHERE e.block_number BETWEEN %s AND %s"
+
+    columns = ", ".join(expression("t", c, t) for c, t in EXPORT_TABLES[table])
+    return f"""
+        SELECT {columns}, e.block_number
+        FROM {table} t LEFT JOIN events e ON e.id = t.event_id
+        WHERE e.block_number BETWEEN %s AND %s{" OR e.id IS NULL" if include_archived else ""}
+    """
+
+
+def rows_to_batch(rows, schema):
+    """Fetched rows -> RecordBatch; text amounts are parsed by a vectorized cast"""
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if field.type == AMOUNT:
+            arrays.append(pa.array(values, type=pa.string()).cast(AMOUNT))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def load_state(export_dir):
+    """
+    {"tables": {table: last exported block}, "last_block": block every table is exported up to}
+
+    State files from before per-table tracking hold a single last_block.
+    It is taken to cover the tables that have a directory; the others had
+    no rows or were not exported then, and are exported from block 0.
+    """
+    path = os.path.join(export_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {"tables": {}, "last_block": -1}
+    with open(path) as f:
+        state = json.load(f)
+    if "tables" not in state:
+        state["tables"] = {table: state["last_block"] for table in EXPORT_TABLES
+                           if os.path.isdir(os.path.join(export_dir, table))}
+    state["last_block"] = min(state["tables"].get(table, -1) for table in EXPORT_TABLES)
+    return state
+
+
+def save_state(export_dir, state):
+    path = os.path.join(export_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def discard_uncommitted(export_dir, exported):
+    """Remove files of a run that crashed before recording its state (temp files and parts past each table's last block)"""
+    for directory in glob.glob(os.path.join(export_dir, "*", "month=*")):
+        last_block = exported.get(os.path.basename(os.path.dirname(directory)), -1)
+        for name in os.listdir(directory):
+            match = re.match(r"part-(\d+)-(\d+)\.parquet$", name)
+            if name.startswith(".") or (match and int(match.group(1)) > last_block):
+                os.remove(os.path.join(directory, name))
+
+
+def has_archived_rows(conn, table):
+    """Whether any row of a typed table lost its event to retention"""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT EXISTS (SELECT 1 FROM {table} t WHERE NOT EXISTS (SELECT 1 FROM events e WHERE e.id = t.event_id))
+        """)
+        return cur.fetchone()[0]
+
+
+def export_table(conn, table, from_block, to_block, export_dir, batch_rows=PARQUET_BATCH_ROWS,
+                 include_archived=False):
+    """
+    Stream table rows for [from_block, to_block] into one part file per month
+
+    Uses a server-side (named) cursor so at most batch_rows rows are held
+    in memory. Files are written under a dot-prefixed temporary name and
+    renamed by the caller once every table has been exported.
+    Returns (rows, [(temp_path, final_path)]).
+    """
+    schema = table_schema(table)
+    writers = {}
+    rows_written = 0
+
+    with conn.cursor(name=f"export_{table}") as cur:
+        cur.itersize = batch_rows
+        cur.execute(export_query(table, include_archived), (from_block, to_block))
+        try:
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                batch = rows_to_batch(rows, schema)
+                months = pc.strftime(batch.column("block_timestamp"), format="%Y-%m")
+                for month in pc.unique(months).to_pylist():
+                    if month not in writers:
+                        directory = os.path.join(export_dir, table, f"month={month}")
+                        os.makedirs(directory, exist_ok=True)
+                        name = f"part-{from_block}-{to_block}.parquet"
+                        temp_path = os.path.join(directory, f".{name}.tmp")
+                        writers[month] = (pq.ParquetWriter(temp_path, schema), temp_path, os.path.join(directory, name))
+                    writers[month][0].write_batch(batch.filter(pc.equal(months, month)))
+                rows_written += len(rows)
+        finally:
+            for writer, _, _ in writers.values():
+                writer.close()
+
+    return rows_written, [(temp_path, final_path) for _, temp_path, final_path in writers.values()]
+
+
+def export(conn, export_dir=PARQUET_EXPORT_DIR, to_block=None, tables=None):
+    """
+    Export every table for the blocks after its last exported block, up to to_block
+
+    to_block defaults to the last indexed block minus REORG_WINDOW, so
+    exported blocks can no longer be rolled back. All tables are read from
+    one REPEATABLE READ snapshot. Files only become visible (renamed) and
+    the state only advances once every table is written.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    state = load_state(export_dir)
+    discard_uncommitted(export_dir, state["tables"])
+
+    conn.set_session(isolation_level=ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+    try:
+        if to_block is None:
+            with conn.cursor() as cur:
+                cur.execute("SELECT last_indexed_block FROM indexer_state WHERE id = 1")
+                to_block = cur.fetchone()[0] - REORG_WINDOW
+        pending = {table: state["tables"].get(table, -1) + 1 for table in tables or EXPORT_TABLES}
+        pending = {table: from_block for table, from_block in pending.items() if from_block <= to_block}
+        if not pending:
+            print(f"Nothing to export: already exported up to block {state['last_block']}", flush=True)
+            return {}
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(block_number) FROM events")
+            first_retained = cur.fetchone()[0]
+
+        print(f"Exporting up to block {to_block} to {export_dir}", flush=True)
+        counts = {}
+        files = []
+        for table, from_block in pending.items():
+            if table not in state["tables"]:
+                print(f"  {table}: no recorded export state, exporting from block 0", flush=True)
+            # A first run takes the rows of archived events too; later runs only have their block range
+            include_archived = table != "events" and from_block == 0
+            if (table != "events" and from_block > 0 and (first_retained is None or from_block < first_retained)
+                    and has_archived_rows(conn, table)):
+                print(f"  WARNING: {table}: blocks from {from_block} were archived before they were exported; "
+                      f"rows of archived events are missing (remove {table}/ and its {STATE_FILE} entry "
+                      f"to re-export it from block 0)", flush=True)
+            started = time.time()
+            counts[table], table_files = export_table(conn, table, from_block, to_block, export_dir,
+                                                      include_archived=include_archived)
+            files += table_files
+            print(f"  {table}: blocks {from_block}-{to_block}, {counts[table]} rows, {len(table_files)} files "
+                  f"({time.time() - started:.1f}s)", flush=True)
+    finally:
+        conn.rollback()
+        conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+
+    for temp_path, final_path in files:
+        os.replace(temp_path, final_path)
+    state["tables"].update({table: to_block for table in pending})
+    state.update({
+        "last_block": min(state["tables"].get(table, -1) for table in EXPORT_TABLES),
+        "exported_at": int(time.time()),
+    })
+    save_state(export_dir, state)
+    return counts
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python parquet_export.py [to_block]
+    conn = psycopg2.connect(DB_URL)
+    try:
+        export(conn, to_block=int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    finally:
+        conn.close()
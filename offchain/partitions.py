@@ -0,0 +1,321 @@
+"""
+TempoVault Table Partitioning
+Range partitions for events (by block_number) and oracle_updates (by month of block_timestamp),
+created on demand by the indexer, with a retention policy that archives old partitions to gzip CSV
+"""
+
+import gzip
+import os
+import re
+from datetime import datetime, timedelta
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+# Same database as event_indexer.py
+DB_URL = os.getenv("INDEXER_DB_URL", "postgresql://localhost:5432/tempovault")
+# Blocks per events partition; keep it fixed once partitions exist
+EVENTS_PARTITION_BLOCKS = int(os.getenv("EVENTS_PARTITION_BLOCKS", "1000000"))
+# Days of events and oracle_updates kept in Postgres; older partitions are archived and dropped (0 = keep all)
+PARTITION_RETENTION_DAYS = int(os.getenv("PARTITION_RETENTION_DAYS", "0"))
+# Directory archived partitions are written to, one <partition>.csv.gz each
+PARTITION_ARCHIVE_DIR = os.getenv("PARTITION_ARCHIVE_DIR", "archive")
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "indexer_schema.sql")
+
+# Partition table names per parent, matching the names generated below
+PARTITION_NAME_PATTERNS = {
+    "events": re.compile(r"^events_b\d+$"),
+    "oracle_updates": re.compile(r"^oracle_updates_\d{4}_\d{2}$"),
+}
+
+# {name: (lower, upper)} of partitions known to exist, per parent table; None means reload from the catalog
+_known_partitions = {"events": None, "oracle_updates": None}
+
+
+def events_partition(block_number):
+    """(name, from_block, to_block) of the events partition holding block_number"""
+    start = block_number // EVENTS_PARTITION_BLOCKS * EVENTS_PARTITION_BLOCKS
+    return f"events_b{start}", start, start + EVENTS_PARTITION_BLOCKS
+
+
+def month_start(timestamp):
+    return datetime(timestamp.year, timestamp.month, 1)
+
+
+def next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def oracle_updates_partition(timestamp):
+    """(name, from_time, to_time) of the monthly oracle_updates partition holding timestamp"""
+    start = month_start(timestamp)
+    return f"oracle_updates_{start:%Y_%m}", start, next_month(start)
+
+
+def parse_bound(table, value):
+    value = value.strip("'")
+    return int(value) if table == "events" else datetime.fromisoformat(value)
+
+
+def list_partitions(conn, table):
+    """[(name, lower, upper)] of the partitions attached to table, oldest first"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+        """, (table,))
+        rows = cur.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = re.match(r"FOR VALUES FROM \((.+)\) TO \((.+)\)", bound)
+        if match is None:
+            continue
+        partitions.append((name, parse_bound(table, match.group(1)), parse_bound(table, match.group(2))))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def detached_partitions(conn):
+    """[(table, name)] of partitions left detached by an interrupted archive run"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition")
+        names = sorted(row[0] for row in cur.fetchall())
+    return [(table, name) for name in names for table, pattern in PARTITION_NAME_PATTERNS.items() if pattern.match(name)]
+
+
+def is_partitioned(conn, table):
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table,))
+        return cur.fetchone()[0] == "p"
+
+
+def covering_partitions(first_block=None, last_block=None, first_time=None, last_time=None):
+    """
+    [(table, name, lower, upper)] covering the given block and time ranges
+
+    Includes the partition after each range, so the writer usually finds the
+    next partition already in place when it crosses a boundary.
+    """
+    wanted = []
+    if first_block is not None:
+        block = events_partition(first_block)[1]
+        while block <= last_block + EVENTS_PARTITION_BLOCKS:
+            wanted.append(("events", *events_partition(block)))
+            block += EVENTS_PARTITION_BLOCKS
+    if first_time is not None:
+        month = month_start(first_time)
+        while month <= next_month(month_start(last_time)):
+            wanted.append(("oracle_updates", *oracle_updates_partition(month)))
+            month = next_month(month)
+    return wanted
+
+
+def ensure_partitions(conn, first_block=None, last_block=None, first_time=None, last_time=None):
+    """
+    Create any missing partitions for blocks [first_block, last_block] and times [first_time, last_time]
+
+    The DDL runs in the caller's transaction if one is open, otherwise it is
+    committed straight away. Creating a partition briefly takes an exclusive
+    lock on its parent, so parallel writers (backfill) should create theirs
+    up front. Returns the names of the partitions created.
+    """
+    wanted = covering_partitions(first_block, last_block, first_time, last_time)
+    for table in {table for table, *_ in wanted}:
+        if _known_partitions[table] is None:
+            _known_partitions[table] = {name: (lower, upper) for name, lower, upper in list_partitions(conn, table)}
+
+    missing = []
+    for table, name, lower, upper in wanted:
+        known = _known_partitions[table].get(name)
+        if known is None:
+            missing.append((table, name, lower, upper))
+        elif known != (lower, upper):
+            raise RuntimeError(f"partition {name} covers {known}, expected [{lower}, {upper}): "
+                               f"EVENTS_PARTITION_BLOCKS must not change once partitions exist")
+    if not missing:
+        return []
+
+    idle = conn.get_transaction_status() == TRANSACTION_STATUS_IDLE
+    with conn.cursor() as cur:
+        for table, name, lower, upper in missing:
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                (lower, upper)
+            )
+            print(f"Created partition {name} of {table} [{lower}, {upper})", flush=True)
+
+    for table, name, lower, upper in missing:
+        if idle:
+            _known_partitions[table][name] = (lower, upper)
+        else:
+            # Only trust the catalog once the caller's transaction has committed
+            _known_partitions[table] = None
+    if idle:
+        conn.commit()
+    return [name for _, name, _, _ in missing]
+
+
+def schema_statements(table):
+    """CREATE TABLE / CREATE INDEX statements for table, taken from indexer_schema.sql"""
+    with open(SCHEMA_FILE) as f:
+        lines = [line for line in f.read().splitlines() if not line.strip().startswith("--")]
+    statements = [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+    pattern = re.compile(rf"^CREATE (TABLE IF NOT EXISTS {table} \(|INDEX \w+ ON {table}\()")
+    return [s for s in statements if pattern.match(s)]
+
+
+def migrate(conn):
+    """
+    Move existing unpartitioned events and oracle_updates rows into the partitioned layout
+
+    Each table is renamed aside, recreated from indexer_schema.sql, copied
+    and dropped in a single transaction. The tables are locked for the
+    duration of the copy, so stop the indexer first; API reads of
+    oracle_updates wait until it commits.
+    """
+    for table, key in (("events", "block_number"), ("oracle_updates", "block_timestamp")):
+        if is_partitioned(conn, table):
+            print(f"{table} is already partitioned", flush=True)
+            continue
+
+        legacy = f"{table}_unpartitioned"
+        with conn.cursor() as cur:
+            cur.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+            # A foreign key would have to reference (id, partition key); the typed tables only store event_id
+            cur.execute("""
+                SELECT conrelid::regclass::text, conname FROM pg_constraint
+                WHERE confrelid = %s::regclass AND contype = 'f'
+            """, (table,))
+            for referencing, constraint in cur.fetchall():
+                cur.execute(f'ALTER TABLE {referencing} DROP CONSTRAINT "{constraint}"')
+
+            # Free the table, index, constraint and sequence names for the partitioned table
+            cur.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+            cur.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass", (legacy,))
+            for index in [row[0] for row in cur.fetchall()]:
+                cur.execute(f"ALTER INDEX {index} RENAME TO {index[:50]}_unpartitioned")
+            cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (legacy,))
+            sequence = cur.fetchone()[0]
+            if sequence:
+                cur.execute(f"ALTER SEQUENCE {sequence} RENAME TO {legacy}_id_seq")
+
+            for statement in schema_statements(table):
+                cur.execute(statement)
+
+            cur.execute(f"SELECT MIN({key}), MAX({key}), COUNT(*) FROM {legacy}")
+            first, last, rows = cur.fetchone()
+
+        _known_partitions[table] = None
+        if rows:
+            if table == "events":
+                ensure_partitions(conn, first_block=first, last_block=last)
+            else:
+                ensure_partitions(conn, first_time=first, last_time=last)
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_name = %s ORDER BY ordinal_position
+            """, (legacy,))
+            columns = ", ".join(row[0] for row in cur.fetchall())
+            cur.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}")
+            copied = cur.rowcount
+            if copied != rows:
+                raise RuntimeError(f"{table}: copied {copied} of {rows} rows")
+            cur.execute(f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}",
+                        (table,))
+            cur.execute(f"DROP TABLE {legacy}")
+        print(f"Migrated {table}: {copied} rows into {len(list_partitions(conn, table))} partitions", flush=True)
+
+    conn.commit()
+    _known_partitions.update({table: None for table in _known_partitions})
+
+
+def archive_partition(conn, table, name, archive_dir=PARTITION_ARCHIVE_DIR):
+    """
+    Detach a partition, write it to <archive_dir>/<name>.csv.gz, then drop it; returns rows archived
+
+    The detach is committed first so readers stop seeing the rows at once.
+    The table is only dropped after the archive is fsynced, so an
+    interrupted run leaves it detached and the next run picks it up.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT relispartition FROM pg_class WHERE oid = %s::regclass", (name,))
+        if cur.fetchone()[0]:
+            cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+    conn.commit()
+    _known_partitions[table] = None
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    with open(path + ".tmp", "wb") as raw:
+        with gzip.GzipFile(filename=f"{name}.csv", mode="wb", fileobj=raw) as archive, conn.cursor() as cur:
+            cur.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+            rows = cur.rowcount
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(path + ".tmp", path)
+
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE {name}")
+    conn.commit()
+    print(f"Archived {name} ({rows} rows) to {path}", flush=True)
+    return rows
+
+
+def expired_partitions(conn, days):
+    """[(table, name)] of partitions entirely older than days and, for events, entirely indexed"""
+    cutoff = datetime.now() - timedelta(days=days)
+    expired = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT last_indexed_block FROM indexer_state WHERE id = 1")
+        row = cur.fetchone()
+        last_indexed = row[0] if row else 0
+
+        for name, _, upper in list_partitions(conn, "events"):
+            if upper - 1 > last_indexed:
+                break
+            cur.execute(f"SELECT MAX(block_timestamp) FROM {name}")
+            newest = cur.fetchone()[0]
+            if newest is not None and newest >= cutoff:
+                break
+            expired.append(("events", name))
+
+    for name, _, upper in list_partitions(conn, "oracle_updates"):
+        if upper > cutoff:
+            break
+        expired.append(("oracle_updates", name))
+    conn.commit()
+    return expired
+
+
+def apply_retention(conn, days=PARTITION_RETENTION_DAYS, archive_dir=PARTITION_ARCHIVE_DIR):
+    """Archive and drop partitions older than days (no-op when days is 0); returns [(table, name, rows)]"""
+    if days <= 0:
+        return []
+    pending = detached_partitions(conn) + expired_partitions(conn, days)
+    return [(table, name, archive_partition(conn, table, name, archive_dir)) for table, name in pending]
+
+
+if __name__ == "__main__":
+    import sys
+
+    conn = psycopg2.connect(DB_URL)
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+            # python partitions.py migrate
+            migrate(conn)
+        elif len(sys.argv) > 1 and sys.argv[1] == "retain":
+            # python partitions.py retain [days] [archive_dir]
+            days = int(sys.argv[2]) if len(sys.argv) > 2 else PARTITION_RETENTION_DAYS
+            archived = apply_retention(conn, days, sys.argv[3] if len(sys.argv) > 3 else PARTITION_ARCHIVE_DIR)
+            print(f"Archived {len(archived)} partitions", flush=True)
+        else:
+            # python partitions.py
+            for table in _known_partitions:
+                for name, lower, upper in list_partitions(conn, table):
+                    print(f"{table:<16} {name:<28} [{lower}, {upper})")
+    finally:
+        conn.close()
@@ -0,0 +1,370 @@
+"""
+TempoVault Oracle Relay Service
+Relays oracle signals for every pair in a config file from one process, each pair on its own cadence
+
+Each pair runs as an asyncio task. The blocking web3 calls of oracle_relay
+(onchain nonce, DEX query, signing, broadcast) run in a thread pool and
+receipts are polled with asyncio.sleep, so a pair waiting for its transaction
+to be mined never holds up the others. Broadcasts from the shared oracle
+account go through one lock so their account nonces stay sequential.
+
+With RELAY_BATCH_WINDOW > 0, signed updates that come due within the window
+are submitted together in one OracleSignalBatcher transaction
+(oracle_relay.send_oracle_batch) instead of one transaction per pair.
+
+With ORACLE_TRIGGER=deviation, a pair's interval is its polling period: the
+DEX is read every interval and a signal is only sent when
+oracle_relay.update_triggers finds a threshold crossing or the heartbeat is
+due; the polls that sent nothing are counted as skipped.
+
+Usage: python relay_service.py [config.json]
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import oracle_relay
+from nonce_manager import NONCE_STUCK_AFTER
+
+# Pair list (see relay_pairs.example.json)
+RELAY_CONFIG = os.getenv("RELAY_CONFIG", "relay_pairs.json")
+# Seconds between updates of a pair that does not set its own interval
+ORACLE_UPDATE_INTERVAL = float(os.getenv("ORACLE_UPDATE_INTERVAL", "60"))
+# Threads for blocking web3 calls; receipts are polled, so threads are only held for single RPCs
+RELAY_WORKERS = int(os.getenv("RELAY_WORKERS", "16"))
+# Seconds between receipt polls, and before an unmined update is counted as timed out
+RELAY_RECEIPT_POLL = float(os.getenv("RELAY_RECEIPT_POLL", "1"))
+RELAY_RECEIPT_TIMEOUT = float(os.getenv("RELAY_RECEIPT_TIMEOUT", "120"))
+# Seconds between latency reports, and recent updates per pair the percentiles cover
+RELAY_STATS_INTERVAL = float(os.getenv("RELAY_STATS_INTERVAL", "300"))
+RELAY_STATS_WINDOW = int(os.getenv("RELAY_STATS_WINDOW", "500"))
+# Seconds signed updates are collected into one batch transaction (0 = one transaction per update),
+# and the most updates per batch
+RELAY_BATCH_WINDOW = float(os.getenv("RELAY_BATCH_WINDOW", "0"))
+RELAY_BATCH_MAX = int(os.getenv("RELAY_BATCH_MAX", "30"))
+
+# Stages of one update, timed from the start of the DEX read
+STAGES = ("read", "sign", "send", "mined")
+
+
+def load_config(path=RELAY_CONFIG):
+    """Pairs to relay: pair_id, token_a, token_b, and optionally name and interval (seconds)"""
+    with open(path) as f:
+        config = json.load(f)
+
+    default_interval = float(config.get("interval", ORACLE_UPDATE_INTERVAL))
+    pairs = []
+    for entry in config["pairs"]:
+        missing = {"pair_id", "token_a", "token_b"} - set(entry)
+        if missing:
+            raise ValueError(f"Relay config pair {entry} is missing {', '.join(sorted(missing))}")
+        pairs.append({
+            "name": entry.get("name", entry["pair_id"][:10]),
+            "pair_id": entry["pair_id"],
+            "token_a": entry["token_a"],
+            "token_b": entry["token_b"],
+            "interval": float(entry.get("interval", default_interval)),
+        })
+
+    pair_ids = [pair["pair_id"].lower() for pair in pairs]
+    if len(set(pair_ids)) != len(pair_ids):
+        raise ValueError("Relay config lists a pair_id more than once")
+    return pairs
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class PairStats:
+    """Outcome counters, stage latencies and gas of one pair's recent updates"""
+
+    def __init__(self, window=RELAY_STATS_WINDOW):
+        self.counts = {"accepted": 0, "rejected": 0, "failed": 0, "timeouts": 0, "skipped": 0}
+        self.samples = deque(maxlen=window)
+        self.last_error = None
+
+    def record(self, outcome, stages=None, gas=None, error=None):
+        self.counts[outcome] += 1
+        if stages is not None:
+            self.samples.append({**stages, "gas": gas})
+        if error is not None:
+            self.last_error = error
+
+    def status(self):
+        """Counters, p50/p95/max of DEX read -> mined and the mean of each stage (seconds), mean gas per update"""
+        totals = sorted(sample["total"] for sample in self.samples)
+        return {
+            **self.counts,
+            "p50": round(percentile(totals, 50), 3),
+            "p95": round(percentile(totals, 95), 3),
+            "max": round(totals[-1], 3) if totals else 0.0,
+            "stages": {
+                stage: round(sum(sample[stage] for sample in self.samples) / len(self.samples), 3)
+                if self.samples else 0.0
+                for stage in STAGES
+            },
+            "gas": round(sum(sample["gas"] for sample in self.samples) / len(self.samples)) if self.samples else 0,
+            "last_error": self.last_error,
+        }
+
+
+class UpdateBatcher:
+    """Collects signed updates for up to window seconds and submits them in one batch transaction"""
+
+    def __init__(self, service, window, max_size=RELAY_BATCH_MAX):
+        self.service = service
+        self.window = window
+        self.max_size = max_size
+        self.queue = []
+        self.timer = None
+        self.flushes = set()
+        self.batches = 0
+
+    def add(self, pair_id, signal, signature):
+        """
+        Queue a signed update for the next batch
+
+        Returns two futures: the batch's tx hash once it is sent, and
+        (receipt, accepted, gas share) once it is mined.
+        """
+        loop = asyncio.get_running_loop()
+        item = {"update": (pair_id, signal, signature), "sent": loop.create_future(), "mined": loop.create_future()}
+        self.queue.append(item)
+        if len(self.queue) >= self.max_size:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self._start(self.flush())
+        elif self.timer is None:
+            self.timer = self._start(self.flush_after(self.window))
+        return item["sent"], item["mined"]
+
+    def _start(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+        return task
+
+    async def flush_after(self, delay):
+        await asyncio.sleep(delay)
+        self.timer = None
+        await self.flush()
+
+    async def flush(self):
+        items, self.queue = self.queue, []
+        if not items:
+            return
+
+        def resolve(key, result=None, error=None):
+            for item in items:
+                if not item[key].done():
+                    item[key].set_exception(error) if error else item[key].set_result(result)
+
+        try:
+            async with self.service.send_lock:
+                tx_hash = await asyncio.to_thread(oracle_relay.send_oracle_batch, [item["update"] for item in items])
+        except Exception as e:
+            resolve("sent", error=e)
+            return
+        self.batches += 1
+        resolve("sent", tx_hash)
+
+        try:
+            receipt = await self.service.wait_for_receipt(tx_hash)
+            accepted = await asyncio.to_thread(oracle_relay.batch_results, receipt, len(items))
+        except Exception as e:
+            resolve("mined", error=e)
+            return
+        # The batch's gas is attributed evenly to its updates
+        gas = receipt["gasUsed"] / len(items)
+        for item, ok in zip(items, accepted):
+            if not item["mined"].done():
+                item["mined"].set_result((receipt, ok, gas))
+
+
+class RelayService:
+    """Schedules every configured pair's updates in one event loop"""
+
+    def __init__(self, pairs, batch_window=RELAY_BATCH_WINDOW, trigger=oracle_relay.ORACLE_TRIGGER):
+        if trigger not in ("interval", "deviation"):
+            raise ValueError(f"Unknown oracle trigger {trigger!r}")
+        self.pairs = pairs
+        self.trigger = trigger
+        self.stats = {pair["pair_id"]: PairStats() for pair in pairs}
+        self.send_lock = asyncio.Lock()
+        self.batcher = UpdateBatcher(self, batch_window) if batch_window > 0 else None
+
+    async def wait_for_receipt(self, tx_hash):
+        deadline = time.monotonic() + RELAY_RECEIPT_TIMEOUT
+        while True:
+            receipt = await asyncio.to_thread(oracle_relay.get_receipt, tx_hash)
+            if receipt is not None:
+                return receipt
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{tx_hash.hex()} not mined after {RELAY_RECEIPT_TIMEOUT:g}s")
+            await asyncio.sleep(RELAY_RECEIPT_POLL)
+
+    async def update(self, pair, dex_data=None):
+        """
+        One relay round for a pair: read, sign, broadcast, wait for the receipt
+        dex_data, when the caller already queried the DEX, leaves only the onchain nonce to read
+
+        Returns (signal, tx_hash, accepted, gas, stages) where stages holds
+        the seconds spent in each of STAGES and the total. In batch mode the
+        send stage includes the wait for the batch, and gas is the update's
+        share of the batch transaction.
+        """
+        pair_id = pair["pair_id"]
+        stages = {}
+        started = mark = time.perf_counter()
+
+        def lap(stage):
+            nonlocal mark
+            now = time.perf_counter()
+            stages[stage] = now - mark
+            mark = now
+
+        if dex_data is None:
+            onchain_nonce, dex_data = await asyncio.gather(
+                asyncio.to_thread(oracle_relay.get_current_nonce, pair_id),
+                asyncio.to_thread(oracle_relay.query_tempo_dex, pair["token_a"], pair["token_b"]),
+            )
+        else:
+            onchain_nonce = await asyncio.to_thread(oracle_relay.get_current_nonce, pair_id)
+        lap("read")
+        signal = oracle_relay.build_signal(dex_data, onchain_nonce)
+        signature = await asyncio.to_thread(oracle_relay.sign_oracle_signal, pair_id, signal)
+        lap("sign")
+
+        if self.batcher is not None:
+            sent, mined = self.batcher.add(pair_id, signal, signature)
+            tx_hash = await sent
+            lap("send")
+            receipt, accepted, gas = await mined
+        else:
+            async with self.send_lock:
+                tx_hash = await asyncio.to_thread(oracle_relay.send_oracle_signal, pair_id, signal, signature)
+            lap("send")
+            receipt = await self.wait_for_receipt(tx_hash)
+            accepted, gas = receipt["status"] == 1, receipt["gasUsed"]
+        lap("mined")
+        stages["total"] = mark - started
+        return signal, tx_hash, accepted, gas, stages
+
+    async def run_pair(self, pair, first_delay=0.0):
+        """
+        Update a pair every interval seconds; an update that overruns its slot skips the missed ticks
+        In deviation mode every interval is a poll, and only polls with update triggers send a signal
+        """
+        loop = asyncio.get_running_loop()
+        stats = self.stats[pair["pair_id"]]
+        name = pair["name"]
+        next_run = loop.time() + first_delay
+        last_sent, last_sent_at = None, 0.0
+        await asyncio.sleep(first_delay)
+
+        while True:
+            try:
+                dex_data, reasons = None, ["interval"]
+                if self.trigger == "deviation":
+                    dex_data = await asyncio.to_thread(oracle_relay.query_tempo_dex, pair["token_a"], pair["token_b"])
+                    reasons = oracle_relay.update_triggers(last_sent, dex_data, time.monotonic() - last_sent_at)
+                if not reasons:
+                    stats.record("skipped")
+                else:
+                    signal, tx_hash, accepted, gas, stages = await self.update(pair, dex_data)
+                    stats.record("accepted" if accepted else "rejected", stages, gas)
+                    if accepted:
+                        last_sent, last_sent_at = signal, time.monotonic()
+                    print(f"[{name}] {'✓ accepted' if accepted else '✗ rejected'} nonce {signal['nonce']}, "
+                          f"tick {signal['referenceTick']}, deviation {signal['pegDeviation']} bps, "
+                          f"{stages['total']:.2f}s, {gas:.0f} gas, {', '.join(reasons)}, tx {tx_hash.hex()}",
+                          flush=True)
+            except TimeoutError as e:
+                stats.record("timeouts", error=str(e))
+                print(f"[{name}] Timed out: {e}", flush=True)
+            except Exception as e:
+                stats.record("failed", error=str(e))
+                print(f"[{name}] Error in relay update: {e}", flush=True)
+
+            next_run += pair["interval"]
+            now = loop.time()
+            if next_run < now:
+                next_run += pair["interval"] * -(-(now - next_run) // pair["interval"])
+            await asyncio.sleep(next_run - now)
+
+    def status(self):
+        return {pair["name"]: self.stats[pair["pair_id"]].status() for pair in self.pairs}
+
+    def print_stats(self):
+        mode = f"batched, {self.batcher.batches} batches" if self.batcher else "one transaction per update"
+        print(f"Relay latency, DEX read -> mined (last {RELAY_STATS_WINDOW} updates per pair, {mode}):", flush=True)
+        print(f"  {'pair':<20} {'ok':>6} {'rej':>5} {'fail':>5} {'t/o':>5} {'skip':>6} {'p50 s':>7} {'p95 s':>7} {'max s':>7} "
+              f"{'gas/upd':>8}  mean read/sign/send/mined s", flush=True)
+        for name, status in self.status().items():
+            stages = "/".join(f"{status['stages'][stage]:.2f}" for stage in STAGES)
+            print(f"  {name:<20} {status['accepted']:>6} {status['rejected']:>5} {status['failed']:>5} "
+                  f"{status['timeouts']:>5} {status['skipped']:>6} {status['p50']:>7.2f} {status['p95']:>7.2f} {status['max']:>7.2f} "
+                  f"{status['gas']:>8}  {stages}", flush=True)
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(RELAY_STATS_INTERVAL)
+            self.print_stats()
+
+    async def replace_stuck(self):
+        """Speed up oracle transactions pending for longer than NONCE_STUCK_AFTER; their waiters follow the new hash"""
+        while True:
+            await asyncio.sleep(NONCE_STUCK_AFTER / 3)
+            try:
+                await asyncio.to_thread(oracle_relay.nonce_manager.replace_stuck)
+            except Exception as e:
+                print(f"Error replacing stuck transactions: {e}", flush=True)
+
+    async def run(self):
+        """Run every pair until cancelled; first updates are spread over each pair's interval"""
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=RELAY_WORKERS))
+        tasks = [
+            asyncio.create_task(self.run_pair(pair, first_delay=index * pair["interval"] / len(self.pairs)))
+            for index, pair in enumerate(self.pairs)
+        ]
+        tasks.append(asyncio.create_task(self.report()))
+        tasks.append(asyncio.create_task(self.replace_stuck()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.print_stats()
+
+
+if __name__ == "__main__":
+    import sys
+
+    pairs = load_config(sys.argv[1] if len(sys.argv) > 1 else RELAY_CONFIG)
+    print(f"Starting oracle relay service for {len(pairs)} pairs", flush=True)
+    print(f"Oracle address: {oracle_relay.oracle_account.address}", flush=True)
+    if RELAY_BATCH_WINDOW > 0:
+        if oracle_relay.oracle_batcher is None:
+            raise SystemExit("RELAY_BATCH_WINDOW needs ORACLE_BATCHER_ADDRESS")
+        print(f"Batching updates due within {RELAY_BATCH_WINDOW:g}s through {oracle_relay.ORACLE_BATCHER_ADDRESS}", flush=True)
+    if oracle_relay.ORACLE_TRIGGER == "deviation":
+        print(f"Sending on deviation (tick {oracle_relay.ORACLE_TICK_THRESHOLD}, "
+              f"deviation {oracle_relay.ORACLE_DEVIATION_THRESHOLD} bps, depth {oracle_relay.ORACLE_DEPTH_THRESHOLD_BPS} bps) "
+              f"or every {oracle_relay.ORACLE_HEARTBEAT:g}s", flush=True)
+    for pair in pairs:
+        print(f"  {pair['name']}: {pair['pair_id']} "
+              f"{'polled' if oracle_relay.ORACLE_TRIGGER == 'deviation' else 'updated'} every {pair['interval']:.0f}s",
+              flush=True)
+    try:
+        asyncio.run(RelayService(pairs).run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,280 @@
+"""
+TempoVault Risk Backtest
+Replays indexed oracle_updates against a grid of candidate RiskController thresholds in one vectorized pass
+
+Each pair's history is resampled to one row per minute: the latest update
+as of that minute and its age. Under a parameter set (max peg deviation,
+min depth, staleness) a minute is in breach when |pegDeviation| exceeds the
+max, bid + ask depth is below the min, or the update is older than the
+staleness threshold (the checks of validateOrderPlacement, with the block
+time standing in for the signal timestamp).
+
+Rather than evaluating every parameter set over every minute, each minute
+is binned by the first grid value it passes on each axis; a 3-D histogram
+of the bins with cumulative sums gives the passing-minute count of every
+grid point, so a scan costs O(minutes + grid size). Trips (breach onsets)
+come from the same count over consecutive minute pairs. A trip is false
+when no recorded circuit breaker was active then or triggered within
+BACKTEST_TRIGGER_WINDOW minutes after it; a recorded trigger is missed
+when the parameter set was not in breach at any point of that window.
+
+Usage: python risk_backtest.py [parquet_export_dir]   # Postgres (INDEXER_DB_URL) without a directory
+"""
+
+import os
+import time
+import numpy as np
+
+DB_URL = os.getenv("INDEXER_DB_URL", "postgresql://localhost:5432/tempovault")
+# Minutes before a recorded circuit breaker trigger in which a would-be trip counts as a true one
+BACKTEST_TRIGGER_WINDOW = int(os.getenv("BACKTEST_TRIGGER_WINDOW", "60"))
+
+# 25 peg deviations x 20 depths (18-decimal USD, scaled to units) x 20 staleness thresholds (seconds) = 10,000 sets
+DEFAULT_GRID = {
+    "max_peg_deviation": np.linspace(10, 250, 25),
+    "min_depth": np.geomspace(1e3, 1e8, 20),
+    "staleness": np.linspace(180, 3600, 20),
+}
+
+
+def group_by_pair(pair_ids, columns):
+    """{pair_id: {name: array}} from rows already sorted by pair"""
+    pair_ids = np.asarray(pair_ids)
+    if len(pair_ids) == 0:
+        return {}
+    pairs, starts = np.unique(pair_ids, return_index=True)
+    order = np.argsort(starts)
+    bounds = list(starts[order]) + [len(pair_ids)]
+    return {
+        str(pairs[i]): {name: values[bounds[n]:bounds[n + 1]] for name, values in columns.items()}
+        for n, i in enumerate(order)
+    }
+
+
+def load_history_db(conn):
+    """(updates, breakers) from the indexer database, as {pair_id: history} in backtest_pair's shapes"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT pair_id, EXTRACT(EPOCH FROM block_timestamp)::bigint, abs(peg_deviation),
+                   orderbook_depth_bid::float8 / 1e18 + orderbook_depth_ask::float8 / 1e18
+            FROM oracle_updates
+            ORDER BY pair_id, block_timestamp, id
+        """)
+        rows = cur.fetchall()
+        cur.execute("""
+            SELECT pair_id, EXTRACT(EPOCH FROM block_timestamp)::bigint, triggered
+            FROM circuit_breakers
+            ORDER BY pair_id, block_timestamp, id
+        """)
+        breaker_rows = cur.fetchall()
+    conn.rollback()
+
+    pair_ids, times, peg, depth = zip(*rows) if rows else ((), (), (), ())
+    updates = group_by_pair(pair_ids, {
+        "time": np.array(times, dtype=np.int64),
+        "peg": np.array(peg, dtype=np.float64),
+        "depth": np.array(depth, dtype=np.float64),
+    })
+    pair_ids, times, triggered = zip(*breaker_rows) if breaker_rows else ((), (), ())
+    breakers = group_by_pair(pair_ids, {
+        "time": np.array(times, dtype=np.int64),
+        "triggered": np.array(triggered, dtype=bool),
+    })
+    return updates, breakers
+
+
+def load_history_parquet(export_dir):
+    """
+    (updates, breakers) from parquet_export.py files
+
+    Raises ValueError when the export state shows circuit_breakers exported
+    to an earlier block than oracle_updates: every would-be trip in the gap
+    would count as a false one.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from parquet_analytics import read_table
+    from parquet_export import load_state
+
+    exported = load_state(export_dir)["tables"]
+    if exported and exported.get("circuit_breakers", -1) < exported.get("oracle_updates", -1):
+        raise ValueError(f"{export_dir}: circuit_breakers is exported up to block {exported.get('circuit_breakers', -1)}, "
+                         f"oracle_updates up to {exported['oracle_updates']}; run parquet_export.py to backfill it")
+
+    def seconds(column):
+        return pc.divide(pc.cast(column, pa.int64()), 1_000_000).to_numpy()
+
+    table = read_table("oracle_updates", ["pair_id", "block_timestamp", "id", "peg_deviation",
+                                          "orderbook_depth_bid", "orderbook_depth_ask"], export_dir)
+    table = table.sort_by([("pair_id", "ascending"), ("block_timestamp", "ascending"), ("id", "ascending")])
+    depth = pc.add(pc.cast(table["orderbook_depth_bid"], pa.float64()), pc.cast(table["orderbook_depth_ask"], pa.float64()))
+    updates = group_by_pair(table["pair_id"].to_numpy(zero_copy_only=False), {
+        "time": seconds(table["block_timestamp"]),
+        "peg": np.abs(table["peg_deviation"].to_numpy().astype(np.float64)),
+        "depth": pc.divide(depth, 1e18).to_numpy(),
+    })
+
+    table = read_table("circuit_breakers", ["pair_id", "block_timestamp", "id", "triggered"], export_dir)
+    table = table.sort_by([("pair_id", "ascending"), ("block_timestamp", "ascending"), ("id", "ascending")])
+    breakers = group_by_pair(table["pair_id"].to_numpy(zero_copy_only=False), {
+        "time": seconds(table["block_timestamp"]),
+        "triggered": table["triggered"].to_numpy(zero_copy_only=False).astype(bool),
+    })
+    return updates, breakers
+
+
+def minute_series(times, peg, depth, until=None):
+    """Minute timestamps from the first update to until (default the last), with the latest update's values and age"""
+    start = -(-int(times[0]) // 60) * 60
+    minutes = np.arange(start, (int(times[-1]) if until is None else until) + 1, 60, dtype=np.int64)
+    latest = np.searchsorted(times, minutes, side="right") - 1
+    return minutes, peg[latest], depth[latest], minutes - times[latest]
+
+
+def breaker_coverage(minutes, breaker_times, triggered, window=BACKTEST_TRIGGER_WINDOW):
+    """Minutes a trip counts as true: from window minutes before each recorded trigger until its reset"""
+    covered = np.zeros(len(minutes) + 1, dtype=np.int64)
+    active_since = None
+    for at, on in zip(breaker_times, triggered):
+        if on and active_since is None:
+            active_since = at
+        elif not on and active_since is not None:
+            covered[np.searchsorted(minutes, active_since - window * 60)] += 1
+            covered[np.searchsorted(minutes, at, side="right")] -= 1
+            active_since = None
+    if active_since is not None:
+        covered[np.searchsorted(minutes, active_since - window * 60)] += 1
+    return np.cumsum(covered[:-1]) > 0
+
+
+def passing(bins, shape):
+    """
+    Minutes passing every check, for each grid point, from the per-minute bins
+
+    bins = (peg, depth, age): a minute passes the peg and staleness checks
+    from grid index bin on and the depth check below index bin. One
+    histogram, then cumulative sums (forward, backward, forward) over the
+    three axes.
+    """
+    pegs, depths, stalenesses = shape
+    peg_bin, depth_bin, age_bin = bins
+    flat = (peg_bin * (depths + 1) + depth_bin) * (stalenesses + 1) + age_bin
+    counts = np.bincount(flat, minlength=(pegs + 1) * (depths + 1) * (stalenesses + 1))
+    counts = counts.reshape(pegs + 1, depths + 1, stalenesses + 1)
+    counts = counts.cumsum(axis=0).cumsum(axis=2)
+    counts = counts[:, ::-1, :].cumsum(axis=1)[:, ::-1, :]
+    return counts[:pegs, 1:, :stalenesses]
+
+
+def backtest_pair(history, breaker_history=None, grid=DEFAULT_GRID, window=BACKTEST_TRIGGER_WINDOW, until=None):
+    """
+    Counts for every grid point of one pair, as (pegs, depths, stalenesses) arrays
+
+    history: {"time" (seconds, sorted), "peg" (|pegDeviation|), "depth" (bid + ask, units)}
+    breaker_history: {"time", "triggered"} of recorded CircuitBreakerTriggered / Reset events;
+    triggers before the first minute of history are not counted
+    """
+    pegs, depths, stalenesses = (np.sort(np.asarray(grid[axis], dtype=np.float64))
+                                 for axis in ("max_peg_deviation", "min_depth", "staleness"))
+    shape = (len(pegs), len(depths), len(stalenesses))
+    minutes, peg, depth, age = minute_series(history["time"], history["peg"], history["depth"], until)
+
+    # Prepended virtual minute that passes everything, so a breach in the first minute is a trip
+    bins = (
+        np.concatenate(([0], np.searchsorted(pegs, peg, side="left"))),
+        np.concatenate(([len(depths)], np.searchsorted(depths, depth, side="right"))),
+        np.concatenate(([0], np.searchsorted(stalenesses, age, side="left"))),
+    )
+    previous = tuple(b[:-1] for b in bins)
+    current = tuple(b[1:] for b in bins)
+    # Both of two consecutive minutes pass: the worse bin of the two on each axis
+    both = (np.maximum(previous[0], current[0]), np.minimum(previous[1], current[1]),
+            np.maximum(previous[2], current[2]))
+
+    if breaker_history is not None and len(breaker_history["time"]):
+        covered = breaker_coverage(minutes, breaker_history["time"], breaker_history["triggered"], window)
+        trigger_times = breaker_history["time"][breaker_history["triggered"]]
+    else:
+        covered = np.zeros(len(minutes), dtype=bool)
+        trigger_times = []
+    uncovered = ~covered
+
+    # A trigger is missed when every minute of its window passes: its worst bins over the window pass
+    worst = []
+    for at in trigger_times:
+        low, high = np.searchsorted(minutes, at - window * 60), np.searchsorted(minutes, at, side="right")
+        if low < high:
+            worst.append((current[0][low:high].max(), current[1][low:high].min(), current[2][low:high].max()))
+    if worst:
+        missed = passing(tuple(np.array(values) for values in zip(*worst)), shape)
+    else:
+        missed = np.zeros(shape, dtype=np.int64)
+
+    # A trip is a minute that fails after one that passed
+    trips = passing(previous, shape) - passing(both, shape)
+    false_trips = (passing(tuple(b[uncovered] for b in previous), shape)
+                   - passing(tuple(b[uncovered] for b in both), shape))
+    return {
+        "minutes": len(minutes),
+        "triggers": len(worst),
+        "trips": trips,
+        "false_trips": false_trips,
+        "missed_triggers": missed,
+        "breach_minutes": len(minutes) - passing(current, shape),
+    }
+
+
+def backtest(updates, breakers=None, grid=DEFAULT_GRID, window=BACKTEST_TRIGGER_WINDOW, until=None):
+    """backtest_pair for every pair in updates ({pair_id: history}); breakers is {pair_id: breaker_history}"""
+    breakers = breakers or {}
+    return {pair_id: backtest_pair(history, breakers.get(pair_id), grid, window, until)
+            for pair_id, history in updates.items() if len(history["time"])}
+
+
+def best_parameters(result, grid=DEFAULT_GRID, count=5):
+    """The count parameter sets with the fewest missed triggers, then fewest false trips, then least time in breach"""
+    axes = [np.sort(np.asarray(grid[axis], dtype=np.float64)) for axis in ("max_peg_deviation", "min_depth", "staleness")]
+    order = np.lexsort((result["breach_minutes"].ravel(), result["false_trips"].ravel(),
+                        result["missed_triggers"].ravel()))[:count]
+    rows = []
+    for flat in order:
+        index = np.unravel_index(flat, result["trips"].shape)
+        rows.append({
+            "max_peg_deviation": float(axes[0][index[0]]),
+            "min_depth": float(axes[1][index[1]]),
+            "staleness": float(axes[2][index[2]]),
+            "trips": int(result["trips"][index]),
+            "false_trips": int(result["false_trips"][index]),
+            "missed_triggers": int(result["missed_triggers"][index]),
+            "breach_minutes": int(result["breach_minutes"][index]),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+
+    started = time.perf_counter()
+    if len(sys.argv) > 1:
+        updates, breakers = load_history_parquet(sys.argv[1])
+    else:
+        import psycopg2
+        conn = psycopg2.connect(DB_URL)
+        try:
+            updates, breakers = load_history_db(conn)
+        finally:
+            conn.close()
+    loaded = time.perf_counter()
+    results = backtest(updates, breakers)
+    finished = time.perf_counter()
+
+    grid_size = int(np.prod([len(values) for values in DEFAULT_GRID.values()]))
+    print(f"Loaded {sum(len(h['time']) for h in updates.values())} oracle updates for {len(updates)} pairs "
+          f"in {loaded - started:.1f}s; {grid_size} parameter sets replayed in {finished - loaded:.2f}s")
+    for pair_id, result in results.items():
+        print(f"\n{pair_id}: {result['minutes']} minutes, {result['triggers']} recorded circuit breaker triggers")
+        for row in best_parameters(result):
+            print(f"  maxPeg {row['max_peg_deviation']:>6.1f}  minDepth {row['min_depth']:>12,.0f}  "
+                  f"staleness {row['staleness']:>6.0f}s  trips {row['trips']:>4}  false {row['false_trips']:>4}  "
+                  f"missed {row['missed_triggers']:>3}  "
+                  f"breach {row['breach_minutes']:>6} min")
@@ -1,18 +1,57 @@
 """
 TempoVault Risk Signal Engine
 Monitors Tempo DEX orderbook and computes risk signals
+
+Upstream orderbook reads go through one pooled keep-alive aiohttp session;
+the price and depth endpoints are fetched concurrently, and each pair's
+snapshot is cached for RISK_ENGINE_CACHE_TTL seconds with concurrent misses
+coalesced onto one fetch. Upstream latency histograms are served on /stats.
+
+Tracked pairs (RISK_ENGINE_PAIRS, plus pairs requested within the last
+RISK_ENGINE_PAIR_TTL seconds, up to RISK_ENGINE_MAX_PAIRS) are refreshed
+by a background scheduler, so /risk-signal/{pair_id} and the bulk
+/risk-signals are served from the in-memory snapshots with their age.
+
+Nonces are allocated from a SQLite counter file (nonce_store.py) shared by
+every worker, so the engine can run as several uvicorn workers on one host.
 """
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Optional
+import aiohttp
+import asyncio
+import bisect
+import json
 import os
-import requests
-from datetime import datetime
+import time
+from web3 import Web3
+from nonce_store import NonceStore
 
 app = FastAPI(title="TempoVault Risk Signal Engine")
 
 TEMPO_API_URL = os.getenv("TEMPO_API_URL", "https://api.tempo.network")
+# Seconds before an upstream request is abandoned, and pooled upstream connections kept open
+RISK_ENGINE_HTTP_TIMEOUT = float(os.getenv("RISK_ENGINE_HTTP_TIMEOUT", "5"))
+RISK_ENGINE_MAX_CONNECTIONS = int(os.getenv("RISK_ENGINE_MAX_CONNECTIONS", "100"))
+# Seconds a pair's orderbook snapshot is reused; requests inside the window share one upstream fetch
+RISK_ENGINE_CACHE_TTL = float(os.getenv("RISK_ENGINE_CACHE_TTL", "1"))
+# Pairs refreshed from startup (JSON like relay_pairs.example.json; empty = only pairs requested so far),
+# seconds between background refreshes, and snapshot age after which a signal is reported stale
+RISK_ENGINE_PAIRS = os.getenv("RISK_ENGINE_PAIRS", "")
+RISK_ENGINE_REFRESH_INTERVAL = float(os.getenv("RISK_ENGINE_REFRESH_INTERVAL", "1"))
+RISK_ENGINE_STALE_AFTER = float(os.getenv("RISK_ENGINE_STALE_AFTER", "10"))
+# Most pairs tracked because they were requested (on top of RISK_ENGINE_PAIRS), and seconds without a
+# request after which such a pair stops being refreshed
+RISK_ENGINE_MAX_PAIRS = int(os.getenv("RISK_ENGINE_MAX_PAIRS", "256"))
+RISK_ENGINE_PAIR_TTL = float(os.getenv("RISK_ENGINE_PAIR_TTL", "300"))
+# RiskController whose oracleNonces a pair's counter is raised to the first time a process serves the pair;
+# unset keeps the local counters only
+RPC_URL = os.getenv("RPC_URL", "https://rpc.moderato.tempo.xyz")
+RISK_CONTROLLER_ADDRESS = os.getenv("RISK_CONTROLLER_ADDRESS")
+
+# Upper bounds (ms) of the upstream latency histogram buckets; slower requests land in the overflow bucket
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
 
 
 class OracleSignal(BaseModel):
@@ -27,58 +66,396 @@ class RiskSignalResponse(BaseModel):
     pairId: str
     signal: OracleSignal
     status: str
-
-
-def compute_peg_deviation(tokenA: str, tokenB: str) -> int:
+    asOf: Optional[int] = None
+    ageSeconds: Optional[float] = None
+    stale: Optional[bool] = None
+    changedAt: Optional[int] = None
+
+
+class LatencyHistogram:
+    """Request counts per latency bucket, plus errors, for one upstream endpoint"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.total_ms = 0.0
+        self.errors = 0
+
+    def observe(self, elapsed_ms):
+        self.counts[bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+        self.total_ms += elapsed_ms
+
+    def quantile(self, q):
+        """Upper bound (ms) of the bucket holding the q-quantile; None when empty or in the overflow bucket"""
+        total = sum(self.counts)
+        if not total:
+            return None
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= q * total:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else None
+        return None
+
+    def snapshot(self):
+        requests = sum(self.counts)
+        labels = [f"le_{bound}ms" for bound in self.buckets_ms] + [f"gt_{self.buckets_ms[-1]}ms"]
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / requests, 2) if requests else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class UpstreamClient:
+    """Pooled keep-alive HTTP client for the Tempo orderbook API, timing each request per endpoint"""
+
+    def __init__(self, base_url=TEMPO_API_URL, timeout=RISK_ENGINE_HTTP_TIMEOUT,
+                 max_connections=RISK_ENGINE_MAX_CONNECTIONS):
+        self.base_url = base_url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_connections = max_connections
+        self.session = None
+        self.latency = {}
+
+    def open(self):
+        """The shared session, created on first use inside the running event loop"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def get_json(self, endpoint, path):
+        histogram = self.latency.setdefault(endpoint, LatencyHistogram())
+        started = time.perf_counter()
+        try:
+            async with self.open().get(f"{self.base_url}{path}") as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except Exception:
+            histogram.errors += 1
+            raise
+        histogram.observe((time.perf_counter() - started) * 1000)
+        return data
+
+
+def peg_deviation_from(data: dict) -> int:
     """
     Compute peg deviation in ticks
     Returns deviation from expected 1:1 peg
     Positive = tokenA overvalued, Negative = tokenA undervalued
     """
-    try:
-        response = requests.get(
-            f"{TEMPO_API_URL}/orderbook/{tokenA}/{tokenB}",
-            timeout=5
-        )
-        response.raise_for_status()
-        data = response.json()
+    best_bid = data.get("bestBid", 0)
+    best_ask = data.get("bestAsk", 0)
+    mid_price = (best_bid + best_ask) / 2
 
-        best_bid = data.get("bestBid", 0)
-        best_ask = data.get("bestAsk", 0)
-        mid_price = (best_bid + best_ask) / 2
+    peg_price = 1.0
+    deviation = (mid_price - peg_price) / peg_price * 100000
 
-        peg_price = 1.0
-        deviation = (mid_price - peg_price) / peg_price * 100000
+    return int(deviation)
 
-        return int(deviation)
-    except Exception as e:
-        print(f"Error computing peg deviation: {e}")
-        return 0
 
-
-def compute_orderbook_depth(tokenA: str, tokenB: str) -> tuple[int, int]:
+def orderbook_depth_from(data: dict) -> tuple[int, int]:
     """
     Compute total orderbook depth on bid and ask sides
     Returns (bidDepth, askDepth) in 18-decimal token units
     """
-    try:
-        response = requests.get(
-            f"{TEMPO_API_URL}/orderbook/{tokenA}/{tokenB}/depth",
-            timeout=5
-        )
-        response.raise_for_status()
-        data = response.json()
+    bid_depth = int(data.get("bidDepth", 0) * 1e18)
+    ask_depth = int(data.get("askDepth", 0) * 1e18)
+
+    return (bid_depth, ask_depth)
+
+
+async def compute_peg_deviation(tokenA: str, tokenB: str) -> int:
+    return peg_deviation_from(await upstream.get_json("orderbook", f"/orderbook/{tokenA}/{tokenB}"))
 
-        bid_depth = int(data.get("bidDepth", 0) * 1e18)
-        ask_depth = int(data.get("askDepth", 0) * 1e18)
 
-        return (bid_depth, ask_depth)
-    except Exception as e:
-        print(f"Error computing orderbook depth: {e}")
-        return (0, 0)
+async def compute_orderbook_depth(tokenA: str, tokenB: str) -> tuple[int, int]:
+    return orderbook_depth_from(await upstream.get_json("depth", f"/orderbook/{tokenA}/{tokenB}/depth"))
+
+
+class SnapshotCache:
+    """
+    Per-pair orderbook snapshots reused for ttl seconds
+
+    Concurrent misses for a pair share one fetch (single-flight). A snapshot
+    with a failed component is returned to its waiters but not cached, so the
+    next request retries upstream. changedAt is carried over from the
+    previous snapshot while the values stay the same.
+    """
+
+    def __init__(self, ttl=RISK_ENGINE_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def peek(self, tokenA: str, tokenB: str):
+        """Last complete snapshot of a pair, whatever its age, or None"""
+        return self.entries.get((tokenA.lower(), tokenB.lower()))
+
+    def forget(self, tokenA: str, tokenB: str):
+        self.entries.pop((tokenA.lower(), tokenB.lower()), None)
+
+    def loading(self, tokenA: str, tokenB: str) -> bool:
+        return (tokenA.lower(), tokenB.lower()) in self.inflight
+
+    def load(self, tokenA: str, tokenB: str):
+        """The pair's fetch in progress, starting one if there is none"""
+        key = (tokenA.lower(), tokenB.lower())
+        if key in self.inflight:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            # Own task, so a disconnected requester cannot cancel the fetch the others are waiting on
+            self.inflight[key] = asyncio.ensure_future(self.fetch(key, tokenA, tokenB))
+        return self.inflight[key]
+
+    async def get(self, tokenA: str, tokenB: str, max_age: Optional[float] = None) -> dict:
+        """Snapshot no older than max_age seconds (default ttl), fetching it if needed"""
+        entry = self.peek(tokenA, tokenB)
+        if entry is not None and time.monotonic() - entry["fetchedAt"] < (self.ttl if max_age is None else max_age):
+            self.stats["hits"] += 1
+            return entry
+        return await asyncio.shield(self.load(tokenA, tokenB))
+
+    async def fetch(self, key, tokenA, tokenB):
+        try:
+            peg_deviation, depth = await asyncio.gather(
+                compute_peg_deviation(tokenA, tokenB),
+                compute_orderbook_depth(tokenA, tokenB),
+                return_exceptions=True,
+            )
+            # A failed component reads as zero, as a failed request always has
+            complete = True
+            if isinstance(peg_deviation, Exception):
+                print(f"Error computing peg deviation: {peg_deviation}")
+                peg_deviation, complete = 0, False
+            if isinstance(depth, Exception):
+                print(f"Error computing orderbook depth: {depth}")
+                depth, complete = (0, 0), False
+
+            snapshot = {
+                "pegDeviation": peg_deviation,
+                "orderbookDepthBid": depth[0],
+                "orderbookDepthAsk": depth[1],
+                "fetchedAt": time.monotonic(),
+                "asOf": time.time(),
+                "complete": complete,
+            }
+            previous = self.entries.get(key)
+            values = ("pegDeviation", "orderbookDepthBid", "orderbookDepthAsk")
+            if previous is not None and all(previous[v] == snapshot[v] for v in values):
+                snapshot["changedAt"] = previous["changedAt"]
+            else:
+                snapshot["changedAt"] = snapshot["asOf"]
+            if complete:
+                self.entries[key] = snapshot
+            return snapshot
+        finally:
+            del self.inflight[key]
+
+
+class PairConflict(Exception):
+    """A pair_id requested with other tokens than the ones it is tracked with"""
+
+
+class RegistryFull(Exception):
+    """A new pair was requested while max_pairs requested pairs are tracked"""
+
+
+class SignalScheduler:
+    """
+    Registry of tracked pairs whose snapshots are refreshed in the background
+
+    Every interval seconds a refetch of each tracked pair is started, so
+    requests are answered from memory. The rounds are not awaited: a slow
+    pair whose last fetch is still in flight is skipped rather than holding
+    up the others. A pair that fails to refresh keeps its last snapshot,
+    which ages until it is reported stale.
+
+    Configured pairs (RISK_ENGINE_PAIRS) are tracked for good. Pairs added
+    by requests are capped at max_pairs, and dropped with their snapshot
+    once nobody has asked for them in pair_ttl seconds, so mistyped or
+    hostile pair ids cannot grow the upstream load without bound.
+    """
+
+    def __init__(self, interval=RISK_ENGINE_REFRESH_INTERVAL, max_pairs=RISK_ENGINE_MAX_PAIRS,
+                 pair_ttl=RISK_ENGINE_PAIR_TTL):
+        self.interval = interval
+        self.max_pairs = max_pairs
+        self.pair_ttl = pair_ttl
+        self.pairs = {}  # pair_id -> (tokenA, tokenB)
+        self.configured = set()
+        self.requested = {}  # pair_id -> monotonic time of its last request, for pairs not configured
+        self.task = None
+        self.stats = {"rounds": 0, "refreshes": 0, "failures": 0, "skipped": 0, "expired": 0, "rejected": 0}
+
+    def track(self, pair_id: str, tokenA: str, tokenB: str, configured: bool = False):
+        """
+        Register a pair, or note another request for it; returns its (tokenA, tokenB)
+
+        Raises PairConflict if pair_id is tracked with other tokens, and
+        RegistryFull if it is new and max_pairs requested pairs are tracked.
+        """
+        pair_id = pair_id.lower()
+        tokens = self.pairs.get(pair_id)
+        if tokens is not None and (tokens[0].lower(), tokens[1].lower()) != (tokenA.lower(), tokenB.lower()):
+            self.stats["rejected"] += 1
+            raise PairConflict(f"{pair_id} is tracked with tokens {tokens[0]}, {tokens[1]}")
+
+        if configured:
+            self.configured.add(pair_id)
+            self.requested.pop(pair_id, None)
+        elif pair_id not in self.configured:
+            if tokens is None and len(self.requested) >= self.max_pairs:
+                self.expire()
+                if len(self.requested) >= self.max_pairs:
+                    self.stats["rejected"] += 1
+                    raise RegistryFull(f"{self.max_pairs} requested pairs are already tracked")
+            self.requested[pair_id] = time.monotonic()
+
+        if tokens is None:
+            tokens = self.pairs[pair_id] = (tokenA, tokenB)
+        return tokens
+
+    def expire(self):
+        """Drop requested pairs not asked for in pair_ttl seconds, and their snapshots"""
+        cutoff = time.monotonic() - self.pair_ttl
+        for pair_id in [pair_id for pair_id, at in self.requested.items() if at < cutoff]:
+            # A fetch still in flight would store the snapshot again; the next round drops the pair
+            if snapshots.loading(*self.pairs[pair_id]):
+                continue
+            del self.requested[pair_id]
+            tokens = self.pairs.pop(pair_id)
+            if tokens not in self.pairs.values():
+                snapshots.forget(*tokens)
+            self.stats["expired"] += 1
+
+    def refresh_all(self):
+        """Start a refetch of every tracked pair that is not still being fetched"""
+        self.stats["rounds"] += 1
+        self.expire()
+        for tokenA, tokenB in self.pairs.values():
+            if snapshots.loading(tokenA, tokenB):
+                self.stats["skipped"] += 1
+            else:
+                snapshots.load(tokenA, tokenB).add_done_callback(self.record)
+
+    def record(self, fetch):
+        if fetch.cancelled():
+            return
+        self.stats["refreshes"] += 1
+        if fetch.exception() is not None or not fetch.result()["complete"]:
+            self.stats["failures"] += 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
+        while True:
+            try:
+                self.refresh_all()
+            except Exception as e:
+                print(f"Error refreshing risk signals: {e}", flush=True)
+            next_run += self.interval
+            await asyncio.sleep(max(0, next_run - loop.time()))
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+def load_pairs(path: str) -> list:
+    """(pair_id, tokenA, tokenB) for each pair in a relay-style JSON config"""
+    with open(path) as f:
+        return [(entry["pair_id"], entry["token_a"], entry["token_b"]) for entry in json.load(f)["pairs"]]
+
+
+def signal_response(pair_id: str, snapshot: dict, nonce: int, timestamp: Optional[int] = None) -> RiskSignalResponse:
+    """Response for a snapshot with its age; the signal is timestamped when issued (default: now), asOf is the fetch"""
+    now = time.time()
+    age = now - snapshot["asOf"]
+    signal = OracleSignal(
+        pegDeviation=snapshot["pegDeviation"],
+        orderbookDepthBid=snapshot["orderbookDepthBid"],
+        orderbookDepthAsk=snapshot["orderbookDepthAsk"],
+        timestamp=int(now) if timestamp is None else timestamp,
+        nonce=nonce
+    )
+
+    return RiskSignalResponse(
+        pairId=pair_id,
+        signal=signal,
+        status="success",
+        asOf=int(snapshot["asOf"]),
+        ageSeconds=round(age, 3),
+        stale=age > RISK_ENGINE_STALE_AFTER,
+        changedAt=int(snapshot["changedAt"])
+    )
+
+
+upstream = UpstreamClient()
+snapshots = SnapshotCache()
+scheduler = SignalScheduler()
+nonces = NonceStore()
+synced_pairs = set()
+
+risk_controller = None
+if RISK_CONTROLLER_ADDRESS:
+    with open("../out/RiskController.sol/RiskController.json") as f:
+        risk_controller = Web3(Web3.HTTPProvider(RPC_URL)).eth.contract(
+            address=Web3.to_checksum_address(RISK_CONTROLLER_ADDRESS),
+            abi=json.load(f)["abi"]
+        )
 
 
-nonce_state = {}
+async def reserve_nonce(pair_id: str) -> tuple[int, int]:
+    """
+    Allocate the pair's next (nonce, timestamp), first catching the counter up with RiskController if one is configured
+    Timestamps strictly increase per pair, as RiskController requires, even for signals from one snapshot.
+    """
+    if risk_controller is not None and pair_id not in synced_pairs:
+        try:
+            onchain = await asyncio.to_thread(risk_controller.functions.oracleNonces(Web3.to_bytes(hexstr=pair_id)).call)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Could not read oracle nonce: {e}")
+        await asyncio.to_thread(nonces.advance, pair_id, onchain)
+        synced_pairs.add(pair_id)
+    return await asyncio.to_thread(nonces.issue, pair_id, int(time.time()))
+
+
+@app.on_event("startup")
+async def start_scheduler():
+    if RISK_ENGINE_PAIRS:
+        for pair_id, tokenA, tokenB in load_pairs(RISK_ENGINE_PAIRS):
+            scheduler.track(pair_id, tokenA, tokenB, configured=True)
+    scheduler.start()
+
+
+@app.on_event("shutdown")
+async def close_upstream():
+    await scheduler.stop()
+    fetches = list(snapshots.inflight.values())
+    for fetch in fetches:
+        fetch.cancel()
+    await asyncio.gather(*fetches, return_exceptions=True)
+    await upstream.close()
+    nonces.close()
 
 
 @app.get("/health")
@@ -86,10 +463,42 @@ async def health_check():
     return {"status": "healthy", "service": "risk-signal-engine"}
 
 
+async def latest_snapshot(pair_id: str, tokenA: str, tokenB: str) -> dict:
+    """
+    Latest snapshot of a pair, tracking it if it is new
+
+    The first request for a pair fetches it and adds it to the scheduler;
+    later requests are answered from memory. A snapshot older than
+    RISK_ENGINE_CACHE_TTL (scheduler behind or failing) also starts a
+    background refetch, without waiting for it. A pair_id tracked with
+    other tokens is rejected with 409, and a new pair with 503 while
+    RISK_ENGINE_MAX_PAIRS requested pairs are tracked.
+    """
+    if not tokenA or not tokenB:
+        raise HTTPException(status_code=400, detail="tokenA and tokenB are required")
+
+    try:
+        tokenA, tokenB = scheduler.track(pair_id, tokenA, tokenB)
+    except PairConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RegistryFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    snapshot = snapshots.peek(tokenA, tokenB)
+    if snapshot is None:
+        snapshot = await snapshots.get(tokenA, tokenB)
+    elif time.monotonic() - snapshot["fetchedAt"] >= snapshots.ttl:
+        snapshots.load(tokenA, tokenB)
+    return snapshot
+
+
 @app.get("/risk-signal/{pair_id}")
 async def get_risk_signal(pair_id: str, tokenA: str, tokenB: str) -> RiskSignalResponse:
     """
-    Compute and return risk signal for a trading pair
+    Return the risk signal for a trading pair from its latest snapshot
+
+    A read for dashboards and alerting: the signal carries the pair's last
+    allocated nonce and no nonce is used up. Relays about to submit a
+    signal onchain POST to the same path instead.
 
     Args:
         pair_id: Keccak256 hash of sorted token addresses
@@ -99,30 +508,49 @@ async def get_risk_signal(pair_id: str, tokenA: str, tokenB: str) -> RiskSignalR
     Returns:
         RiskSignalResponse with computed signal
     """
-    if not tokenA or not tokenB:
-        raise HTTPException(status_code=400, detail="tokenA and tokenB are required")
+    snapshot = await latest_snapshot(pair_id, tokenA, tokenB)
+    nonce = await asyncio.to_thread(nonces.current, pair_id)
+    return signal_response(pair_id, snapshot, nonce)
 
-    peg_deviation = compute_peg_deviation(tokenA, tokenB)
-    bid_depth, ask_depth = compute_orderbook_depth(tokenA, tokenB)
 
-    if pair_id not in nonce_state:
-        nonce_state[pair_id] = 0
+@app.post("/risk-signal/{pair_id}")
+async def reserve_risk_signal(pair_id: str, tokenA: str, tokenB: str) -> RiskSignalResponse:
+    """
+    Return the risk signal for a trading pair with a newly allocated nonce
 
-    nonce_state[pair_id] += 1
+    Every call allocates the pair's next nonce (after catching up with
+    RiskController.oracleNonces when RISK_CONTROLLER_ADDRESS is set) and
+    a timestamp above the previous one, so each signal submitted onchain
+    has its own.
 
-    signal = OracleSignal(
-        pegDeviation=peg_deviation,
-        orderbookDepthBid=bid_depth,
-        orderbookDepthAsk=ask_depth,
-        timestamp=int(datetime.now().timestamp()),
-        nonce=nonce_state[pair_id]
-    )
+    Args:
+        pair_id: Keccak256 hash of sorted token addresses
+        tokenA: Address of first token
+        tokenB: Address of second token
 
-    return RiskSignalResponse(
-        pairId=pair_id,
-        signal=signal,
-        status="success"
-    )
+    Returns:
+        RiskSignalResponse with computed signal
+    """
+    snapshot = await latest_snapshot(pair_id, tokenA, tokenB)
+    nonce, timestamp = await reserve_nonce(pair_id)
+    return signal_response(pair_id, snapshot, nonce, timestamp)
+
+
+@app.get("/risk-signals")
+async def get_risk_signals() -> dict:
+    """Latest signal of every tracked pair with a snapshot; nonces are reported, not advanced"""
+    current = await asyncio.to_thread(nonces.all)
+    signals = []
+    for pair_id, (tokenA, tokenB) in scheduler.pairs.items():
+        snapshot = snapshots.peek(tokenA, tokenB)
+        if snapshot is not None:
+            signals.append(signal_response(pair_id, snapshot, current.get(pair_id.lower(), 0)))
+    return {
+        "count": len(signals),
+        "stale": sum(signal.stale for signal in signals),
+        "pending": len(scheduler.pairs) - len(signals),
+        "signals": signals,
+    }
 
 
 @app.get("/risk-signal/{pair_id}/current-nonce")
@@ -130,7 +558,19 @@ async def get_current_nonce(pair_id: str) -> dict:
     """Get current nonce for a pair"""
     return {
         "pairId": pair_id,
-        "nonce": nonce_state.get(pair_id, 0)
+        "nonce": await asyncio.to_thread(nonces.current, pair_id)
+    }
+
+
+@app.get("/stats")
+async def get_stats() -> dict:
+    """Upstream latency histograms per endpoint, snapshot cache and scheduler counters"""
+    return {
+        "upstream": {endpoint: histogram.snapshot() for endpoint, histogram in upstream.latency.items()},
+        "cache": {**snapshots.stats, "ttl_seconds": snapshots.ttl, "pairs": len(snapshots.entries)},
+        "scheduler": {**scheduler.stats, "interval_seconds": scheduler.interval, "tracked": len(scheduler.pairs),
+                      "configured": len(scheduler.configured), "requested": len(scheduler.requested),
+                      "max_requested": scheduler.max_pairs, "running": scheduler.task is not None},
     }
 
 
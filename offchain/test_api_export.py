@@ -0,0 +1,214 @@
+"""
+Acceptance test: /api/v1/export streams whole tables as NDJSON or CSV in flat memory
+Loads synthetic deposits into a local Postgres, runs the API under uvicorn and checks that exports
+match the database row for row (block range and vault filters, gzip), that the server's peak memory
+does not grow with the export, that exports cannot exhaust the request pool, that aborted downloads
+give their connection back, and that rows whose events were archived are still exported
+
+Usage: INDEXER_DB_URL=postgresql://localhost:5432/tempovault_test python test_api_export.py [rows]
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import psycopg2
+import requests
+from partitions import ensure_partitions
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+PORT = 18741
+API_URL = f"http://127.0.0.1:{PORT}"
+DB_URL = os.getenv("INDEXER_DB_URL", "postgresql://localhost:5432/tempovault")
+START = datetime(2025, 1, 1)
+# Far beyond float precision, so only an exact export reproduces it
+BASE_AMOUNT = 10 ** 30
+
+
+def load_deposits(conn, rows):
+    """One Deposited event per block, amounts BASE_AMOUNT + block, vaults 0-2"""
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE events, deposits, circuit_breakers RESTART IDENTITY")
+    ensure_partitions(conn, 1, rows, START, START + timedelta(seconds=rows))
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO events (block_number, block_timestamp, transaction_hash, log_index, event_type,
+                                contract_address, event_data)
+            SELECT g, %s + g * interval '1 second', '0x' || lpad(to_hex(g), 64, '0'), 0, 'Deposited',
+                   '0x' || repeat('ab', 20), '{}'
+            FROM generate_series(1, %s) g
+        """, (START, rows))
+        cur.execute("""
+            INSERT INTO deposits (event_id, vault_id, token, amount, depositor, new_balance, block_timestamp)
+            SELECT id, block_number %% 3, '0x' || repeat('cd', 20), %s::numeric + block_number,
+                   '0x' || repeat('ef', 20), 0, block_timestamp
+            FROM events
+        """, (BASE_AMOUNT,))
+    conn.commit()
+
+
+def peak_rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f"API did not start on port {port}")
+
+
+print("Testing streaming export...")
+
+server = None
+try:
+    conn = psycopg2.connect(DB_URL)
+    started = time.perf_counter()
+    load_deposits(conn, ROWS)
+    print(f"✅ Loaded {ROWS} deposits in {time.perf_counter() - started:.1f}s")
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_server:app", "--port", str(PORT), "--log-level", "warning"],
+        env={**os.environ, "INDEXER_DB_URL": DB_URL, "DB_POOL_MIN": "1", "DB_POOL_MAX": "2", "DB_POOL_TIMEOUT": "2",
+             "EXPORT_POOL_MAX": "1"},
+    )
+    wait_for_port(PORT)
+    # requests asks for gzip by default; uncompressed unless a request opts in
+    client = requests.Session()
+    client.headers["Accept-Encoding"] = "identity"
+
+    # A tenth of the table first: the baseline includes the buffers of a full-size batch
+    with client.get(f"{API_URL}/api/v1/export/deposits", params={"to_block": ROWS // 10}, stream=True) as response:
+        assert sum(1 for _ in response.iter_lines()) == ROWS // 10
+    baseline_kb = peak_rss_kb(server.pid)
+
+    # Whole table as NDJSON, streamed and checked line by line
+    started = time.perf_counter()
+    count, body_bytes, previous_block = 0, 0, 0
+    with client.get(f"{API_URL}/api/v1/export/deposits", stream=True) as response:
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "content-encoding" not in response.headers
+        for line in response.iter_lines():
+            row = json.loads(line)
+            body_bytes += len(line) + 1
+            count += 1
+            assert row["block_number"] == previous_block + 1 and row["event_id"] == row["id"]
+            assert int(row["amount"]) == BASE_AMOUNT + row["block_number"]
+            assert row["vault_id"] == row["block_number"] % 3 and row["log_index"] == 0
+            assert row["block_timestamp"] == (START + timedelta(seconds=row["block_number"])).isoformat()
+            previous_block = row["block_number"]
+    elapsed = time.perf_counter() - started
+    growth_kb = peak_rss_kb(server.pid) - baseline_kb
+    assert count == ROWS
+    assert growth_kb * 1024 < body_bytes / 20, (growth_kb, body_bytes)
+    print(f"✅ {count} rows ({body_bytes / 1e6:.0f} MB NDJSON) in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s); "
+          f"server peak memory grew {growth_kb / 1024:.1f} MB over a tenth-size export")
+
+    # CSV with block range and vault filters, against the database
+    params = {"format": "csv", "from_block": 1000, "to_block": 5000, "vault_id": 1}
+    response = client.get(f"{API_URL}/api/v1/export/deposits", params=params)
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT d.id, d.amount::text, e.block_number FROM deposits d JOIN events e ON e.id = d.event_id
+            WHERE d.vault_id = 1 AND e.block_number BETWEEN 1000 AND 5000 ORDER BY e.block_number
+        """)
+        expected = [tuple(str(v) for v in row) for row in cur.fetchall()]
+    conn.rollback()
+    assert [(row["id"], row["amount"], row["block_number"]) for row in rows] == expected
+    assert response.headers["content-disposition"] == 'attachment; filename="deposits.csv"'
+    print(f"✅ CSV export of blocks 1000-5000 for vault 1 matches the database ({len(rows)} rows)")
+
+    # gzip when asked for: same bytes once decompressed
+    params = {"from_block": 1, "to_block": 50000}
+    plain = client.get(f"{API_URL}/api/v1/export/deposits", params=params)
+    with client.get(f"{API_URL}/api/v1/export/deposits", params=params, headers={"Accept-Encoding": "gzip"},
+                    stream=True) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        compressed = response.raw.read(decode_content=False)
+    assert gzip.decompress(compressed) == plain.content
+    print(f"✅ gzip export decompresses to the plain one ({len(compressed) / 1e6:.1f} MB vs {len(plain.content) / 1e6:.1f} MB)")
+
+    # Empty range and an empty table: an empty body, or just the CSV header
+    assert client.get(f"{API_URL}/api/v1/export/deposits", params={"from_block": ROWS + 1}).content == b""
+    assert client.get(f"{API_URL}/api/v1/export/circuit_breakers", params={"format": "csv"}).text.strip() == (
+        "id,event_id,pair_id,triggered,triggered_by,block_timestamp,block_number,transaction_hash,log_index")
+
+    for params, path in [({}, "/api/v1/export/vault_totals"), ({"format": "xml"}, "/api/v1/export/deposits"),
+                         ({"vault_id": 1}, "/api/v1/export/oracle_updates"),
+                         ({"from_block": 5, "to_block": 1}, "/api/v1/export/deposits")]:
+        response = client.get(API_URL + path, params=params)
+        assert response.status_code == 400, (path, params, response.status_code)
+    print("✅ Empty exports and invalid requests handled")
+
+    # A download in progress holds the only export connection: the next export gets 503, other endpoints still work
+    with client.get(f"{API_URL}/api/v1/export/deposits", stream=True) as held:
+        # Keep the iterator: urllib3 drops the connection when an unfinished one is discarded
+        chunks = held.iter_content(65536)
+        lines = next(chunks).count(b"\n")
+        response = client.get(f"{API_URL}/api/v1/export/deposits", params={"from_block": ROWS - 99})
+        assert response.status_code == 503 and response.json()["detail"]["error"] == "export_busy"
+        for _ in range(3):
+            response = client.get(f"{API_URL}/api/v1/events/1/deposits", params={"limit": 5})
+            assert response.status_code == 200 and len(response.json()) == 5
+        assert lines + sum(chunk.count(b"\n") for chunk in chunks) == ROWS
+    print("✅ Exports beyond EXPORT_POOL_MAX get 503; the request pool stays free for other endpoints")
+
+    # Downloads abandoned mid-stream release their connection at once: more aborts than the pool holds, then an export
+    for _ in range(5):
+        with client.get(f"{API_URL}/api/v1/export/deposits", stream=True) as response:
+            assert response.status_code == 200
+            next(response.iter_content(65536))
+    response = client.get(f"{API_URL}/api/v1/export/deposits", params={"from_block": ROWS - 99})
+    assert response.status_code == 200 and len(response.text.splitlines()) == 100
+    print("✅ 5 aborted downloads with a 1-connection export pool; the next export still got a connection")
+
+    # Retention archived the first 100 blocks' events: their deposits stay, without a block number
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM events WHERE block_number <= 100")
+    conn.commit()
+    with client.get(f"{API_URL}/api/v1/export/deposits", stream=True) as response:
+        rows = [json.loads(line) for line in response.iter_lines()]
+    assert len(rows) == ROWS and [row["id"] for row in rows[:100]] == list(range(1, 101))
+    assert all(row["block_number"] is None and row["transaction_hash"] is None for row in rows[:100])
+    assert [row["block_number"] for row in rows[100:]] == list(range(101, ROWS + 1))
+    for params in ({"to_block": 500}, {"from_block": 50}, {"from_block": 50, "vault_id": 2}):
+        response = client.get(f"{API_URL}/api/v1/export/deposits", params=params)
+        assert response.status_code == 409, (params, response.status_code)
+        assert response.json()["detail"]["details"] == {"first_retained_block": 101}
+    response = client.get(f"{API_URL}/api/v1/export/deposits", params={"from_block": 101, "to_block": 200})
+    assert response.status_code == 200 and len(response.text.splitlines()) == 100
+    print("✅ Rows of archived events exported without a block number; block ranges reaching them rejected (409)")
+
+    client.close()
+    conn.close()
+    print("\n✅ Streaming export test PASSED")
+    exit_code = 0
+
+except Exception as e:
+    print(f"\n❌ Streaming export test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    exit_code = 1
+
+finally:
+    if server is not None:
+        server.terminate()
+        server.wait()
+
+sys.exit(exit_code)
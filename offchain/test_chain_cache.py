@@ -0,0 +1,163 @@
+"""
+Acceptance test: block-keyed chain read cache
+100 concurrent dashboard requests for one vault cost a single batch of eth_calls; a new head invalidates
+
+Usage: python test_chain_cache.py
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from web3 import Web3
+from chain_cache import BlockCache
+
+VAULT_ADDRESS = "0x599967eDC2dc6F692CA37c09693eDD7DDfe8c66D"
+TOKENS = [Web3.to_checksum_address(f"0x20c0{i:036x}") for i in range(1, 11)]
+
+
+class FakeEth:
+    def __init__(self):
+        self.block_number = 100
+
+
+class SlowEth:
+    """eth_blockNumber that takes a while, so requesters pile up on one head poll"""
+
+    def __init__(self, block_number, delay=0.2):
+        self.number = block_number
+        self.delay = delay
+        self.polls = 0
+
+    @property
+    def block_number(self):
+        self.polls += 1
+        time.sleep(self.delay)
+        return self.number
+
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+
+class CountingReader:
+    """Stands in for OnchainReader: records each batch and returns deterministic values"""
+
+    def __init__(self, delay=0.05):
+        self.batches = []
+        self.delay = delay
+        self.fail = False
+        self.lock = threading.Lock()
+
+    def read(self, calls, block_number):
+        with self.lock:
+            self.batches.append(len(calls))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("rpc unavailable")
+        return block_number, [(block_number, fn.fn_name, fn.args[0]) for fn in calls]
+
+
+def dashboard_calls(vault, tokens=TOKENS):
+    calls = []
+    for token in tokens:
+        calls += [
+            vault.functions.tokenBalances(token),
+            vault.functions.deployedCapital(token),
+            vault.functions.accruedPerformanceFees(token),
+            vault.functions.accruedManagementFees(token),
+        ]
+    return calls
+
+
+async def main():
+    with open("../out/TreasuryVault.sol/TreasuryVault.json") as f:
+        vault = Web3().eth.contract(address=VAULT_ADDRESS, abi=json.load(f)["abi"])
+
+    w3 = FakeWeb3()
+    reader = CountingReader()
+    cache = BlockCache(w3, reader, max_entries=100, head_ttl=0)
+    calls = dashboard_calls(vault)
+
+    # 100 concurrent requests for the same vault -> one batch of 40 calls
+    results = await asyncio.gather(*(cache.read(dashboard_calls(vault)) for _ in range(100)))
+    assert reader.batches == [len(calls)], f"expected one batch, got {reader.batches}"
+    assert all(r == results[0] for r in results)
+    assert results[0][0] == 100 and results[0][1][0] == (100, "tokenBalances", TOKENS[0])
+    print(f"✅ 100 concurrent requests -> {len(reader.batches)} batch of {reader.batches[0]} eth_calls")
+
+    # Same head: served from memory
+    await cache.read(calls)
+    assert len(reader.batches) == 1
+    assert cache.status()["hits"] == len(calls)
+    print("✅ Repeat request on the same head is a cache hit")
+
+    # New head: old entries are dropped and reloaded once at the new block
+    w3.eth.block_number = 101
+    block_number, values = await cache.read(calls)
+    assert block_number == 101 and values[0] == (101, "tokenBalances", TOKENS[0])
+    assert reader.batches == [len(calls), len(calls)]
+    assert cache.status()["size"] == len(calls), "entries for the old head were kept"
+    print("✅ New head invalidates and reloads")
+
+    # Bounded memory: LRU eviction past max_entries
+    more = dashboard_calls(vault, [Web3.to_checksum_address(f"0x30c0{i:036x}") for i in range(20)])
+    await cache.read(more)
+    status = cache.status()
+    assert status["size"] == 100 and status["evictions"] == len(calls) + len(more) - 100
+    await cache.read(more[-4:])
+    assert len(reader.batches) == 3, "most recently used entries were evicted"
+    print(f"✅ LRU bound holds at {status['size']} entries ({status['evictions']} evictions)")
+
+    # Failures reach every coalesced waiter and are not cached
+    w3.eth.block_number = 102
+    reader.fail = True
+    outcomes = await asyncio.gather(*(cache.read(calls) for _ in range(10)), return_exceptions=True)
+    assert all(isinstance(o, RuntimeError) for o in outcomes) and cache.status()["inflight"] == 0
+    reader.fail = False
+    _, values = await cache.read(calls)
+    assert values[0] == (102, "tokenBalances", TOKENS[0])
+    print("✅ Failed load propagates to all waiters and is retried")
+
+    # A cancelled requester does not strand the others sharing its load
+    w3.eth.block_number = 103
+    first = asyncio.ensure_future(cache.read(calls))
+    await asyncio.sleep(0.01)
+    second = asyncio.ensure_future(cache.read(calls))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    block_number, values = await asyncio.wait_for(second, timeout=2)
+    assert block_number == 103 and values[0] == (103, "tokenBalances", TOKENS[0])
+    print("✅ Cancelled requester does not affect coalesced waiters")
+
+    # A requester cancelled while the head poll is in flight does not cancel it for the others
+    w3.eth = SlowEth(104)
+    first = asyncio.ensure_future(cache.head())
+    await asyncio.sleep(0.01)
+    second = asyncio.ensure_future(cache.head())
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await asyncio.wait_for(second, timeout=2) == 104 and w3.eth.polls == 1
+    print("✅ Cancelled requester does not cancel the shared head poll")
+
+    print(f"Cache stats: {cache.status()}")
+
+
+print("Testing block-keyed chain read cache...")
+
+try:
+    asyncio.run(main())
+    print("\n✅ Chain cache test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ Chain cache test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
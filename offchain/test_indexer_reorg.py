@@ -0,0 +1,119 @@
+"""
+Acceptance test: the indexer detects a reorg, rolls back orphaned rows and re-follows the new chain
+Uses anvil's evm_snapshot/evm_revert to replace the tip of the chain with different blocks
+
+Usage:
+    anvil &
+    INDEXER_DB_URL=postgresql://localhost:5432/tempovault_test python test_indexer_reorg.py
+"""
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("REORG_WINDOW", "16")
+
+TABLES = ["events", "deposits", "indexed_blocks", "vault_totals"]
+
+
+def rpc(w3, method, params=None):
+    response = w3.provider.make_request(method, params or [])
+    if "error" in response:
+        raise RuntimeError(f"{method}: {response['error']}")
+    return response["result"]
+
+
+def mine(w3, count, timestamp_offset=0):
+    for _ in range(count):
+        latest = w3.eth.get_block("latest")
+        rpc(w3, "evm_setNextBlockTimestamp", [latest["timestamp"] + 1 + timestamp_offset])
+        rpc(w3, "evm_mine")
+    return w3.eth.block_number
+
+
+def synthetic_deposit(block_number, timestamp):
+    """A decoded Deposited event as decode_log would produce it"""
+    return {
+        "block_number": block_number,
+        "block_timestamp": timestamp,
+        "transaction_hash": "0x" + f"{block_number:064x}",
+        "log_index": 0,
+        "contract_address": "0x599967eDC2dc6F692CA37c09693eDD7DDfe8c66D",
+        "event_type": "Deposited",
+        "decoded_data": {
+            "vaultId": 1,
+            "token": "0x20C0000000000000000000000000000000000001",
+            "amount": 1000 * block_number,
+            "depositor": "0x70997970C51812dc3A010C7d01b50e0d17dc79C8",
+            "newBalance": 1000 * block_number,
+        },
+    }
+
+
+def count_rows(conn, table, above):
+    column = "block_number" if table != "deposits" else "(SELECT block_number FROM events WHERE id = event_id)"
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} > %s", (above,))
+        return cur.fetchone()[0]
+
+
+print("Testing indexer reorg handling against anvil...")
+
+try:
+    import event_indexer
+    w3 = event_indexer.w3
+    conn = event_indexer.get_db_connection()
+
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        cur.execute("UPDATE indexer_state SET last_indexed_block = 0 WHERE id = 1")
+    conn.commit()
+
+    # Canonical chain: index up to head with a deposit in every block above the future fork point
+    fork_point = mine(w3, 3)
+    snapshot_id = rpc(w3, "evm_snapshot")
+    head = mine(w3, 4)
+
+    event_indexer.index_range(conn, fork_point - 2, head, head)
+    events = [synthetic_deposit(n, w3.eth.get_block(n)["timestamp"]) for n in range(fork_point - 1, head + 1)]
+    event_indexer.write_events_batch(conn, events)
+    conn.commit()
+
+    assert event_indexer.get_last_indexed_block(conn) == head
+    assert event_indexer.find_fork_point(conn, head) is None, "fork detected on an unchanged chain"
+    print(f"✅ Indexed blocks {fork_point - 2}-{head}, no reorg detected on the canonical chain")
+
+    # Replace everything above fork_point with a longer, different branch
+    rpc(w3, "evm_revert", [snapshot_id])
+    new_head = mine(w3, 6, timestamp_offset=7)
+
+    found = event_indexer.find_fork_point(conn, head)
+    assert found == fork_point, f"expected fork point {fork_point}, got {found}"
+    print(f"✅ Fork point found at block {found}")
+
+    resume_from = event_indexer.check_reorg(conn, head)
+    assert resume_from == fork_point
+    assert event_indexer.get_last_indexed_block(conn) == fork_point
+    for table in TABLES[:3]:
+        assert count_rows(conn, table, fork_point) == 0, f"{table} still has rows above the fork point"
+    assert count_rows(conn, "deposits", fork_point - 2) == 2, "rows at or below the fork point were removed"
+    with conn.cursor() as cur:
+        cur.execute("SELECT total_deposited FROM vault_totals")
+        assert cur.fetchone()[0] == 1000 * ((fork_point - 1) + fork_point), "vault_totals not rolled back"
+    print("✅ Rows above the fork point rolled back, rows below kept")
+
+    # Re-follow the new branch
+    event_indexer.index_range(conn, fork_point + 1, new_head, new_head)
+    assert event_indexer.get_last_indexed_block(conn) == new_head
+    assert event_indexer.find_fork_point(conn, new_head) is None
+    print(f"✅ Re-indexed the new branch up to block {new_head}")
+
+    conn.close()
+    print("\n✅ Indexer reorg test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ Indexer reorg test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,144 @@
+"""
+Acceptance test: NonceManager keeps several transactions pending, resyncs on gaps and conflicts,
+replaces or cancels stuck transactions, and picks up where a restarted process left off
+Runs against anvil with automine turned off, so transactions stay in the mempool until the test mines
+
+Usage:
+    anvil &
+    python test_nonce_manager.py
+"""
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+from nonce_manager import NonceManager
+
+RPC_URL = os.getenv("RPC_URL", "http://localhost:8545")
+# Anvil's first dev account sends; the second receives
+ACCOUNT = Account.from_key("0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+RECIPIENT = "0x70997970C51812dc3A010C7d01b50e0d17dc79C8"
+
+
+def rpc(w3, method, params):
+    response = w3.provider.make_request(method, params)
+    if "error" in response:
+        raise RuntimeError(f"{method}: {response['error']}")
+    return response["result"]
+
+
+def transfer(w3, value):
+    return {"to": RECIPIENT, "value": value, "gas": 21000, "gasPrice": w3.eth.gas_price, "chainId": w3.eth.chain_id}
+
+
+def mine(w3):
+    rpc(w3, "evm_mine", [])
+
+
+def mined_nonces(w3, hashes):
+    return [w3.eth.get_transaction(h)["nonce"] for h in hashes if w3.eth.get_transaction_receipt(h)["status"] == 1]
+
+
+def is_mined(w3, tx_hash):
+    try:
+        return w3.eth.get_transaction_receipt(tx_hash) is not None
+    except TransactionNotFound:
+        return False
+
+
+print("Testing transaction nonce manager...")
+
+w3 = Web3(Web3.HTTPProvider(RPC_URL))
+
+try:
+    rpc(w3, "evm_setAutomine", [False])
+    mine(w3)  # anything an earlier run left pending
+    count = lambda tag: w3.eth.get_transaction_count(ACCOUNT.address, tag)
+
+    # Several transactions pending at once, nonces assigned locally
+    manager = NonceManager(w3, ACCOUNT)
+    start = count("latest")
+    hashes = [manager.send(transfer(w3, i + 1)) for i in range(5)]
+    assert count("latest") == start and count("pending") == start + 5
+    assert all(manager.receipt(h) is None for h in hashes)
+    mine(w3)
+    assert mined_nonces(w3, hashes) == list(range(start, start + 5))
+    assert all(manager.receipt(h)["status"] == 1 for h in hashes) and manager.pending == {}
+    print("✅ 5 transactions were pending at once and mined in one block with consecutive nonces")
+
+    # Two managers sharing the key: the stale one collides, resyncs and moves past the other's nonces
+    first, second = NonceManager(w3, ACCOUNT), NonceManager(w3, ACCOUNT)
+    shared = [first.send(transfer(w3, 1)), second.send(transfer(w3, 2))]
+    shared += [first.send(transfer(w3, 3)), second.send(transfer(w3, 4)), first.send(transfer(w3, 5))]
+    mine(w3)
+    nonces = mined_nonces(w3, shared)
+    assert sorted(nonces) == list(range(start + 5, start + 10)), nonces
+    print("✅ Two managers on one key resynced on collisions; all 5 transactions mined with distinct nonces")
+
+    # Speed-up: the replacement has bumped fees, and the original hash resolves to its receipt
+    original = manager.send(transfer(w3, 7))
+    nonce, gas_price = w3.eth.get_transaction(original)["nonce"], w3.eth.get_transaction(original)["gasPrice"]
+    faster = manager.replace(nonce)
+    assert faster != original
+    assert w3.eth.get_transaction(faster)["gasPrice"] >= gas_price * 110 // 100
+    mine(w3)
+    assert not is_mined(w3, original) and manager.receipt(original)["transactionHash"] == faster
+
+    # Cancel: a 0-value self-transfer takes the nonce instead
+    balance = w3.eth.get_balance(RECIPIENT)
+    doomed = manager.send(transfer(w3, 10 ** 18))
+    cancellation = manager.cancel(w3.eth.get_transaction(doomed)["nonce"])
+    mine(w3)
+    cancelled = w3.eth.get_transaction(cancellation)
+    assert cancelled["to"] == ACCOUNT.address and cancelled["value"] == 0 and is_mined(w3, cancellation)
+    assert w3.eth.get_balance(RECIPIENT) == balance
+    print("✅ Stuck transactions were replaced (bumped fees) or cancelled at the same nonce")
+
+    # A transaction dropped by the node is rebroadcast; a gap nobody tracks is filled with a no-op
+    hashes = [manager.send(transfer(w3, 1)) for _ in range(3)]
+    rpc(w3, "anvil_dropTransaction", [Web3.to_hex(hashes[1])])
+    assert count("pending") == count("latest") + 1
+    manager.sync()
+    mine(w3)
+    assert all(is_mined(w3, h) for h in hashes)
+
+    hashes = [manager.send(transfer(w3, 1)) for _ in range(3)]
+    gap = w3.eth.get_transaction(hashes[0])["nonce"]
+    rpc(w3, "anvil_dropTransaction", [Web3.to_hex(hashes[0])])
+    manager._forget(gap)
+    manager.sync()
+    mine(w3)
+    assert not is_mined(w3, hashes[0]) and all(is_mined(w3, h) for h in hashes[1:])
+    assert count("latest") == gap + 3
+    print("✅ Dropped transactions were rebroadcast and an untracked nonce gap was filled")
+
+    # Restart: a new manager continues after the old one's pending transactions and can replace them
+    before_restart = [manager.send(transfer(w3, 1)) for _ in range(2)]
+    restarted = NonceManager(w3, ACCOUNT)
+    after_restart = restarted.send(transfer(w3, 1))
+    assert w3.eth.get_transaction(after_restart)["nonce"] == w3.eth.get_transaction(before_restart[-1])["nonce"] + 1
+    assert sorted(restarted.pending) == [w3.eth.get_transaction(h)["nonce"] for h in before_restart + [after_restart]]
+    replaced = restarted.replace_stuck(max_age=0)
+    assert len(replaced) == 3
+    mine(w3)
+    assert all(restarted.receipt(h)["status"] == 1 for h in before_restart + [after_restart])
+    assert count("pending") == count("latest") and restarted.pending == {}
+    print("✅ After a restart the manager adopted the pending transactions from the txpool and replaced them")
+
+    print("\n✅ Nonce manager test PASSED")
+    exit_code = 0
+
+except Exception as e:
+    print(f"\n❌ Nonce manager test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    exit_code = 1
+
+finally:
+    rpc(w3, "evm_setAutomine", [True])
+
+sys.exit(exit_code)
@@ -0,0 +1,130 @@
+"""
+Acceptance test: nonce_store hands out unique nonces across processes
+Several processes allocate from the same SQLite file at once (as uvicorn workers would) while another
+raises the counters the way a RiskController sync does; every nonce must be handed out exactly once,
+stay above every synced value, and survive reopening the store
+
+Usage: python test_nonce_store.py [processes] [allocations_per_process]
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from nonce_store import NonceStore
+
+PAIRS = ["0xPAIR1", "0xpair2", "0xpair3"]
+SYNC_STEP = 1000
+SYNC_ROUNDS = 20
+
+
+def allocate(path, worker, count, results):
+    store = NonceStore(path)
+    allocated = [(PAIRS[(worker + i) % len(PAIRS)], store.allocate(PAIRS[(worker + i) % len(PAIRS)]))
+                 for i in range(count)]
+    store.close()
+    results.put(allocated)
+
+
+def sync(path, rounds, results):
+    """Raise pair 3's counter by SYNC_STEP above its current value, like an onchain nonce running ahead"""
+    store = NonceStore(path)
+    floors = []
+    for _ in range(rounds):
+        floor = store.current(PAIRS[2]) + SYNC_STEP
+        store.advance(PAIRS[2], floor)
+        floors.append(floor)
+        time.sleep(0.01)
+    store.close()
+    results.put([("sync", floor) for floor in floors])
+
+
+# Spawned workers re-import this module, so the test itself only runs in the parent
+if __name__ == "__main__":
+    print("Testing nonce store...")
+
+    try:
+        processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+        per_process = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+        path = os.path.join(tempfile.mkdtemp(), "nonces.db")
+
+        store = NonceStore(path)
+        assert store.current(PAIRS[0]) == 0 and store.allocate(PAIRS[0]) == 1 and store.current("0xpair1") == 1
+        assert store.advance(PAIRS[1], 10) == 10 and store.advance(PAIRS[1], 5) == 10 and store.allocate(PAIRS[1]) == 11
+        # issue() shares the counter; timestamps stay strictly increasing within one second and after a stall
+        assert store.issue(PAIRS[1], 1000) == (12, 1000) and store.issue(PAIRS[1], 1000) == (13, 1001)
+        assert store.issue(PAIRS[1], 999) == (14, 1002) and store.issue(PAIRS[1], 2000) == (15, 2000)
+        store.close()
+        print("✅ Pair ids are case-insensitive; advance() never lowers a counter; issue() timestamps increase")
+
+        # A counter file from before issue() gains the timestamp column and keeps its nonces
+        legacy_path = os.path.join(tempfile.mkdtemp(), "nonces.db")
+        legacy = sqlite3.connect(legacy_path)
+        legacy.execute("CREATE TABLE nonces (pair_id TEXT PRIMARY KEY, nonce INTEGER NOT NULL)")
+        legacy.execute("INSERT INTO nonces VALUES ('0xpair1', 41)")
+        legacy.commit()
+        legacy.close()
+        store = NonceStore(legacy_path)
+        assert store.issue(PAIRS[0], 1000) == (42, 1000) and store.allocate(PAIRS[0]) == 43
+        store.close()
+        print("✅ Counter files without issued_at are upgraded in place")
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        workers = [context.Process(target=allocate, args=(path, worker, per_process, results)) for worker in range(processes)]
+        workers.append(context.Process(target=sync, args=(path, SYNC_ROUNDS, results)))
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        collected = [results.get(timeout=120) for _ in workers]
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0, worker.exitcode
+        elapsed = time.perf_counter() - started
+
+        allocated = {pair.lower(): [] for pair in PAIRS}
+        for batch in collected:
+            for pair, nonce in batch:
+                if pair != "sync":
+                    allocated[pair.lower()].append(nonce)
+        total = sum(len(values) for values in allocated.values())
+        assert total == processes * per_process
+        for pair, values in allocated.items():
+            assert len(values) == len(set(values)), f"{pair}: duplicate nonces"
+        # Pairs 1 and 2 are only allocated: their nonces are exactly the next ones after the setup
+        assert sorted(allocated["0xpair1"]) == list(range(2, 2 + len(allocated["0xpair1"])))
+        assert sorted(allocated["0xpair2"]) == list(range(16, 16 + len(allocated["0xpair2"])))
+        print(f"✅ {total} nonces from {processes} processes in {elapsed:.1f}s ({total / elapsed:,.0f}/s), "
+              f"all unique and gap-free per pair")
+
+        # Pair 3 was synced concurrently: unique, increasing in each process, and gaps only from the syncs
+        pair3 = sorted(allocated["0xpair3"])
+        gaps = [b - a - 1 for a, b in zip(pair3, pair3[1:]) if b - a > 1]
+        assert len(gaps) <= SYNC_ROUNDS and sum(gaps) <= SYNC_ROUNDS * SYNC_STEP, gaps
+        for batch in collected:
+            own = [nonce for pair, nonce in batch if pair == PAIRS[2]]
+            assert own == sorted(own)
+        print(f"✅ {len(pair3)} nonces of the synced pair unique and increasing per process; {len(gaps)} gaps, "
+              f"all left by syncs; highest {pair3[-1]}")
+
+        store = NonceStore(path)
+        counters = store.all()
+        assert counters["0xpair1"] == max(allocated["0xpair1"]) and counters["0xpair2"] == max(allocated["0xpair2"])
+        assert counters["0xpair3"] >= pair3[-1]
+        assert store.allocate(PAIRS[0]) == counters["0xpair1"] + 1
+        store.close()
+        print(f"✅ Counters survived reopening the store: {counters}")
+
+        print("\n✅ Nonce store test PASSED")
+        sys.exit(0)
+
+    except Exception as e:
+        print(f"\n❌ Nonce store test FAILED")
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
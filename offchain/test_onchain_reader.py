@@ -0,0 +1,134 @@
+"""
+Acceptance test: batched on-chain reads return the same values as individual eth_calls, pinned to one block
+Installs Multicall3 (src/utils/Multicall3.sol) at its canonical address with anvil_setCode
+
+Usage:
+    forge build && anvil &
+    python test_onchain_reader.py
+"""
+import json
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from web3 import Web3
+from onchain_reader import OnchainReader, MULTICALL3_ADDRESS
+
+RPC_URL = os.getenv("RPC_URL", "http://localhost:8545")
+TOKENS = [Web3.to_checksum_address(f"0x20c0{i:036x}") for i in range(1, 4)]
+PAIRS = [Web3.keccak(text=f"pair-{i}") for i in range(2)]
+
+
+def rpc(w3, method, params):
+    response = w3.provider.make_request(method, params)
+    if "error" in response:
+        raise RuntimeError(f"{method}: {response['error']}")
+    return response["result"]
+
+
+def load_artifact(name):
+    with open(f"../out/{name}.sol/{name}.json") as f:
+        return json.load(f)
+
+
+def mapping_slot(key, base_slot):
+    return Web3.keccak(bytes(32 - len(key)) + key + base_slot.to_bytes(32, "big"))
+
+
+def find_mapping_slot(w3, getter, key):
+    """Storage slot index of a public mapping, found by writing a marker and reading it back"""
+    marker = "0x" + (0xC0FFEE).to_bytes(32, "big").hex()
+    for base_slot in range(64):
+        slot = Web3.to_hex(mapping_slot(key, base_slot))
+        rpc(w3, "anvil_setStorageAt", [getter.address, slot, marker])
+        found = getter(key).call() == 0xC0FFEE
+        rpc(w3, "anvil_setStorageAt", [getter.address, slot, "0x" + "00" * 32])
+        if found:
+            return base_slot
+    raise RuntimeError(f"storage slot for {getter.fn_name} not found")
+
+
+def set_mapping(w3, contract, base_slot, key, value):
+    slot = Web3.to_hex(mapping_slot(key, base_slot))
+    rpc(w3, "anvil_setStorageAt", [contract.address, slot, "0x" + value.to_bytes(32, "big").hex()])
+
+
+def vault_calls(vault):
+    calls = []
+    for token in TOKENS:
+        calls += [
+            vault.functions.tokenBalances(token),
+            vault.functions.deployedCapital(token),
+            vault.functions.accruedPerformanceFees(token),
+            vault.functions.accruedManagementFees(token),
+        ]
+    calls += [vault.functions.pairExposure(pair) for pair in PAIRS]
+    return calls + [vault.functions.vaultId(), vault.functions.owner()]
+
+
+print("Testing batched on-chain reads against anvil...")
+
+try:
+    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    account = w3.eth.accounts[0]
+
+    multicall_artifact = load_artifact("Multicall3")
+    rpc(w3, "anvil_setCode", [MULTICALL3_ADDRESS, multicall_artifact["deployedBytecode"]["object"]])
+
+    vault_artifact = load_artifact("TreasuryVault")
+    factory = w3.eth.contract(abi=vault_artifact["abi"], bytecode=vault_artifact["bytecode"]["object"])
+    receipt = w3.eth.wait_for_transaction_receipt(
+        factory.constructor(7, account, account, account).transact({"from": account})
+    )
+    vault = w3.eth.contract(address=receipt.contractAddress, abi=vault_artifact["abi"])
+    print(f"✅ Multicall3 installed, TreasuryVault deployed at {vault.address}")
+
+    # Give every (mapping, key) a distinct value, in two successive blocks
+    token_key = lambda token: bytes.fromhex(token[2:])
+    mappings = {
+        name: find_mapping_slot(w3, getattr(vault.functions, name), token_key(TOKENS[0]))
+        for name in ("tokenBalances", "deployedCapital", "accruedPerformanceFees", "accruedManagementFees")
+    }
+    exposure_slot = find_mapping_slot(w3, vault.functions.pairExposure, PAIRS[0])
+
+    def write_state(offset):
+        for m, (name, base_slot) in enumerate(mappings.items()):
+            for t, token in enumerate(TOKENS):
+                set_mapping(w3, vault, base_slot, token_key(token), offset + 100 * m + t + 1)
+        for p, pair in enumerate(PAIRS):
+            set_mapping(w3, vault, exposure_slot, pair, offset + 1000 + p)
+        rpc(w3, "evm_mine", [])
+        return w3.eth.block_number
+
+    first_block = write_state(10 ** 18)
+    second_block = write_state(2 * 10 ** 18)
+
+    calls = vault_calls(vault)
+    multicall_reader = OnchainReader(w3)
+    batch_reader = OnchainReader(w3, multicall_address="0x000000000000000000000000000000000000dEaD")
+    assert multicall_reader.mode() == "multicall" and batch_reader.mode() == "batch"
+
+    for block in (first_block, second_block):
+        expected = [fn.call(block_identifier=block) for fn in calls]
+        for reader in (multicall_reader, batch_reader):
+            read_block, values = reader.read(calls, block)
+            assert read_block == block
+            assert values == expected, f"{reader.mode()} read at block {block} differs from eth_call"
+        print(f"✅ {len(calls)} reads at block {block} match individual eth_calls (multicall and batch)")
+
+    # Default block is the head, resolved once for every call
+    read_block, values = multicall_reader.read(calls)
+    assert read_block == second_block and values == [fn.call(block_identifier=second_block) for fn in calls]
+    assert values[0] == 2 * 10 ** 18 + 1 and values[-2] == 7 and values[-1] == account
+    print("✅ Head read is pinned to a single block")
+
+    print("\n✅ On-chain reader test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ On-chain reader test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,254 @@
+"""
+Acceptance test: the incrementally maintained orderbook matches a brute-force recompute from the open orders
+Replays a synthetic OrderPlaced / OrderCancelled / OrderFilled stream for two base tokens (one tracked),
+checking best ticks, depth within N ticks and the volume-weighted mid after every event, then runs the
+same stream as raw logs through OrderbookTracker.sync with a simulated node
+
+Usage: python test_orderbook.py
+"""
+import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+# Rescans in this test come only from unknown orders
+os.environ["ORDERBOOK_RESYNC_BLOCKS"] = "0"
+
+from eth_abi import encode
+from web3 import Web3
+import orderbook
+from orderbook import OrderBook, OrderbookTracker
+
+EVENTS = 10000
+DEPTH_WINDOWS = (0, 10, 50, 200, 5000)
+TRACKED = Web3.to_checksum_address("0x20c0000000000000000000000000000000000001")
+OTHER = Web3.to_checksum_address("0x20c0000000000000000000000000000000000002")
+
+
+def synthetic_events(count, seed=7):
+    """Random but valid event stream: bids below and asks above a drifting mid, fills and cancels of open orders"""
+    rng = random.Random(seed)
+    open_orders = {}
+    next_id, mid = 1, 0
+    events = []
+    for _ in range(count):
+        mid = max(-1500, min(1500, mid + rng.choice((-10, 0, 10))))
+        roll = rng.random()
+        if roll < 0.5 or not open_orders:
+            is_bid = rng.random() < 0.5
+            tick = mid - 10 * rng.randint(1, 40) if is_bid else mid + 10 * rng.randint(1, 40)
+            amount = rng.randint(1, 10 ** 6) * 10 ** 12
+            base = TRACKED if rng.random() < 0.7 else OTHER
+            open_orders[next_id] = amount
+            events.append(("OrderPlaced", {"orderId": next_id, "maker": OTHER, "token": base, "amount": amount,
+                                           "isBid": is_bid, "tick": tick, "isFlipOrder": False, "flipTick": 0}))
+            next_id += 1
+        elif roll < 0.7:
+            order_id = rng.choice(list(open_orders))
+            del open_orders[order_id]
+            events.append(("OrderCancelled", {"orderId": order_id}))
+        else:
+            order_id = rng.choice(list(open_orders))
+            filled = rng.randint(1, open_orders[order_id])
+            open_orders[order_id] -= filled
+            partial = open_orders[order_id] > 0
+            if not partial:
+                del open_orders[order_id]
+            events.append(("OrderFilled", {"orderId": order_id, "maker": OTHER, "taker": TRACKED,
+                                           "amountFilled": filled, "partialFill": partial}))
+    return events
+
+
+class BruteForceBook:
+    """Open orders only; every query recomputes the levels from scratch"""
+
+    def __init__(self):
+        self.orders = {}
+
+    def apply(self, name, args):
+        if name == "OrderPlaced":
+            self.orders[args["orderId"]] = [args["token"], args["isBid"], args["tick"], args["amount"]]
+        elif name == "OrderCancelled":
+            del self.orders[args["orderId"]]
+        else:
+            self.orders[args["orderId"]][3] -= args["amountFilled"]
+            if self.orders[args["orderId"]][3] == 0:
+                del self.orders[args["orderId"]]
+
+    def levels(self, base):
+        levels = {True: {}, False: {}}
+        for order_base, is_bid, tick, remaining in self.orders.values():
+            if order_base == base:
+                levels[is_bid][tick] = levels[is_bid].get(tick, 0) + remaining
+        return levels
+
+    def summary(self, base):
+        levels = self.levels(base)
+        best_bid = max(levels[True], default=None)
+        best_ask = min(levels[False], default=None)
+        if best_bid is not None and best_ask is not None:
+            reference = (best_bid + best_ask) // 2
+        else:
+            reference = best_bid if best_bid is not None else best_ask
+        result = {"best": (best_bid, best_ask)}
+        for window in DEPTH_WINDOWS:
+            inside = {side: {t: l for t, l in levels[side].items() if reference is not None
+                             and abs(t - reference) <= window} for side in (True, False)}
+            total = sum(inside[True].values()) + sum(inside[False].values())
+            weighted = sum(t * l for side in (True, False) for t, l in inside[side].items())
+            result[window] = (sum(inside[True].values()), sum(inside[False].values()),
+                              weighted / total if total else None)
+        return result
+
+
+def summary(book):
+    result = {"best": (book.best_bid(), book.best_ask())}
+    for window in DEPTH_WINDOWS:
+        result[window] = (*book.depth(window), book.vwap_mid(window))
+    return result
+
+
+def raw_log(tracker, block, name, args):
+    """The log the DEX would emit for a decoded event"""
+    event_abi = next(e for e in tracker.dex.abi if e.get("type") == "event" and e["name"] == name)
+    topics = [Web3.keccak(text=f"{name}({','.join(i['type'] for i in event_abi['inputs'])})")]
+    data_types, data_values = [], []
+    for abi_input in event_abi["inputs"]:
+        if abi_input["indexed"]:
+            topics.append(encode([abi_input["type"]], [args[abi_input["name"]]]))
+        else:
+            data_types.append(abi_input["type"])
+            data_values.append(args[abi_input["name"]])
+    return {"address": tracker.dex.address, "blockNumber": block, "topics": topics, "data": encode(data_types, data_values)}
+
+
+print("Testing orderbook reconstruction...")
+
+try:
+    events = synthetic_events(EVENTS)
+
+    # Incremental book vs brute-force recompute after every event
+    tracker = OrderbookTracker(Web3(Web3.HTTPProvider("http://localhost:1")))
+    tracker.books[TRACKED] = OrderBook()
+    brute = BruteForceBook()
+    incremental_seconds = brute_seconds = 0.0
+    for index, (name, args) in enumerate(events):
+        assert tracker.apply(name, args)
+        brute.apply(name, args)
+        started = time.perf_counter()
+        got = summary(tracker.book(TRACKED))
+        incremental_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        expected = brute.summary(TRACKED)
+        brute_seconds += time.perf_counter() - started
+        assert got == expected, (index, name, args, got, expected)
+    assert tracker.orders.keys() == brute.orders.keys()
+    book = tracker.book(TRACKED)
+    print(f"✅ {EVENTS} events replayed; best ticks, depth within {DEPTH_WINDOWS} ticks and vwap mid matched "
+          f"the brute-force recompute after every event")
+    print(f"✅ Final book: {len(book.ticks[True])} bid / {len(book.ticks[False])} ask levels, "
+          f"{len(tracker.orders)} open orders; queries {incremental_seconds / EVENTS * 1e6:.0f}µs incremental "
+          f"vs {brute_seconds / EVENTS * 1e6:.0f}µs brute force per event")
+
+    # Same stream as raw logs through sync(): orders placed before the history window are unknown,
+    # so their first fill or cancel rescans; otherwise the book is maintained from logs alone
+    logs = [raw_log(tracker, 1 + index // 10, name, args) for index, (name, args) in enumerate(events)]
+    head = {"block": 0}
+
+    class SimulatedNode:
+        @property
+        def block_number(self):
+            return head["block"]
+
+        def get_logs(self, log_filter):
+            return [log for log in logs if log_filter["fromBlock"] <= log["blockNumber"] <= log_filter["toBlock"]]
+
+    synced = OrderbookTracker(Web3(Web3.HTTPProvider("http://localhost:1")))
+    synced.w3 = SimpleNamespace(eth=SimulatedNode())
+
+    def scan(target, bases, block):
+        """What getTickLevel would return at block: the brute-force levels of every order up to it"""
+        truth = BruteForceBook()
+        for log_index, (name, args) in enumerate(events):
+            if 1 + log_index // 10 <= block:
+                truth.apply(name, args)
+        for base in bases:
+            target.books[base] = OrderBook()
+            for is_bid, levels in truth.levels(base).items():
+                for tick, liquidity in levels.items():
+                    target.books[base].set_level(is_bid, tick, liquidity)
+        target.last_scan = block
+        target.counts["rescans"] += 1
+
+    synced.scan = lambda bases, block: scan(synced, bases, block)
+    # Seeded at block 300 with only ORDERBOOK_HISTORY_BLOCKS (100) of history: older orders are unknown
+    orderbook.ORDERBOOK_HISTORY_BLOCKS = 100
+    head["block"] = 300
+    synced.seed([TRACKED], 300)
+    truth = BruteForceBook()
+    for name, args in events[:300 * 10]:
+        truth.apply(name, args)
+    assert summary(synced.book(TRACKED)) == truth.summary(TRACKED)
+
+    for block in range(307, EVENTS // 10 + 1, 7):
+        head["block"] = block
+        synced.sync()
+        for name, args in events[(block - 7) * 10:block * 10]:
+            truth.apply(name, args)
+        assert summary(synced.book(TRACKED)) == truth.summary(TRACKED), block
+    assert synced.counts["unknown orders"] > 0 and synced.counts["rescans"] > 1
+    print(f"✅ sync() over raw logs matched the node's book at every head; "
+          f"{synced.counts['unknown orders']} fills/cancels of pre-history orders triggered "
+          f"{synced.counts['rescans'] - 1} rescans")
+
+    # depth() from many threads while the head moves (as relay_service's workers call it): every
+    # figure is the node's depth at one head, never a read torn by a concurrent sync
+    truth = BruteForceBook()
+    valid = set()
+    for block in range(1, EVENTS // 10 + 1):
+        for name, args in events[(block - 1) * 10:block * 10]:
+            truth.apply(name, args)
+        if block >= 300:
+            valid.add(truth.summary(TRACKED)[200][:2])
+    shared = OrderbookTracker(Web3(Web3.HTTPProvider("http://localhost:1")))
+    shared.w3 = SimpleNamespace(eth=SimulatedNode())
+    shared.scan = lambda bases, block: scan(shared, bases, block)
+    head["block"] = 300
+    seen, errors, done = [], [], threading.Event()
+
+    def read_depth():
+        try:
+            while not done.is_set():
+                seen.append(shared.depth(TRACKED, 200))
+        except Exception as e:
+            errors.append(e)
+
+    # Switch threads as often as possible, so an unlocked read would overlap a sync
+    sys.setswitchinterval(1e-6)
+    readers = [threading.Thread(target=read_depth) for _ in range(16)]
+    for reader in readers:
+        reader.start()
+    for block in range(301, EVENTS // 10 + 1):
+        head["block"] = block
+        time.sleep(0.0005)
+    done.set()
+    for reader in readers:
+        reader.join()
+    sys.setswitchinterval(0.005)
+    assert seen and not errors, errors
+    assert set(seen) <= valid, len(set(seen) - valid)
+    assert shared.depth(TRACKED, 200) == truth.summary(TRACKED)[200][:2]
+    print(f"✅ {len(seen)} depth() reads from 16 threads while the head advanced, each the depth at one head")
+
+    print("\n✅ Orderbook test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ Orderbook test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
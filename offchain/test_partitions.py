@@ -0,0 +1,232 @@
+"""
+Acceptance test: events and oracle_updates partitioning, retention archives and the migration path
+Writes synthetic events across partition boundaries, archives the old partitions, then migrates
+a database laid out the old (unpartitioned) way
+
+Usage: INDEXER_DB_URL=postgresql://localhost:5432/tempovault_test python test_partitions.py
+(drops and recreates events and oracle_updates in that database)
+"""
+import csv
+import gzip
+import io
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+os.environ["EVENTS_PARTITION_BLOCKS"] = "100"
+
+BLOCKS = 450
+PAIRS = ["0x" + f"{i:064x}" for i in (1, 2)]
+
+# events / oracle_updates / typed-table foreign keys as they were before partitioning
+LEGACY_SCHEMA = """
+    DROP TABLE IF EXISTS events, oracle_updates CASCADE;
+    TRUNCATE deposits, vault_totals RESTART IDENTITY;
+    CREATE TABLE events (
+        id BIGSERIAL PRIMARY KEY,
+        block_number BIGINT NOT NULL,
+        block_timestamp TIMESTAMP NOT NULL,
+        transaction_hash VARCHAR(66) NOT NULL,
+        log_index INTEGER NOT NULL,
+        event_type VARCHAR(64) NOT NULL,
+        contract_address VARCHAR(42) NOT NULL,
+        event_data JSONB NOT NULL,
+        indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(transaction_hash, log_index)
+    );
+    CREATE INDEX idx_events_block_number ON events(block_number);
+    CREATE INDEX idx_events_timestamp ON events(block_timestamp);
+    CREATE TABLE oracle_updates (
+        id BIGSERIAL PRIMARY KEY,
+        event_id BIGINT REFERENCES events(id),
+        pair_id VARCHAR(66) NOT NULL,
+        peg_deviation INTEGER NOT NULL,
+        orderbook_depth_bid NUMERIC(78, 0) NOT NULL,
+        orderbook_depth_ask NUMERIC(78, 0) NOT NULL,
+        nonce BIGINT NOT NULL,
+        block_timestamp TIMESTAMP NOT NULL
+    );
+    CREATE INDEX idx_oracle_updates_pair_time ON oracle_updates(pair_id, block_timestamp DESC, id DESC);
+    ALTER TABLE deposits ADD CONSTRAINT deposits_event_id_fkey FOREIGN KEY (event_id) REFERENCES events(id);
+"""
+
+
+def block_time(block_number):
+    """Blocks spread evenly over the last ~450 days, one per day"""
+    return int((datetime.now() - timedelta(days=BLOCKS - block_number)).timestamp())
+
+
+def synthetic_event(block_number, log_index):
+    """Alternating Deposited / OracleSignalUpdated events as decode_log would produce them"""
+    event = {
+        "block_number": block_number,
+        "block_timestamp": block_time(block_number),
+        "transaction_hash": "0x" + f"{block_number:064x}",
+        "log_index": log_index,
+        "contract_address": "0x599967eDC2dc6F692CA37c09693eDD7DDfe8c66D",
+    }
+    if log_index == 0:
+        event["event_type"] = "Deposited"
+        event["decoded_data"] = {
+            "vaultId": 1,
+            "token": "0x20C0000000000000000000000000000000000001",
+            "amount": 1000 * block_number,
+            "depositor": "0x70997970C51812dc3A010C7d01b50e0d17dc79C8",
+            "newBalance": 1000 * block_number,
+        }
+    else:
+        event["event_type"] = "OracleSignalUpdated"
+        event["decoded_data"] = {
+            "pairId": PAIRS[block_number % 2],
+            "signal": {
+                "pegDeviation": block_number, "orderbookDepthBid": 10 ** 18, "orderbookDepthAsk": 10 ** 18,
+                "nonce": block_number,
+            },
+        }
+    return event
+
+
+def latest_signal(conn, pair_id):
+    """The api_server risk status query"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT peg_deviation, block_timestamp FROM oracle_updates
+            WHERE pair_id = %s
+            ORDER BY block_timestamp DESC
+            LIMIT 1
+        """, (pair_id,))
+        return cur.fetchone()
+
+
+def scalar(conn, sql, params=()):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchone()[0]
+
+
+def reset(conn):
+    with conn.cursor() as cur:
+        for table in ("events", "oracle_updates"):
+            for name, _, _ in partitions.list_partitions(conn, table):
+                cur.execute(f"DROP TABLE {name}")
+        for _, name in partitions.detached_partitions(conn):
+            cur.execute(f"DROP TABLE {name}")
+        cur.execute("TRUNCATE events, oracle_updates, deposits, vault_totals RESTART IDENTITY")
+        cur.execute("UPDATE indexer_state SET last_indexed_block = 0 WHERE id = 1")
+    conn.commit()
+    partitions._known_partitions.update({table: None for table in partitions._known_partitions})
+
+
+print("Testing events / oracle_updates partitioning...")
+
+try:
+    import event_indexer
+    import partitions
+
+    conn = event_indexer.get_db_connection()
+    assert partitions.is_partitioned(conn, "events") and partitions.is_partitioned(conn, "oracle_updates"), \
+        "load the current indexer_schema.sql first"
+    reset(conn)
+
+    # Writes create the partitions they need, one batch per 50 blocks
+    events = [synthetic_event(n, i) for n in range(1, BLOCKS + 1) for i in range(2)]
+    for start in range(0, len(events), 100):
+        event_indexer.write_events_batch(conn, events[start:start + 100], notify=False)
+        conn.commit()
+    event_indexer.update_last_indexed_block(conn, BLOCKS)
+
+    event_partitions = partitions.list_partitions(conn, "events")
+    assert [name for name, _, _ in event_partitions] == [f"events_b{n}" for n in range(0, 600, 100)]
+    assert scalar(conn, "SELECT COUNT(*) FROM events") == len(events)
+    assert scalar(conn, "SELECT COUNT(*) FROM events_b100") == 200
+    assert scalar(conn, "SELECT COUNT(DISTINCT tableoid) FROM oracle_updates") >= 14
+    print(f"✅ {len(events)} events written across {len(event_partitions)} events partitions and "
+          f"{len(partitions.list_partitions(conn, 'oracle_updates'))} monthly oracle_updates partitions")
+
+    # Reads that span partition boundaries
+    assert scalar(conn, "SELECT COUNT(*) FROM events WHERE block_number BETWEEN 95 AND 104") == 20
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN SELECT * FROM events WHERE block_number > 420")
+        plan = "\n".join(row[0] for row in cur.fetchall())
+    assert "events_b400" in plan and "events_b300" not in plan, plan
+    for pair_id in PAIRS:
+        newest = max((e for e in events if e["event_type"] == "OracleSignalUpdated"
+                      and e["decoded_data"]["pairId"] == pair_id), key=lambda e: e["block_number"])
+        assert latest_signal(conn, pair_id)[0] == newest["block_number"]
+    print("✅ Range reads and the latest-signal query work across partitions; block_number filters prune")
+
+    # Replaying a range stays idempotent with block_number in the unique constraint
+    assert event_indexer.write_events_batch(conn, events[:50], notify=False) == 0
+    conn.commit()
+
+    # Retention: everything older than 200 days is archived and dropped
+    archive_dir = tempfile.mkdtemp(prefix="tempovault-archive-")
+    archived = partitions.apply_retention(conn, days=200, archive_dir=archive_dir)
+    archived_events = {name: rows for table, name, rows in archived if table == "events"}
+    assert sorted(archived_events) == ["events_b0", "events_b100"], archived
+    assert archived_events == {"events_b0": 198, "events_b100": 200}
+    cutoff = datetime.now() - timedelta(days=200)
+    for table, name, rows in archived:
+        with gzip.open(os.path.join(archive_dir, f"{name}.csv.gz"), "rt") as f:
+            assert len(list(csv.DictReader(io.StringIO(f.read())))) == rows
+    assert scalar(conn, "SELECT COUNT(*) FROM events") == len(events) - 398
+    assert scalar(conn, "SELECT MIN(block_timestamp) FROM oracle_updates") >= datetime(cutoff.year, cutoff.month, 1)
+    assert partitions.detached_partitions(conn) == []
+    for pair_id in PAIRS:
+        assert latest_signal(conn, pair_id) is not None
+    print(f"✅ Retention archived {len(archived)} partitions to gzip CSV, newer data untouched")
+
+    # Writing into a new range after retention still works
+    event_indexer.write_events_batch(conn, [synthetic_event(BLOCKS + 200, 0)], notify=False)
+    conn.commit()
+    assert scalar(conn, "SELECT COUNT(*) FROM events_b600") == 1
+
+    # Migration from the unpartitioned layout keeps rows, ids and the id sequence
+    with conn.cursor() as cur:
+        cur.execute(LEGACY_SCHEMA)
+    conn.commit()
+    partitions._known_partitions.update({table: None for table in partitions._known_partitions})
+    with conn.cursor() as cur:
+        for event in events:
+            cur.execute(f"""
+                INSERT INTO events ({", ".join(event_indexer.EVENT_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """, event_indexer.event_values(event))
+            event_id = cur.fetchone()[0]
+            if event["event_type"] in event_indexer.TYPED_TABLES:
+                event_indexer.insert_typed_event(conn, event["event_type"], event_id, event["decoded_data"],
+                                                 datetime.fromtimestamp(event["block_timestamp"]))
+        cur.execute("SELECT id, transaction_hash, log_index FROM events ORDER BY id")
+        legacy_ids = cur.fetchall()
+    conn.commit()
+
+    partitions.migrate(conn)
+    assert partitions.is_partitioned(conn, "events") and partitions.is_partitioned(conn, "oracle_updates")
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, transaction_hash, log_index FROM events ORDER BY id")
+        assert cur.fetchall() == legacy_ids
+    assert scalar(conn, "SELECT COUNT(*) FROM oracle_updates") == BLOCKS
+    assert scalar(conn, "SELECT COUNT(*) FROM pg_constraint WHERE contype = 'f' AND conrelid = 'deposits'::regclass") == 0
+    assert scalar(conn, "SELECT COUNT(*) FROM pg_class WHERE relname LIKE '%%_unpartitioned%%'") == 0
+    for pair_id in PAIRS:
+        assert latest_signal(conn, pair_id)[0] in (BLOCKS, BLOCKS - 1)
+
+    event_indexer.write_events_batch(conn, [synthetic_event(BLOCKS + 1, 0)], notify=False)
+    conn.commit()
+    assert scalar(conn, "SELECT MAX(id) FROM events") == legacy_ids[-1][0] + 1
+    partitions.migrate(conn)
+    reset(conn)
+    print(f"✅ Migrated {len(legacy_ids)} legacy events and {BLOCKS} oracle updates; ids continue; re-run is a no-op")
+
+    conn.close()
+    print("\n✅ Partitioning test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ Partitioning test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,245 @@
+"""
+Acceptance test: one relay_service process keeps many pairs on cadence while their transactions wait to be mined
+Replaces oracle_relay's RPC calls with a simulated chain that mines each transaction MINING_DELAY seconds
+after it is sent, so a relay that blocked on receipts would fall far behind; then runs the same pairs
+with RELAY_BATCH_WINDOW-style batching, where the simulated batcher contract charges less gas per update,
+and with ORACLE_TRIGGER=deviation, where only a pair whose book moves sends more than its first update
+
+Usage: python test_relay_service.py
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+# Anvil's first dev account; nothing is sent to a real node
+os.environ.setdefault("ORACLE_PRIVATE_KEY", "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")
+os.environ.setdefault("RISK_CONTROLLER_ADDRESS", "0x5FbDB2315678afecb367f032d93F642f64180aa3")
+os.environ["RELAY_RECEIPT_POLL"] = "0.05"
+os.environ["RELAY_RECEIPT_TIMEOUT"] = "1.5"
+os.environ["RELAY_STATS_INTERVAL"] = "3600"
+
+PAIRS = 20
+INTERVAL = 1.0
+MINING_DELAY = 0.8
+RUN_SECONDS = 3.9
+BATCH_WINDOW = 0.3
+# Simulated gas: one updateOracleSignal transaction, and a batch's base cost plus each forwarded update
+UPDATE_GAS = 60000
+BATCH_BASE_GAS = 30000
+BATCH_UPDATE_GAS = 35000
+FAILING_PAIR = f"0x{PAIRS:064x}"
+STUCK_PAIR = f"0x{PAIRS + 1:064x}"
+
+
+class SimulatedChain:
+    """oracleNonces, the oracle account nonce and delayed mining, behind the oracle_relay function signatures"""
+
+    def __init__(self, mining_delay=MINING_DELAY, depeg_at=None):
+        self.mining_delay = mining_delay
+        self.depeg_at = depeg_at
+        self.dex_reads = 0
+        self.lock = threading.Lock()
+        self.oracle_nonces = {}
+        self.account_nonce = 0
+        self.sent = []
+        self.batches = []
+        self.pending = {}
+        self.receipts = {}
+        self.sending = 0
+        self.overlapping_sends = 0
+
+    def get_current_nonce(self, pair_id):
+        time.sleep(0.01)
+        with self.lock:
+            return self.oracle_nonces.get(pair_id, 0)
+
+    def query_tempo_dex(self, token_a, token_b):
+        time.sleep(0.02)
+        if token_a == "fail":
+            raise RuntimeError("books() reverted")
+        with self.lock:
+            self.dex_reads += 1
+        if token_a == "depeg" and self.depeg_at is not None and time.monotonic() >= self.depeg_at:
+            return {"referenceTick": -250, "pegDeviation": 25, "orderbookDepthBid": 10 ** 21,
+                    "orderbookDepthAsk": 4 * 10 ** 20, "timestamp": int(time.time())}
+        return {"referenceTick": -12, "pegDeviation": 1, "orderbookDepthBid": 10 ** 21,
+                "orderbookDepthAsk": 10 ** 21, "timestamp": int(time.time())}
+
+    def sign_oracle_signal(self, pair_id, signal):
+        return "0x" + "11" * 65
+
+    def send_oracle_signal(self, pair_id, signal, signature):
+        with self.lock:
+            self.sending += 1
+            self.overlapping_sends += self.sending > 1
+        time.sleep(0.01)
+        with self.lock:
+            self.sending -= 1
+            tx_hash = (len(self.sent) + 1).to_bytes(32, "big")
+            self.sent.append((self.account_nonce, pair_id, signal["nonce"]))
+            self.account_nonce += 1
+            if pair_id != STUCK_PAIR:
+                self.pending[tx_hash] = (time.monotonic() + self.mining_delay, [(pair_id, signal["nonce"])], False)
+            return tx_hash
+
+    def send_oracle_batch(self, updates):
+        with self.lock:
+            tx_hash = (len(self.sent) + 1).to_bytes(32, "big")
+            for pair_id, signal, _ in updates:
+                self.sent.append((self.account_nonce, pair_id, signal["nonce"]))
+            self.batches.append(len(updates))
+            self.account_nonce += 1
+            self.pending[tx_hash] = (time.monotonic() + self.mining_delay,
+                                     [(pair_id, signal["nonce"]) for pair_id, signal, _ in updates], True)
+            return tx_hash
+
+    def batch_results(self, receipt, count):
+        return receipt["accepted"]
+
+    def get_receipt(self, tx_hash):
+        with self.lock:
+            if tx_hash in self.pending and time.monotonic() >= self.pending[tx_hash][0]:
+                _, updates, batched = self.pending.pop(tx_hash)
+                accepted = []
+                for pair_id, nonce in updates:
+                    accepted.append(nonce == self.oracle_nonces.get(pair_id, 0) + 1)
+                    if accepted[-1]:
+                        self.oracle_nonces[pair_id] = nonce
+                if batched:
+                    receipt = {"status": 1, "gasUsed": BATCH_BASE_GAS + BATCH_UPDATE_GAS * len(updates)}
+                else:
+                    receipt = {"status": 1 if accepted[0] else 0, "gasUsed": UPDATE_GAS}
+                self.receipts[tx_hash] = {**receipt, "accepted": accepted}
+            return self.receipts.get(tx_hash)
+
+
+print("Testing multi-pair oracle relay service...")
+
+try:
+    import oracle_relay
+    import relay_service
+
+    def use_chain(chain):
+        for name in ("get_current_nonce", "query_tempo_dex", "sign_oracle_signal", "send_oracle_signal",
+                     "send_oracle_batch", "batch_results", "get_receipt"):
+            setattr(oracle_relay, name, getattr(chain, name))
+
+    chain = SimulatedChain()
+    use_chain(chain)
+
+    pairs = [{"name": f"pair-{i}", "pair_id": f"0x{i:064x}", "token_a": "a", "token_b": "b", "interval": INTERVAL}
+             for i in range(PAIRS)]
+    pairs.append({"name": "failing", "pair_id": FAILING_PAIR, "token_a": "fail", "token_b": "b", "interval": INTERVAL})
+    pairs.append({"name": "stuck", "pair_id": STUCK_PAIR, "token_a": "a", "token_b": "b", "interval": INTERVAL})
+    service = relay_service.RelayService(pairs)
+
+    async def run_for(service, seconds):
+        try:
+            await asyncio.wait_for(service.run(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    started = time.monotonic()
+    asyncio.run(run_for(service, RUN_SECONDS))
+    elapsed = time.monotonic() - started
+    status = service.status()
+
+    # Every healthy pair kept its cadence: 3 slots in RUN_SECONDS although each update takes MINING_DELAY to mine
+    accepted = {name: s["accepted"] for name, s in status.items() if name.startswith("pair-")}
+    assert all(count >= 3 for count in accepted.values()), accepted
+    assert all(s["rejected"] == 0 and s["failed"] == 0 for name, s in status.items() if name.startswith("pair-"))
+    serial_updates = int(elapsed / (MINING_DELAY + 0.04))
+    print(f"✅ {sum(accepted.values())} updates mined for {PAIRS} pairs in {elapsed:.1f}s "
+          f"(one blocking loop over every pair would manage ~{serial_updates})")
+
+    # Account nonces were handed out one at a time with no gaps; each pair's signal nonces advanced by one
+    assert chain.overlapping_sends == 0, "sends ran concurrently"
+    assert [account_nonce for account_nonce, _, _ in chain.sent] == list(range(len(chain.sent)))
+    for pair in pairs[:PAIRS]:
+        nonces = [nonce for _, pair_id, nonce in chain.sent if pair_id == pair["pair_id"]]
+        assert nonces[:accepted[pair["name"]]] == list(range(1, accepted[pair["name"]] + 1)), (pair["name"], nonces)
+    print(f"✅ {len(chain.sent)} broadcasts used sequential account nonces; per-pair signal nonces advanced by one")
+
+    # Latency covers DEX read -> mined and is dominated by the mining delay
+    for name, s in status.items():
+        if name.startswith("pair-"):
+            assert MINING_DELAY <= s["p50"] < MINING_DELAY + 0.5, (name, s)
+            assert s["stages"]["mined"] >= MINING_DELAY - 0.1, (name, s)
+    sample = status["pair-0"]
+    print(f"✅ Per-pair latency reported: p50 {sample['p50']:.2f}s, p95 {sample['p95']:.2f}s, "
+          f"stages {sample['stages']}")
+
+    # A failing DEX read and an unmined transaction are counted without holding up other pairs
+    assert status["failing"]["failed"] >= 3 and status["failing"]["accepted"] == 0
+    assert "books() reverted" in status["failing"]["last_error"]
+    assert status["stuck"]["timeouts"] >= 1 and status["stuck"]["accepted"] == 0
+    print(f"✅ Failures ({status['failing']['failed']}) and receipt timeouts ({status['stuck']['timeouts']}) "
+          f"are isolated to their pair")
+    assert all(s["gas"] == UPDATE_GAS for name, s in status.items() if name.startswith("pair-"))
+
+    # Batched: updates due within BATCH_WINDOW share one transaction and one account nonce
+    # (faster mining, so the window plus mining still fits in a slot)
+    chain = SimulatedChain(mining_delay=MINING_DELAY / 2)
+    use_chain(chain)
+    batched = relay_service.RelayService(pairs[:PAIRS], batch_window=BATCH_WINDOW)
+    asyncio.run(run_for(batched, RUN_SECONDS + BATCH_WINDOW))
+    batched_status = batched.status()
+    accepted = {name: s["accepted"] for name, s in batched_status.items()}
+    assert all(count >= 3 for count in accepted.values()), accepted
+    assert all(s["rejected"] == 0 and s["failed"] == 0 for s in batched_status.values())
+    assert batched.batcher.batches == len(chain.batches) and len(chain.batches) < sum(accepted.values()) / 2
+    assert chain.account_nonce == len(chain.batches) and max(chain.batches) > 1
+    for pair in pairs[:PAIRS]:
+        nonces = [nonce for _, pair_id, nonce in chain.sent if pair_id == pair["pair_id"]]
+        assert nonces[:accepted[pair["name"]]] == list(range(1, accepted[pair["name"]] + 1)), (pair["name"], nonces)
+    gas = sum(s["gas"] for s in batched_status.values()) / len(batched_status)
+    assert gas < UPDATE_GAS, gas
+    print(f"✅ Batched: {sum(accepted.values())} updates in {len(chain.batches)} transactions "
+          f"(largest {max(chain.batches)}), {gas:.0f} gas per update vs {UPDATE_GAS} one at a time")
+
+    # Deviation trigger: stable pairs send their first update and then skip every poll; the pair whose
+    # book moves sends again within a poll of the move
+    chain = SimulatedChain(mining_delay=0.1, depeg_at=time.monotonic() + 1.5)
+    use_chain(chain)
+    polled = [{**pair, "interval": 0.25} for pair in pairs[:PAIRS]]
+    polled[0] = {**polled[0], "token_a": "depeg"}
+    watcher = relay_service.RelayService(polled, batch_window=0, trigger="deviation")
+    asyncio.run(run_for(watcher, 3))
+    watched = watcher.status()
+    assert watched["pair-0"]["accepted"] == 2, watched["pair-0"]
+    assert all(s["accepted"] == 1 for name, s in watched.items() if name != "pair-0")
+    assert all(s["skipped"] >= 8 and s["failed"] == 0 for s in watched.values())
+    skipped = sum(s["skipped"] for s in watched.values())
+    # Every read was either sent or skipped, bar the polls cut off when the run ended
+    assert len(chain.sent) == PAIRS + 1 and 0 <= chain.dex_reads - skipped - len(chain.sent) <= PAIRS
+    print(f"✅ Deviation trigger: {chain.dex_reads} DEX reads, {len(chain.sent)} updates sent, {skipped} skipped; "
+          f"the depegged pair was resent")
+
+    last = {"referenceTick": -12, "pegDeviation": 1, "orderbookDepthBid": 1000, "orderbookDepthAsk": 1000}
+    triggers = oracle_relay.update_triggers
+    assert triggers(None, last, 0) == ["first update"]
+    assert triggers(last, dict(last), 10, heartbeat=60) == []
+    assert triggers(last, dict(last), 60, heartbeat=60) == ["heartbeat"]
+    assert triggers(last, {**last, "referenceTick": -21}, 0, tick_threshold=10) == []
+    assert triggers(last, {**last, "referenceTick": -22}, 0, tick_threshold=10) == ["tick -10"]
+    assert triggers(last, {**last, "pegDeviation": 3}, 0, deviation_threshold=2) == ["deviation +2 bps"]
+    assert triggers(last, {**last, "orderbookDepthBid": 910}, 0, depth_threshold_bps=1000) == []
+    assert triggers(last, {**last, "orderbookDepthAsk": 1100}, 0, depth_threshold_bps=1000) == ["ask depth +10.0%"]
+    assert triggers({**last, "orderbookDepthBid": 0}, last, 0) == ["bid depth +100.0%"]
+    print("✅ update_triggers fires on tick, deviation and depth thresholds and on the heartbeat")
+
+    config = relay_service.load_config("relay_pairs.example.json")
+    assert [pair["interval"] for pair in config] == [30.0, 60.0]
+
+    print("\n✅ Relay service test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ Relay service test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
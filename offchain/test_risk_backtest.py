@@ -0,0 +1,151 @@
+"""
+Acceptance test: the vectorized backtest matches a minute-by-minute replay of every parameter set
+Builds a synthetic oracle_updates / circuit_breakers history for two pairs (with gaps, depegs, thin
+books and threshold ties), writes it in the parquet_export.py layout, loads it back and compares trips,
+false trips, missed triggers and time in breach for every grid point against a brute-force loop
+
+Usage: python test_risk_backtest.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import risk_backtest
+from parquet_export import table_schema
+
+START = 1_735_689_600  # 2025-01-01 00:00 UTC
+DAYS = 3
+GRID = {
+    "max_peg_deviation": [20, 50, 100, 150, 300],
+    "min_depth": [5e3, 2e4, 1e5, 5e5],
+    "staleness": [120, 300, 900, 1800],
+}
+PAIRS = ["0x" + "11" * 32, "0x" + "22" * 32]
+
+
+def synthetic_updates(seed):
+    """Updates every ~60s with outages, depeg episodes and thin-book episodes; values on grid points included"""
+    rng = np.random.default_rng(seed)
+    times, peg, depth = [], [], []
+    at = START + int(rng.integers(0, 60))
+    while at < START + DAYS * 86400:
+        times.append(at)
+        peg.append(int(rng.choice([rng.integers(0, 40), rng.choice([50, 100, 150]), rng.integers(100, 400)],
+                                  p=[0.9, 0.05, 0.05])))
+        depth.append(float(rng.choice([rng.uniform(1e5, 1e6), 2e4, rng.uniform(1e3, 3e4)], p=[0.92, 0.03, 0.05])))
+        at += int(rng.choice([rng.integers(30, 90), rng.integers(300, 2400)], p=[0.99, 0.01]))
+    return np.array(times, dtype=np.int64), np.array(peg), np.array(depth)
+
+
+def brute_force(times, peg, depth, breaker_times, triggered, grid, window):
+    """Every parameter set replayed minute by minute with plain comparisons"""
+    minutes = np.arange(-(-times[0] // 60) * 60, times[-1] + 1, 60)
+    covered = np.zeros(len(minutes), dtype=bool)
+    active_since = None
+    for at, on in list(zip(breaker_times, triggered)) + [(None, False)]:
+        if on and active_since is None:
+            active_since = at
+        elif not on and active_since is not None:
+            until = minutes[-1] if at is None else at
+            covered |= (minutes >= active_since - window * 60) & (minutes <= until)
+            active_since = None
+
+    latest = np.searchsorted(times, minutes, side="right") - 1
+    shape = tuple(len(grid[axis]) for axis in ("max_peg_deviation", "min_depth", "staleness"))
+    trips, false_trips, breach, missed = (np.zeros(shape, int) for _ in range(4))
+    trigger_windows = [(minutes >= at - window * 60) & (minutes <= at) for at, on in zip(breaker_times, triggered) if on]
+    for i, max_peg in enumerate(grid["max_peg_deviation"]):
+        for j, min_depth in enumerate(grid["min_depth"]):
+            for k, staleness in enumerate(grid["staleness"]):
+                in_breach = ((peg[latest] > max_peg) | (depth[latest] < min_depth)
+                             | (minutes - times[latest] > staleness))
+                onsets = in_breach & ~np.concatenate(([False], in_breach[:-1]))
+                trips[i, j, k] = onsets.sum()
+                false_trips[i, j, k] = (onsets & ~covered).sum()
+                breach[i, j, k] = in_breach.sum()
+                missed[i, j, k] = sum(not in_breach[inside].any() for inside in trigger_windows)
+    return trips, false_trips, breach, missed
+
+
+def write_parquet(export_dir, table, rows):
+    schema = table_schema(table)
+    directory = os.path.join(export_dir, table, "month=2025-01")
+    os.makedirs(directory)
+    columns = {name: [row.get(name) for row in rows] for name in schema.names}
+    pq.write_table(pa.table({name: pa.array(columns[name], type=schema.field(name).type) for name in schema.names}),
+                   os.path.join(directory, "part-1-100.parquet"))
+
+
+print("Testing risk backtest...")
+
+try:
+    histories = {pair_id: synthetic_updates(seed) for seed, pair_id in enumerate(PAIRS)}
+    # Pair 1: triggered and reset, then triggered and never reset; pair 2 has no breaker history
+    breaker_events = {PAIRS[0]: [(START + 20000, True), (START + 26000, False), (START + 150000, True)]}
+
+    export_dir = tempfile.mkdtemp(prefix="tempovault-backtest-")
+    update_rows, breaker_rows = [], []
+    for pair_id, (times, peg, depth) in histories.items():
+        for n, (at, deviation, total) in enumerate(zip(times, peg, depth)):
+            # Signed deviations (below peg) and bid/ask split as 18-decimal integers
+            bid = int(total * 0.4 * 10 ** 6) * 10 ** 12
+            update_rows.append({
+                "id": len(update_rows) + 1, "event_id": len(update_rows) + 1, "pair_id": pair_id,
+                "peg_deviation": -int(deviation) if n % 3 else int(deviation),
+                "orderbook_depth_bid": bid, "orderbook_depth_ask": int(total * 10 ** 6) * 10 ** 12 - bid,
+                "nonce": n + 1, "block_timestamp": datetime.fromtimestamp(int(at), timezone.utc).replace(tzinfo=None),
+                "block_number": n + 1,
+            })
+    for pair_id, events in breaker_events.items():
+        for at, on in events:
+            breaker_rows.append({
+                "id": len(breaker_rows) + 1, "event_id": 0, "pair_id": pair_id, "triggered": on,
+                "triggered_by": "0x" + "00" * 20, "block_number": 1,
+                "block_timestamp": datetime.fromtimestamp(at, timezone.utc).replace(tzinfo=None),
+            })
+    write_parquet(export_dir, "oracle_updates", update_rows[::-1])
+    write_parquet(export_dir, "circuit_breakers", breaker_rows)
+
+    updates, breakers = risk_backtest.load_history_parquet(export_dir)
+    assert sorted(updates) == PAIRS and list(breakers) == [PAIRS[0]]
+    for pair_id, (times, peg, depth) in histories.items():
+        assert np.array_equal(updates[pair_id]["time"], times) and np.array_equal(updates[pair_id]["peg"], peg)
+        assert np.allclose(updates[pair_id]["depth"], depth, rtol=1e-9)
+    print(f"✅ Loaded {len(update_rows)} oracle updates and {len(breaker_rows)} breaker events from Parquet")
+
+    results = risk_backtest.backtest(updates, breakers, GRID, window=30)
+    for pair_id in PAIRS:
+        history, events = updates[pair_id], breakers.get(pair_id, {"time": [], "triggered": []})
+        expected = brute_force(history["time"], history["peg"], history["depth"],
+                               events["time"], events["triggered"], GRID, window=30)
+        result = results[pair_id]
+        for name, values in zip(("trips", "false_trips", "breach_minutes", "missed_triggers"), expected):
+            assert np.array_equal(result[name], values), (pair_id, name, result[name] - values)
+        assert result["trips"].max() > 0 and (result["trips"] > result["false_trips"]).any() == (pair_id == PAIRS[0])
+        assert result["triggers"] == (2 if pair_id == PAIRS[0] else 0)
+        print(f"✅ {pair_id[:10]}…: {result['minutes']} minutes x {result['trips'].size} parameter sets match the "
+              f"brute-force replay (trips {result['trips'].min()}-{result['trips'].max()}, "
+              f"false {result['false_trips'].min()}-{result['false_trips'].max()}, "
+              f"missed {result['missed_triggers'].min()}-{result['missed_triggers'].max()})")
+
+    best = risk_backtest.best_parameters(results[PAIRS[0]], GRID, count=3)
+    ranks = [(row["missed_triggers"], row["false_trips"], row["breach_minutes"]) for row in best]
+    assert ranks == sorted(ranks) and ranks[0][0] == results[PAIRS[0]]["missed_triggers"].min()
+    assert ranks[0][1] == results[PAIRS[0]]["false_trips"][results[PAIRS[0]]["missed_triggers"] == ranks[0][0]].min()
+    print(f"✅ Best parameter set: {best[0]}")
+
+    print("\n✅ Risk backtest test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ Risk backtest test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,239 @@
+"""
+Acceptance test: risk_signal_engine against a local stub orderbook API
+Checks that the price and depth reads run concurrently over pooled keep-alive connections, that a slow
+upstream pair does not hold up other pairs, that snapshots are cached and concurrent misses coalesced,
+that upstream latency histograms and failures are reported, and that the background scheduler keeps
+tracked pairs fresh, serves them from memory, flags stale snapshots, and bounds the pairs it tracks
+
+Usage: python test_risk_signal_engine.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+STUB_PORT = 18731
+UPSTREAM_DELAY = 0.2
+SLOW_DELAY = 1.0
+CACHE_TTL = 0.5
+REFRESH_INTERVAL = 0.3
+# Above SLOW_DELAY + REFRESH_INTERVAL, the oldest a healthy slow pair's snapshot gets
+STALE_AFTER = 2.0
+SCHEDULED_PAIRS = 20
+os.environ["TEMPO_API_URL"] = f"http://127.0.0.1:{STUB_PORT}"
+os.environ["RISK_ENGINE_CACHE_TTL"] = str(CACHE_TTL)
+os.environ["RISK_ENGINE_REFRESH_INTERVAL"] = str(REFRESH_INTERVAL)
+os.environ["RISK_ENGINE_STALE_AFTER"] = str(STALE_AFTER)
+os.environ["RISK_ENGINE_NONCE_DB"] = os.path.join(tempfile.mkdtemp(), "nonces.db")
+os.environ.pop("RISK_CONTROLLER_ADDRESS", None)
+
+from aiohttp import web
+import risk_signal_engine as engine
+
+hits = {}
+peers = set()
+bid_depth = {}  # token_a -> bidDepth served, default 1500.5
+down = set()    # token_a values answered with a 500
+
+
+async def orderbook(request):
+    token_a = request.match_info["token_a"]
+    hits[request.path] = hits.get(request.path, 0) + 1
+    peers.add(request.transport.get_extra_info("peername"))
+    await asyncio.sleep(SLOW_DELAY if token_a == "slow" else UPSTREAM_DELAY)
+    if token_a == "fail" or token_a in down:
+        raise web.HTTPInternalServerError()
+    if request.path.endswith("/depth"):
+        return web.json_response({"bidDepth": bid_depth.get(token_a, 1500.5), "askDepth": 900})
+    return web.json_response({"bestBid": 0.9990, "bestAsk": 0.9994})
+
+
+async def start_stub():
+    app = web.Application()
+    app.router.add_get("/orderbook/{token_a}/{token_b}", orderbook)
+    app.router.add_get("/orderbook/{token_a}/{token_b}/depth", orderbook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", STUB_PORT).start()
+    return runner
+
+
+async def timed(coroutine):
+    started = time.perf_counter()
+    result = await coroutine
+    return result, time.perf_counter() - started
+
+
+async def main():
+    runner = await start_stub()
+    try:
+        # Price and depth are fetched concurrently: one upstream delay, not two
+        response, elapsed = await timed(engine.get_risk_signal("0xpair", "tokenA", "tokenB"))
+        assert response.signal.pegDeviation == int(((0.9990 + 0.9994) / 2 - 1) * 100000)
+        assert response.signal.orderbookDepthBid == int(1500.5 * 1e18)
+        assert response.signal.orderbookDepthAsk == 900 * 10 ** 18
+        assert elapsed < UPSTREAM_DELAY * 1.6, elapsed
+        print(f"✅ Price and depth fetched concurrently: {elapsed * 1000:.0f}ms with {UPSTREAM_DELAY * 1000:.0f}ms "
+              f"per upstream request")
+
+        # Cached for the TTL; an expired snapshot is still served while it is refetched in the background
+        before = dict(hits)
+        response, elapsed = await timed(engine.get_risk_signal("0xpair", "tokenA", "tokenB"))
+        assert hits == before and elapsed < 0.05 and response.signal.nonce == 0
+        assert response.stale is False and response.ageSeconds < CACHE_TTL
+        await asyncio.sleep(CACHE_TTL)
+        response, elapsed = await timed(engine.get_risk_signal("0xpair", "tokenA", "tokenB"))
+        assert elapsed < 0.05 and response.ageSeconds >= CACHE_TTL
+        await asyncio.sleep(UPSTREAM_DELAY * 1.5)
+        assert hits["/orderbook/tokenA/tokenB"] == 2
+        assert time.monotonic() - engine.snapshots.peek("tokenA", "tokenB")["fetchedAt"] < UPSTREAM_DELAY
+        print(f"✅ Snapshot reused within {CACHE_TTL}s ({elapsed * 1000:.1f}ms) and refetched in the background "
+              f"after it expired")
+
+        # 50 concurrent reservations for a new pair share one fetch; each still gets its own nonce
+        responses, elapsed = await timed(asyncio.gather(*[
+            engine.reserve_risk_signal("0xburst", "tokenC", "tokenD") for _ in range(50)
+        ]))
+        assert hits["/orderbook/tokenC/tokenD"] == 1 and hits["/orderbook/tokenC/tokenD/depth"] == 1
+        assert sorted(r.signal.nonce for r in responses) == list(range(1, 51))
+        # One snapshot, but RiskController needs every signal's timestamp above the previous one
+        stamps = [r.signal.timestamp for r in sorted(responses, key=lambda r: r.signal.nonce)]
+        assert all(later > earlier for earlier, later in zip(stamps, stamps[1:]))
+        assert len({r.asOf for r in responses}) == 1 and stamps[0] >= responses[0].asOf
+        assert engine.snapshots.stats["coalesced"] == 49
+        for _ in range(3):
+            response = await engine.get_risk_signal("0xburst", "tokenC", "tokenD")
+            assert response.signal.nonce == 50 and (await engine.get_current_nonce("0xburst"))["nonce"] == 50
+        print(f"✅ 50 concurrent requests coalesced onto one upstream fetch in {elapsed * 1000:.0f}ms; "
+              f"timestamps increase with the nonces; GET reports the last nonce without allocating one")
+
+        # A slow pair does not stall the event loop or other pairs
+        slow_started = time.perf_counter()
+        slow = asyncio.ensure_future(engine.get_risk_signal("0xslow", "slow", "tokenB"))
+        await asyncio.sleep(0.05)
+        _, fast_elapsed = await timed(engine.get_risk_signal("0xother", "tokenE", "tokenF"))
+        assert not slow.done() and fast_elapsed < UPSTREAM_DELAY * 1.6, fast_elapsed
+        await slow
+        print(f"✅ Other pairs answered in {fast_elapsed * 1000:.0f}ms while a slow pair took "
+              f"{(time.perf_counter() - slow_started) * 1000:.0f}ms")
+
+        # Failures read as zero, are counted, and are not cached
+        response = await engine.get_risk_signal("0xfail", "fail", "tokenB")
+        assert response.signal.pegDeviation == 0 and response.signal.orderbookDepthBid == 0
+        await engine.get_risk_signal("0xfail", "fail", "tokenB")
+        assert hits["/orderbook/fail/tokenB"] == 2
+
+        # Every request reused a small pool of keep-alive connections
+        total_requests = sum(hits.values())
+        assert len(peers) <= 4, peers
+        stats = await engine.get_stats()
+        upstream = stats["upstream"]
+        assert upstream["orderbook"]["errors"] == 2 and upstream["depth"]["errors"] == 2
+        assert upstream["orderbook"]["requests"] + upstream["depth"]["requests"] == total_requests - 4
+        assert upstream["orderbook"]["p50_ms"] == 250 and upstream["orderbook"]["p99_ms"] == 2500
+        print(f"✅ {total_requests} upstream requests over {len(peers)} connections; orderbook latency "
+              f"p50 ≤{upstream['orderbook']['p50_ms']}ms, p99 ≤{upstream['orderbook']['p99_ms']}ms, "
+              f"{upstream['orderbook']['errors']} errors")
+        print(f"✅ Cache: {stats['cache']}")
+
+        # Background scheduler: requested pairs plus preloaded ones are kept fresh at a fixed cadence
+        for index in range(SCHEDULED_PAIRS):
+            engine.scheduler.track(f"0xscheduled{index}", f"tokenP{index}", "tokenQ")
+        engine.scheduler.start()
+        # Long enough for the slow pair's refresh to land too
+        await asyncio.sleep(SLOW_DELAY + UPSTREAM_DELAY)
+        bulk = await engine.get_risk_signals()
+        tracked = len(engine.scheduler.pairs)
+        # The failing pair never gets a snapshot; the slow one already has one from its first request
+        assert tracked == SCHEDULED_PAIRS + 5 and bulk["count"] == tracked - 1 and bulk["pending"] == 1, bulk
+        assert bulk["stale"] == 0
+        print(f"✅ /risk-signals returned {bulk['count']} of {tracked} tracked pairs in one response "
+              f"({bulk['pending']} pending)")
+
+        # Reads come from memory: no fetches started, O(1) per request
+        coalesced, reads = engine.snapshots.stats["coalesced"], 2000
+        started = time.perf_counter()
+        for index in range(reads):
+            response = await engine.get_risk_signal(f"0xscheduled{index % SCHEDULED_PAIRS}",
+                                                    f"tokenP{index % SCHEDULED_PAIRS}", "tokenQ")
+            assert response.ageSeconds < CACHE_TTL
+        per_read = (time.perf_counter() - started) / reads
+        assert engine.snapshots.stats["coalesced"] == coalesced and per_read < 0.005, per_read
+        print(f"✅ {reads} reads served from memory in {per_read * 1e6:.0f}µs each; every snapshot younger "
+              f"than {CACHE_TTL}s")
+
+        # A changed value moves changedAt; an unchanged pair keeps it
+        unchanged = engine.snapshots.peek("tokenP2", "tokenQ")["changedAt"]
+        bid_depth["tokenP1"] = 2000
+        await asyncio.sleep(REFRESH_INTERVAL + UPSTREAM_DELAY * 1.5)
+        changed = engine.snapshots.peek("tokenP1", "tokenQ")
+        assert changed["orderbookDepthBid"] == 2000 * 10 ** 18 and changed["changedAt"] > unchanged
+        assert engine.snapshots.peek("tokenP2", "tokenQ")["changedAt"] == unchanged
+        print("✅ changedAt follows value changes, not refreshes")
+
+        # A pair whose upstream fails keeps its last snapshot, flagged stale once it is old enough
+        down.add("tokenP0")
+        await asyncio.sleep(STALE_AFTER + REFRESH_INTERVAL)
+        response = await engine.get_risk_signal("0xscheduled0", "tokenP0", "tokenQ")
+        assert response.stale and response.ageSeconds > STALE_AFTER
+        assert response.signal.orderbookDepthBid == int(1500.5 * 1e18)
+        bulk = await engine.get_risk_signals()
+        assert bulk["stale"] == 1
+        down.discard("tokenP0")
+        await asyncio.sleep(REFRESH_INTERVAL + UPSTREAM_DELAY * 1.5)
+        assert not (await engine.get_risk_signal("0xscheduled0", "tokenP0", "tokenQ")).stale
+        stats = (await engine.get_stats())["scheduler"]
+        assert stats["failures"] > 0 and stats["skipped"] > 0 and stats["running"]
+        print(f"✅ Failing pair flagged stale after {STALE_AFTER}s and recovered; scheduler: {stats}")
+
+        # A tracked pair_id asked for with other tokens is rejected, not answered with the tracked pair's signal
+        for tokens in (("tokenX", "tokenQ"), ("tokenQ", "tokenP1")):
+            try:
+                await engine.get_risk_signal("0xscheduled1", *tokens)
+                raise AssertionError(f"0xscheduled1 answered for {tokens}")
+            except engine.HTTPException as e:
+                assert e.status_code == 409, e.status_code
+        assert engine.scheduler.pairs["0xscheduled1"] == ("tokenP1", "tokenQ")
+
+        # Requested pairs are capped, and dropped with their snapshot once nobody asks for them; configured ones stay
+        engine.scheduler.track("0xconfigured", "tokenR", "tokenS", configured=True)
+        engine.scheduler.max_pairs = len(engine.scheduler.requested)
+        try:
+            await engine.get_risk_signal("0xnew", "tokenN", "tokenQ")
+            raise AssertionError("pair beyond RISK_ENGINE_MAX_PAIRS tracked")
+        except engine.HTTPException as e:
+            assert e.status_code == 503, e.status_code
+        engine.scheduler.pair_ttl = 1.0
+        deadline = time.monotonic() + 3 * SLOW_DELAY + 1.0
+        while set(engine.scheduler.requested) != {"0xscheduled1"}:
+            assert time.monotonic() < deadline, sorted(engine.scheduler.requested)
+            await engine.get_risk_signal("0xscheduled1", "tokenP1", "tokenQ")
+            await asyncio.sleep(REFRESH_INTERVAL)
+        assert set(engine.scheduler.pairs) == {"0xscheduled1", "0xconfigured"}
+        assert engine.snapshots.peek("tokenP2", "tokenQ") is None and engine.snapshots.peek("tokenR", "tokenS")
+        assert (await engine.get_risk_signal("0xnew", "tokenN", "tokenQ")).signal.orderbookDepthBid > 0
+        stats = (await engine.get_stats())["scheduler"]
+        assert stats["rejected"] == 3 and stats["expired"] == SCHEDULED_PAIRS + 4 and stats["requested"] == 2
+        print(f"✅ Token mismatches rejected (409), requested pairs capped (503) and expired after "
+              f"{engine.scheduler.pair_ttl}s without a request; configured pairs kept")
+    finally:
+        await engine.close_upstream()
+        await runner.cleanup()
+
+
+print("Testing risk signal engine...")
+
+try:
+    asyncio.run(main())
+    print("\n✅ Risk signal engine test PASSED")
+    sys.exit(0)
+
+except Exception as e:
+    print(f"\n❌ Risk signal engine test FAILED")
+    print(f"Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
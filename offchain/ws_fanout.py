@@ -0,0 +1,187 @@
+"""
+TempoVault WebSocket Fan-out
+Pushes indexer events (Postgres LISTEN/NOTIFY) to /ws/events subscribers with per-client filters and queues
+"""
+
+import asyncio
+import json
+import os
+import select
+import threading
+import time
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+# Must match EVENT_NOTIFY_CHANNEL in event_indexer.py
+EVENT_NOTIFY_CHANNEL = os.getenv("EVENT_NOTIFY_CHANNEL", "tempovault_events")
+# Pending messages per client before it is considered too slow and disconnected
+WS_CLIENT_QUEUE_SIZE = int(os.getenv("WS_CLIENT_QUEUE_SIZE", "256"))
+# Seconds a single send may take before the client is dropped
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+
+def parse_filter(value, convert=str):
+    """Comma-separated query value -> set, or None (match everything) when empty"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    items = {convert(v.strip() if isinstance(v, str) else v) for v in value if str(v).strip()}
+    return items or None
+
+
+class Subscriber:
+    """One websocket client: its filters, bounded send queue and sender task"""
+
+    def __init__(self, websocket, vault_ids=None, pair_ids=None, event_types=None, queue_size=WS_CLIENT_QUEUE_SIZE):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.sender = None
+        self.closed = False
+        self.sent = 0
+        self.set_filters(vault_ids, pair_ids, event_types)
+
+    def set_filters(self, vault_ids=None, pair_ids=None, event_types=None):
+        self.vault_ids = parse_filter(vault_ids, int)
+        self.pair_ids = parse_filter(pair_ids, str.lower)
+        self.event_types = parse_filter(event_types)
+
+    def matches(self, event):
+        if self.event_types is not None and event["event_type"] not in self.event_types:
+            return False
+        data = event.get("data") or {}
+        if self.vault_ids is not None and data.get("vaultId") not in self.vault_ids:
+            return False
+        if self.pair_ids is not None and str(data.get("pairId", "")).lower() not in self.pair_ids:
+            return False
+        return True
+
+
+class EventFanout:
+    """
+    Fans published event batches out to websocket subscribers
+
+    publish() never awaits a socket: each matching subscriber gets the batch
+    on its own bounded queue and a per-client sender task drains it, so one
+    slow client cannot delay the rest. A client whose queue is full (or
+    whose send exceeds WS_SEND_TIMEOUT) is disconnected and can reconnect
+    and catch up through the REST endpoints.
+    """
+
+    def __init__(self, queue_size=WS_CLIENT_QUEUE_SIZE, send_timeout=WS_SEND_TIMEOUT):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.subscribers = set()
+        self.tasks = set()
+        self.listener = None
+        self.stop_listening = threading.Event()
+        self.stats = {"published_batches": 0, "published_events": 0, "queued": 0, "dropped_clients": 0}
+
+    async def subscribe(self, websocket, **filters):
+        subscriber = Subscriber(websocket, queue_size=self.queue_size, **filters)
+        subscriber.sender = asyncio.ensure_future(self.send_loop(subscriber))
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    async def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+        if subscriber.sender is not None and subscriber.sender is not asyncio.current_task():
+            subscriber.sender.cancel()
+
+    async def drop(self, subscriber, reason):
+        self.stats["dropped_clients"] += 1
+        await self.unsubscribe(subscriber)
+        try:
+            await asyncio.wait_for(subscriber.websocket.close(code=1013, reason=reason), timeout=1)
+        except Exception:
+            pass
+
+    async def send_loop(self, subscriber):
+        while not subscriber.closed:
+            message = await subscriber.queue.get()
+            try:
+                await asyncio.wait_for(subscriber.websocket.send_json(message), timeout=self.send_timeout)
+                subscriber.sent += 1
+            except asyncio.TimeoutError:
+                await self.drop(subscriber, "send timeout")
+            except Exception:
+                await self.unsubscribe(subscriber)
+
+    def publish(self, events):
+        """Queue a batch of event messages for every subscriber whose filters match"""
+        self.stats["published_batches"] += 1
+        self.stats["published_events"] += len(events)
+        published_at = time.time()
+        for subscriber in list(self.subscribers):
+            matching = [event for event in events if subscriber.matches(event)]
+            if not matching:
+                continue
+            try:
+                subscriber.queue.put_nowait({"type": "events", "published_at": published_at, "events": matching})
+                self.stats["queued"] += 1
+            except asyncio.QueueFull:
+                # Detach now so later batches skip it; the close itself happens in a task
+                subscriber.closed = True
+                self.subscribers.discard(subscriber)
+                task = asyncio.ensure_future(self.drop(subscriber, "client too slow"))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    def publish_payload(self, payload):
+        try:
+            events = json.loads(payload)
+        except ValueError:
+            print(f"Ignoring malformed event notification: {payload[:200]}", flush=True)
+            return
+        self.publish(events if isinstance(events, list) else [events])
+
+    def listen_blocking(self, dsn, channel, loop):
+        """LISTEN on channel in a thread, reconnecting on errors, handing payloads to the event loop"""
+        backoff = 1
+        while not self.stop_listening.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{channel}"')
+                print(f"Listening for indexer events on channel {channel}", flush=True)
+                backoff = 1
+
+                while not self.stop_listening.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notification = conn.notifies.pop(0)
+                        loop.call_soon_threadsafe(self.publish_payload, notification.payload)
+            except Exception as e:
+                print(f"Event listener error: {e}; reconnecting in {backoff}s", flush=True)
+                self.stop_listening.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def start_listener(self, dsn, channel=EVENT_NOTIFY_CHANNEL):
+        if not channel or self.listener is not None:
+            return
+        self.stop_listening.clear()
+        self.listener = threading.Thread(
+            target=self.listen_blocking, args=(dsn, channel, asyncio.get_running_loop()), daemon=True
+        )
+        self.listener.start()
+
+    def stop_listener(self):
+        self.stop_listening.set()
+        self.listener = None
+
+    def status(self):
+        queued = [s.queue.qsize() for s in self.subscribers]
+        return {
+            **self.stats,
+            "subscribers": len(self.subscribers),
+            "max_queue_depth": max(queued) if queued else 0,
+            "listening": self.listener is not None,
+        }
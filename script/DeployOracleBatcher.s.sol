@@ -0,0 +1,18 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.24;
+
+import "forge-std/Script.sol";
+import "../src/OracleSignalBatcher.sol";
+
+contract DeployOracleBatcher is Script {
+    function run() external {
+        uint256 deployerPrivateKey = vm.envUint("PRIVATE_KEY");
+        address riskController = vm.envAddress("RISK_CONTROLLER_ADDRESS");
+        vm.startBroadcast(deployerPrivateKey);
+
+        OracleSignalBatcher batcher = new OracleSignalBatcher(riskController);
+        console.log("OracleSignalBatcher:", address(batcher));
+
+        vm.stopBroadcast();
+    }
+}
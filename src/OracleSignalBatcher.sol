@@ -0,0 +1,43 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.24;
+
+import "./RiskController.sol";
+
+/// @title OracleSignalBatcher
+/// @notice Submits signed oracle signals for several pairs in one transaction
+/// @dev Stateless forwarder to RiskController.updateOracleSignal, which authenticates the EIP-712
+///      signature rather than msg.sender, so each update is verified exactly as if sent on its own.
+///      An update that reverts (stale nonce, bad signature) is reported and skipped; the rest still apply.
+contract OracleSignalBatcher {
+
+    struct SignedUpdate {
+        bytes32 pairId;
+        RiskController.OracleSignal signal;
+        bytes signature;
+    }
+
+    RiskController public immutable riskController;
+
+    /// @notice Emitted for every update in a batch that RiskController rejected
+    event OracleUpdateFailed(uint256 indexed index, bytes32 indexed pairId, bytes reason);
+
+    constructor(address _riskController) {
+        riskController = RiskController(_riskController);
+    }
+
+    /// @notice Forward each signed update to RiskController in order
+    /// @param updates Per-pair signals, each signed as for updateOracleSignal
+    /// @return accepted accepted[i] is false when updates[i] reverted (see OracleUpdateFailed)
+    function updateOracleSignals(SignedUpdate[] calldata updates) external returns (bool[] memory accepted) {
+        uint256 length = updates.length;
+        accepted = new bool[](length);
+        for (uint256 i = 0; i < length; i++) {
+            SignedUpdate calldata update = updates[i];
+            try riskController.updateOracleSignal(update.pairId, update.signal, update.signature) {
+                accepted[i] = true;
+            } catch (bytes memory reason) {
+                emit OracleUpdateFailed(i, update.pairId, reason);
+            }
+        }
+    }
+}
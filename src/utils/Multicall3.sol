@@ -0,0 +1,46 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.24;
+
+/// @title Multicall3
+/// @notice Read-only subset of Multicall3 (aggregate3 and block getters) with the canonical ABI
+/// @dev Used to provide Multicall3 on local chains (anvil_setCode at 0xcA11bde05977b3631167028862bE2a173976CA11)
+///      for offchain/onchain_reader.py. Public networks should use the canonical deployment.
+contract Multicall3 {
+
+    struct Call3 {
+        address target;
+        bool allowFailure;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    error CallFailed(uint256 index);
+
+    /// @notice Execute calls in order; reverts if a call with allowFailure == false fails
+    function aggregate3(Call3[] calldata calls) external payable returns (Result[] memory returnData) {
+        uint256 length = calls.length;
+        returnData = new Result[](length);
+        for (uint256 i = 0; i < length; i++) {
+            Call3 calldata call = calls[i];
+            (bool success, bytes memory data) = call.target.call(call.callData);
+            if (!success && !call.allowFailure) revert CallFailed(i);
+            returnData[i] = Result(success, data);
+        }
+    }
+
+    function getBlockNumber() external view returns (uint256) {
+        return block.number;
+    }
+
+    function getCurrentBlockTimestamp() external view returns (uint256) {
+        return block.timestamp;
+    }
+
+    function getChainId() external view returns (uint256) {
+        return block.chainid;
+    }
+}